@@ -1,33 +1,44 @@
 # Secțiunea de înlocuit în app.py
 
 import os
-import io
 import csv
 import time
 import json
 import logging # Am lăsat importul, e bun
 import datetime
-import tempfile
 import hashlib
+import threading
+import multiprocessing
 from typing import Dict, List, Optional, Any
 from functools import wraps
 
-import xlsxwriter
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, make_response
+import click
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_migrate import Migrate
 
 # Presupunând că aceste fișiere/foldere utils există în proiectul tău
-from utils.email_sender import send_email_notification
+from utils.email_sender import (
+    send_batch_with_sendgrid, encode_attachment, WEBHOOK_BREAKER, SENDGRID_BREAKER
+)
+from utils.circuit_breaker import get_breaker, breakers_snapshot
 from utils.csv_processor import process_csv_data, calculate_average
 from utils.simple_notifier import save_notification
-from utils.pdf_generator import generate_notification_pdf
+from utils.grade_matrix import build_grade_matrix, chunked
+from utils.roster_cache import RosterCache
+from utils.excel_export import ExportDataset, write_grade_workbook
+from utils.export_cache import export_cache
+from utils.zip_stream import stream_zip
 from utils.gdpr_utils import (
     check_gdpr_consent, save_gdpr_consent, load_gdpr_settings, anonymize_data, 
     export_as_json, export_as_csv, load_gdpr_form_template, 
-    generate_gdpr_form_html, generate_gdpr_form_pdf
+    generate_gdpr_form_html, iter_gdpr_forms_pdf,
+    generate_gdpr_parent_form_html, generate_gdpr_family_form_html, iter_gdpr_family_forms_pdf,
+    group_students_by_parent, gdpr_student_names, gdpr_students_text, gdpr_students_line,
+    GDPR_STUDENTS_TAG, GDPR_STUDENTS_LINE_TAG, GDPR_PARENT_NAME_TAG
 )
 
 # Configurare logger
@@ -72,11 +83,40 @@ migrate = Migrate(app, db)
 
 # Importăm modelele după inițializarea db
 try:
-    from models import Student, Subject, Grade, Reminder
+    from models import (
+        Student, Subject, Grade, Reminder, GradeAggregate, rebuild_grade_aggregates,
+        CacheVersion, ROSTER_CACHE, GRADES_CACHE, SUBJECTS_CACHE, get_cache_version, load_grade_stats,
+        NotificationJob
+    )
+    from notification_jobs import enqueue_notification_job, job_results, notification_pool, resume_pending_jobs
+    from csv_import import import_grades_csv, IMPORT_BATCH_SIZE
+    from reminder_scheduler import reminder_scheduler, reminders_fired_since
 except ImportError as e:
     logger.error(f"ERROR: Could not import models: {e}. Ensure models.py exists and has no import errors.")
     # Consideră oprirea aplicației aici dacă modelele sunt esențiale pentru pornire.
 
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_work():
+    """Reia joburile de notificare neterminate și pornește planificatorul de remindere (o singură dată pe proces)"""
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    try:
+        # Reluăm joburile de notificare rămase neterminate la oprirea anterioară
+        resumed_jobs = resume_pending_jobs(app)
+        if resumed_jobs:
+            logger.info(f"Resumed {resumed_jobs} unfinished notification jobs.")
+        reminder_scheduler.start(app)
+    except Exception as e:
+        logger.error(f"Error starting background work: {e}")
+
 # Creăm baza de date și adăugăm materii inițiale
 try:
     with app.app_context():
@@ -98,6 +138,32 @@ try:
             logger.info(f"Added {len(default_subjects)} default subjects.")
         else:
             logger.info("Default subjects already exist, not adding again.")
+
+        # Contorul de versiune pentru cache-ul listei de elevi
+        if CacheVersion.query.get(ROSTER_CACHE) is None:
+            db.session.add(CacheVersion(name=ROSTER_CACHE, version=0))
+            db.session.commit()
+        
+        # Populăm tabela de agregate pentru notele existente înainte de introducerea ei
+        if GradeAggregate.query.count() == 0 and Grade.query.count() > 0:
+            rebuild_grade_aggregates(db.session.connection())
+            db.session.commit()
+            logger.info("Grade aggregates rebuilt from existing grades.")
+
+        # Exporturile GDPR per elev nu mai sunt păstrate în cache; le ștergem pe cele rămase
+        removed_exports = export_cache.remove_matching('gdpr_export_')
+        if removed_exports:
+            logger.info(f"Removed {removed_exports} cached GDPR exports.")
+
+    # Munca de fundal pornește doar în procesele care servesc aplicația: nu și în procesele de
+    # randare PDF (care pot reimporta modulul principal) și nu la importul din comenzile flask
+    # (flask db upgrade, flask import-grades), care altfel ar prelua joburi și lease-ul reminderelor.
+    # Sub `flask run` pornește la prima cerere.
+    if multiprocessing.parent_process() is None:
+        if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+            app.before_request(start_background_work)
+        else:
+            start_background_work()
 except Exception as e:
     if db and db.session: # Verifică dacă db.session este disponibil înainte de rollback
         db.session.rollback()
@@ -106,36 +172,154 @@ except Exception as e:
 # --- SFÂRȘITUL SECȚIUNII DE ÎNLOCUIT ---
 # Restul fișierului tău app.py (de la "# Funcție helper pentru a obține elevii..." încolo) rămâne la fel.
 
+# Cache-ul local al listei de elevi (invalidat prin contorul de versiune din baza de date)
+roster_cache = RosterCache()
+
 # Funcție helper pentru a obține elevii grupați după clasă
 def get_students_by_class():
-    """Funcție utilitară pentru a obține elevii grupați după clasă pentru bara de navigare"""
-    # Obține toți elevii pentru bara de navigare
+    """Funcție utilitară pentru a obține elevii grupați după clasă pentru bara de navigare
+    
+    Lista este păstrată în cache-ul procesului și reîncărcată doar când versiunea din
+    baza de date se schimbă (la adăugarea, editarea sau ștergerea unui elev).
+    """
+    version = get_cache_version(db.session.connection(), ROSTER_CACHE)
+    return roster_cache.get(
+        version,
+        lambda: Student.query.order_by(Student.class_name, Student.name).all()
+    )
+
+# Funcție helper pentru numărul de note și media tuturor notelor fiecărui elev
+def load_grade_summary():
+    """Returnează {student_id: {'grade_count': n, 'average': medie}} din tabela de agregate"""
+    rows = db.session.query(
+        GradeAggregate.student_id,
+        func.sum(GradeAggregate.grade_count),
+        func.sum(GradeAggregate.grade_sum)
+    ).group_by(GradeAggregate.student_id).all()
+    
+    return {
+        student_id: {'grade_count': int(count), 'average': total / count}
+        for student_id, count, total in rows
+        if count
+    }
+
+# Funcție helper pentru a obține notele mai multor elevi fără interogări per elev/materie
+def load_grades_for_students(student_ids, subject_id=None, all_students=False):
+    """Obține notele elevilor dați, ordonate descrescător după dată
+    
+    Dacă sunt vizibili toți elevii, se face o singură interogare fără clauza IN;
+    altfel ID-urile sunt trimise pe bucăți pentru a evita clauze IN foarte mari.
+    """
+    base_query = Grade.query
+    if subject_id:
+        base_query = base_query.filter(Grade.subject_id == subject_id)
+    
+    if all_students:
+        return base_query.order_by(Grade.date.desc()).all()
+    
+    grades = []
+    for ids_chunk in chunked(list(student_ids)):
+        grades.extend(base_query.filter(Grade.student_id.in_(ids_chunk)).all())
+    
+    # Reordonăm după dată rezultatele combinate din toate bucățile
+    grades.sort(key=lambda g: g.date, reverse=True)
+    return grades
+
+def load_export_dataset():
+    """Setul de date al exportului Excel: elevii, materiile și toate notele (o singură interogare)"""
     students = Student.query.order_by(Student.class_name, Student.name).all()
+    subjects = Subject.query.order_by(Subject.name).all()
     
-    # Grupare după clasă pentru bara de navigare
-    students_by_class = {}
-    for student in students:
-        if student.class_name not in students_by_class:
-            students_by_class[student.class_name] = []
-        students_by_class[student.class_name].append(student)
+    # Notele împreună cu numele materiilor, în ordinea adăugării
+    grade_rows = db.session.query(
+        Grade.student_id, Grade.subject_id, Subject.name, Grade.value, Grade.date
+    ).outerjoin(Subject, Grade.subject_id == Subject.id).order_by(Grade.id).all()
     
-    return students, students_by_class
+    return ExportDataset(students, subjects, grade_rows)
+
+# Amprenta datelor exportate (note, elevi, materii), pentru cache-ul exporturilor
+def export_data_fingerprint(*parts):
+    """Hash-ul stării datelor și al parametrilor exportului; se schimbă la orice modificare relevantă"""
+    connection = db.session.connection()
+    grades_state = db.session.query(func.max(Grade.created_at), func.count(Grade.id)).one()
+    students_state = db.session.query(func.max(Student.updated_at), func.count(Student.id)).one()
+    subjects_count = db.session.query(func.count(Subject.id)).scalar()
+    
+    state = [
+        *grades_state, *students_state, subjects_count,
+        # Editările de note și materii nu schimbă datele de mai sus, ci contoarele de versiune
+        get_cache_version(connection, GRADES_CACHE),
+        get_cache_version(connection, SUBJECTS_CACHE),
+        get_cache_version(connection, ROSTER_CACHE),
+        *parts
+    ]
+    return hashlib.sha256(json.dumps(state, default=str).encode('utf-8')).hexdigest()
+
+def send_cached_export(name, fingerprint, build, mimetype, download_name):
+    """
+    Trimite un export din cache (construit doar dacă datele s-au schimbat), cu ETag
+    
+    O cerere repetată cu același ETag (If-None-Match) primește 304 fără conținut.
+    
+    Args:
+        name: Numele exportului în cache
+        fingerprint: Amprenta datelor (vezi `export_data_fingerprint`)
+        build: Funcție care scrie exportul în calea primită
+        mimetype: Tipul fișierului
+        download_name: Numele fișierului descărcat
+    """
+    path = export_cache.get_or_build(name, fingerprint, build, suffix=os.path.splitext(download_name)[1])
+    return send_cached_file(path, fingerprint, mimetype, download_name)
+
+def send_cached_file(path, fingerprint, mimetype, download_name):
+    """Trimite un fișier din cache-ul exporturilor, cu amprenta drept ETag (304 la cereri repetate)"""
+    return send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=fingerprint,
+        conditional=True
+    )
+
+def stream_cached_export(name, fingerprint, generate, mimetype, download_name):
+    """
+    Ca `send_cached_export`, dar un export care nu este în cache este transmis în flux
+    (bucată cu bucată, pe măsură ce este generat) și salvat în cache la final
+    
+    Args:
+        generate: Funcție fără argumente care întoarce bucățile exportului
+    """
+    suffix = os.path.splitext(download_name)[1]
+    path = export_cache.get(name, fingerprint, suffix)
+    if path:
+        return send_cached_file(path, fingerprint, mimetype, download_name)
+    
+    response = Response(
+        stream_with_context(export_cache.stream_and_store(name, fingerprint, generate(), suffix)),
+        mimetype=mimetype
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.set_etag(fingerprint)
+    return response
 
 # Adăugăm direct elevii și gruparea după clase în render_template
 
-# Funcția pentru verificarea reminderelor active
+# Funcția pentru reminderele de afișat
 def check_active_reminders():
-    """Verifică dacă există remindere active care trebuie afișate"""
-    now = datetime.datetime.now()
-    active_reminders = Reminder.query.filter_by(active=True).all()
-    due_reminders = [r for r in active_reminders if r.is_due]
+    """Reminderele declanșate de planificator de la ultima vizualizare din această sesiune
     
-    # Actualizăm timpul ultimei declanșări pentru reminder-urile active
-    for reminder in due_reminders:
-        reminder.last_triggered = now
-        db.session.commit()
-        
-    return due_reminders
+    La prima vizită din sesiune (sau fără SESSION_SECRET, când sesiunea nu poate fi scrisă)
+    sunt afișate reminderele declanșate în ziua curentă.
+    """
+    now = datetime.datetime.now()
+    since = datetime.datetime.combine(now.date(), datetime.time.min)
+    if app.secret_key:
+        seen_at = session.get('reminders_seen_at')
+        if seen_at:
+            since = datetime.datetime.fromisoformat(seen_at)
+        session['reminders_seen_at'] = now.isoformat()
+    return reminders_fired_since(since)
 
 @app.route('/')
 def index():
@@ -149,6 +333,7 @@ def index():
                           now=now,
                           students=students,
                           students_by_class=students_by_class,
+                          grade_summary=load_grade_summary(),
                           active_reminders=active_reminders)
     
 # Ruta pentru adăugarea notelor individuale a fost eliminată și înlocuită cu ruta pentru note multiple
@@ -237,74 +422,20 @@ def view_grades():
     students, students_by_class = get_students_by_class()
     subjects = Subject.query.order_by(Subject.name).all()
     
-    # Inițializează lista de elevi cu note
-    students_with_grades = []
-    
     # Procesează elevii vizibili (conform filtrelor)
     query_students = students
     if student_id:
         query_students = [s for s in students if str(s.id) == student_id]
     
-    # Pentru fiecare elev vizibil, calculăm notele și mediile
-    for student in query_students:
-        # Inițializează datele elevului
-        student_data = {
-            'id': student.id,
-            'name': student.name,
-            'class_name': student.class_name,
-            'subjects': [],
-            'overall_average': 0.0
-        }
-        
-        # Obține toate materiile cu note sau toate materiile dacă există filtru
-        subject_query = Subject.query
-        if subject_id:
-            subject_query = subject_query.filter(Subject.id == subject_id)
-        
-        available_subjects = subject_query.order_by(Subject.name).all()
-        
-        # Construiește lista de materii cu note pentru elev
-        total_average = 0.0
-        subjects_with_grades = 0
-        
-        for subject in available_subjects:
-            # Obține notele elevului la această materie
-            grade_query = Grade.query.filter_by(
-                student_id=student.id,
-                subject_id=subject.id
-            ).order_by(Grade.date.desc())
-            
-            grades = grade_query.all()
-            
-            # Dacă există note sau dacă este un filtru pe materie, adaugă materia
-            if grades or subject_id:
-                grade_values = [float(g.value) for g in grades]
-                average = round(sum(grade_values) / len(grade_values), 2) if grade_values else 0
-                
-                # Adaugă la media generală
-                if grade_values:
-                    total_average += average
-                    subjects_with_grades += 1
-                
-                # Adaugă materia la lista elevului
-                student_data['subjects'].append({
-                    'id': subject.id,
-                    'name': subject.name,
-                    'grades': grades,
-                    'average': average if grade_values else None,
-                    'count': len(grade_values)
-                })
-        
-        # Calculează media generală a elevului
-        if subjects_with_grades > 0:
-            student_data['overall_average'] = round(total_average / subjects_with_grades, 2)
-        
-        # Adaugă elevul la lista finală
-        if student_data['subjects'] or not subject_id:
-            students_with_grades.append(student_data)
+    # Obține toate notele elevilor vizibili dintr-o singură interogare (sau câteva, pe bucăți)
+    grades = load_grades_for_students(
+        [s.id for s in query_students],
+        subject_id=subject_id,
+        all_students=not student_id
+    )
     
-    # Sortează elevii după clasă și nume
-    students_with_grades.sort(key=lambda x: (x['class_name'], x['name']))
+    # Construiește matricea elev × materie în memorie
+    students_with_grades = build_grade_matrix(query_students, subjects, grades, subject_id=subject_id)
     
     return render_template(
         'view_grades.html',
@@ -329,6 +460,7 @@ def manage_students():
                            now=now, 
                            students=students, 
                            students_by_class=students_by_class,
+                           grade_summary=load_grade_summary(),
                            class_names=class_names)
 
 @app.route('/add-student', methods=['POST'])
@@ -703,623 +835,74 @@ def send_notifications():
         flash('Vă rugăm să selectați cel puțin un elev pentru a trimite notificări.', 'warning')
         return redirect(url_for('send_notifications_page'))
     
-    # Obține elevii selectați
-    students = Student.query.filter(Student.id.in_(student_ids)).all()
-    
-    # Organizează elevii după email-ul părintelui
-    parent_data = {}
-    
-    for student in students:
-        # Verifică dacă elevul are email părinte și note
-        if not student.parent_email or not student.parent_email.strip():
-            continue
-        
-        parent_email = student.parent_email.strip()
-        
-        # Inițializează datele pentru acest părinte dacă nu există deja
-        if parent_email not in parent_data:
-            parent_data[parent_email] = {
-                'name': student.parent_name,
-                'students': [],
-                'all_grades': []
-            }
-        
-        # Inițializează informațiile elevului
-        student_info = {
-            'id': student.id,
-            'name': student.name,
-            'class_name': student.class_name,
-            'grades': [],
-            'subject_averages': [],
-            'overall_average': 0.0
-        }
-        
-        # Procesează notele și calculează mediile
-        if student.grades:
-            # Organizează notele după materie
-            subject_grades = {}
-            
-            for grade in student.grades:
-                subject_name = grade.subject.name
-                
-                # Adaugă nota la lista de note pentru această materie
-                if subject_name not in subject_grades:
-                    subject_grades[subject_name] = []
-                
-                subject_grades[subject_name].append(grade.value)
-                
-                # Adaugă nota la lista de note a elevului
-                student_info['grades'].append({
-                    'value': grade.value,
-                    'date': grade.date,
-                    'subject': subject_name
-                })
-                
-                # Adaugă nota și la lista generală pentru email
-                grade_text = f"{student.name} (Clasa {student.class_name}) - {subject_name}: {grade.value} din {grade.date.strftime('%d-%m-%Y')}"
-                parent_data[parent_email]['all_grades'].append(grade_text)
-            
-            # Calculează mediile pe materii
-            overall_sum = 0.0
-            subject_count = 0
-            
-            for subject_name, grades in subject_grades.items():
-                if grades:
-                    # Calculează media pentru această materie
-                    avg = sum(grades) / len(grades)
-                    
-                    # Adaugă media la lista de medii pe materii
-                    student_info['subject_averages'].append({
-                        'subject': subject_name,
-                        'average': avg,
-                        'count': len(grades)
-                    })
-                    
-                    # Adaugă media și la lista generală pentru email
-                    avg_text = f"{student.name} (Clasa {student.class_name}) - Media la {subject_name}: {avg:.2f}"
-                    if 'averages' not in parent_data[parent_email]:
-                        parent_data[parent_email]['averages'] = []
-                    parent_data[parent_email]['averages'].append(avg_text)
-                    
-                    # Adaugă la suma generală
-                    overall_sum += avg
-                    subject_count += 1
-            
-            # Calculează media generală (ca medie a mediilor pe materii, nu ca medie a tuturor notelor)
-            if subject_count > 0:
-                student_info['overall_average'] = overall_sum / subject_count  # overall_sum conține suma mediilor pe materii și subject_count numărul de materii
-                
-                # Adaugă media generală la lista pentru email
-                overall_avg_text = f"{student.name} (Clasa {student.class_name}) - Media generală: {student_info['overall_average']:.2f}"
-                parent_data[parent_email]['averages'].append(overall_avg_text)
-        
-        # Adaugă informațiile elevului la lista de elevi pentru acest părinte
-        parent_data[parent_email]['students'].append(student_info)
-    
-    # Inițializează rezultatele
-    results = {
-        'success': 0,
-        'failed': 0,
-        'total': len(parent_data),
-        'emails_sent': 0,  # Adăugăm contor pentru emailuri trimise cu succes
-        'details': []
-    }
-    
-    # Trimite emailuri pentru fiecare părinte
-    for parent_email, info in parent_data.items():
-        try:
-            parent_name = info['name']
-            students_info = info['students']
-            
-            # Verifică dacă există note pentru a trimite email
-            if not any(student['grades'] for student in students_info):
-                continue
-            
-            # Construiește subiectul emailului
-            if len(students_info) == 1:
-                subject = f"DiriginteSmart - Note Școlare - {students_info[0]['name']}"
-            else:
-                subject = f"DiriginteSmart - Note Școlare - {len(students_info)} elevi"
-            
-            # Folosim conținutul furnizat de utilizator
-            custom_content = content
-            
-            # Personalizăm conținutul cu numele părintelui
-            body = custom_content # Presupunând că 'custom_content' va conține deja "Stimate domn/doamnă,"
-            
-            # Adăugăm secțiunea cu note, dacă este solicitată
-            if include_grades and 'all_grades' in info and info['all_grades']:
-                body += "\n\n**NOTE NOI ȘI RECENTE:**\n"
-                body += "\n".join(info['all_grades'])
-                
-                # Adaugă și mediile dacă există
-                if 'averages' in info and info['averages']:
-                    body += "\n\nInformații privind mediile școlare:\n"
-                    body += "\n".join(info['averages'])
-            
-            # Adăugăm notificarea GDPR dacă este activată
-            if include_gdpr:
-                body += "\n\n---------------------------------------------"
-                body += "\nNOTĂ PRIVIND PROTECȚIA DATELOR (GDPR):"
-                body += "\nDatele personale sunt procesate conform Regulamentului (UE) 2016/679 privind protecția persoanelor fizice."
-                body += "\nAveți dreptul de acces, rectificare, ștergere, restricționare și portabilitate a datelor."
-                body += "\nPentru mai multe informații sau pentru a vă exercita drepturile, contactați școala."
-                body += "\n---------------------------------------------"
-            
-            # Adaugă un footer
-            body += "\n\nAceastă notificare a fost generată automat de sistemul DiriginteSmart."
-            body += "\nVă rugăm să nu răspundeți la acest email."
-            body += "\n\nCu stimă,"
-            body += "\nConducerea Școlii"
-            
-            # Trimite și salvează notificarea
-            try:
-                # Debug pentru a vedea detalii în logs
-                logger.info(f"Salvare notificare pentru {parent_email}...")
-                
-                # Formatăm conținutul pentru HTML
-                html_content = body.replace('\n', '<br>')
-                
-                # 1. Salvăm notificarea în fișier local (va fi mereu disponibilă)
-                notification_saved = save_notification(
-                    from_email=email_user,
-                    to_email=parent_email,
-                    subject=subject,
-                    content=html_content
-                )
-                
-                # 2. Generăm PDF pentru printare sau distribuție
-                # Obținem numele elevului (primul elev dacă sunt mai mulți)
-                student_name = students_info[0]['name'] if students_info else "Elev"
-                
-                pdf_success, pdf_path = generate_notification_pdf(
-                    parent_name=parent_name,
-                    student_name=student_name,
-                    parent_email=parent_email,
-                    subject=subject,
-                    content=html_content
-                )
-                
-                # 3. Încearcă să trimită și prin email (opțional, nu depinde de rezultat)
-                # Folosim HTML pentru o formatare mai bună
-                html_body = body.replace('\n', '<br>')
-                
-                # Adăugăm mesaje de debug
-                print(f"DEBUG: Trimitem email către {parent_email}, subiect: {subject}")
-                print(f"DEBUG: Email webhook URL configurat: {bool(os.environ.get('EMAIL_WEBHOOK_URL'))}")
-                
-                email_success = send_email_notification(
-                    email_user=email_user,
-                    smtp_server=smtp_server,
-                    smtp_port=smtp_port,
-                    recipient=parent_email,
-                    subject=subject,
-                    body=html_body,
-                    email_password=email_password,  # Transmitem direct parola introdusă de utilizator
-                    attachment_path=pdf_path if pdf_success else None
-                )
-                
-                # Debug pentru rezultat
-                print(f"DEBUG: Rezultat trimitere email: {email_success}")
-                
-                # Înregistrează rezultatul (notificarea se consideră trimisă dacă a fost salvată local sau ca PDF)
-                results['success'] += 1
-                
-                status_parts = []
-                if notification_saved:
-                    status_parts.append('Notificare salvată')
-                
-                if pdf_success:
-                    pdf_filename = os.path.basename(pdf_path)
-                    status_parts.append(f'PDF generat (<a href="/static/notifications_pdf/{pdf_filename}" target="_blank">Deschide</a>)')
-                    
-                if email_success:
-                    status_parts.append('Email trimis')
-                    results['emails_sent'] += 1  # Incrementăm contorul de emailuri trimise
-                else:
-                    status_parts.append('Email indisponibil')
-                
-                status_mesaj = ' | '.join(status_parts)
-                
-                logger.info(f"Notificare: Local={notification_saved}, PDF={pdf_success}, Email={email_success}")
-                
-            except Exception as send_error:
-                logger.error(f"Eroare la procesarea notificării: {send_error}")
-                results['failed'] += 1
-                status_mesaj = f'Eroare notificare: {str(send_error)[:50]}...'
-            
-            results['details'].append({
-                'email': parent_email,
-                'name': parent_name,
-                'status': status_mesaj,
-                'students_count': len(students_info),
-                'grades_count': len(info.get('all_grades', []))
-            })
-            
-            # Mică pauză pentru a evita supraîncărcarea serverului SMTP
-            time.sleep(0.5)
-            
-        except Exception as e:
-            logger.error(f"Eroare la trimiterea email-ului către {parent_email}: {str(e)}")
-            results['failed'] += 1
-            results['details'].append({
-                'email': parent_email,
-                'name': info.get('name', 'Necunoscut'),
-                'status': 'Eroare',
-                'error': str(e)
-            })
+    # Înregistrează jobul; notificările sunt trimise în fundal, câte un destinatar per părinte
+    job = enqueue_notification_job(
+        email_user=email_user,
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        content=content,
+        include_grades=include_grades,
+        include_gdpr=include_gdpr,
+        student_ids=student_ids
+    )
     
-    # Afișează mesaje de rezultat
-    if results['total'] == 0:
+    if job is None:
         flash('Nu există note pentru elevii selectați. Nu s-au trimis notificări.', 'warning')
-    else:
-        if results['success'] > 0:
-            # Verificăm câte emailuri au fost trimise cu succes
-            if results["emails_sent"] > 0:
-                flash(f'S-au trimis cu succes {results["success"]} din {results["total"]} notificări ({results["emails_sent"]} prin email).', 'success')
-            else:
-                flash(f'S-au generat {results["success"]} din {results["total"]} notificări ca PDF-uri, dar NU s-au trimis emailuri. Puteți găsi PDF-urile în folderul static/notifications_pdf/ pentru a le distribui manual.', 'primary')
-        
-        if results['failed'] > 0:
-            flash(f'Au eșuat {results["failed"]} notificări. Verificați setările serverului SMTP și adresele de email.', 'danger')
-    
-    return redirect(url_for('send_notifications_page'))
-    
-@app.route('/export-excel')
-def export_excel():
-    # Creează un buffer pentru output
-    output = io.BytesIO()
-    
-    # Creează workbook-ul Excel și adaugă un format pentru header
-    workbook = xlsxwriter.Workbook(output)
-    header_format = workbook.add_format({
-        'bold': True,
-        'bg_color': '#4F81BD',
-        'color': 'white',
-        'align': 'center',
-        'valign': 'vcenter',
-        'border': 1
-    })
-    
-    # Format pentru note
-    grade_format = workbook.add_format({
-        'num_format': '0.00',
-        'align': 'center'
-    })
-    
-    # Format pentru note bune (peste 8)
-    good_grade_format = workbook.add_format({
-        'num_format': '0.00',
-        'align': 'center',
-        'bg_color': '#C6EFCE',
-        'color': '#006100'
-    })
+        return redirect(url_for('send_notifications_page'))
     
-    # Format pentru note medii (între 5 și 8)
-    average_grade_format = workbook.add_format({
-        'num_format': '0.00',
-        'align': 'center',
-        'bg_color': '#FFEB9C',
-        'color': '#9C6500'
-    })
+    notification_pool.submit_job(app, job.id)
     
-    # Format pentru note slabe (sub 5)
-    poor_grade_format = workbook.add_format({
-        'num_format': '0.00',
-        'align': 'center',
-        'bg_color': '#FFC7CE',
-        'color': '#9C0006'
-    })
+    flash(f'Trimiterea a {len(job.items)} notificări a pornit. Puteți urmări progresul pe această pagină.', 'info')
+    return redirect(url_for('notification_job_status', job_id=job.id))
+
+@app.route('/notification-jobs/<int:job_id>')
+def notification_job_status(job_id):
+    now = datetime.datetime.now()
+    job = NotificationJob.query.get_or_404(job_id)
+    results = job_results(job)
     
-    # Format pentru medii
-    average_format = workbook.add_format({
-        'bold': True,
-        'num_format': '0.00',
-        'align': 'center',
-        'bg_color': '#E6E6E6'
-    })
+    # Răspuns JSON pentru actualizarea progresului fără reîncărcarea paginii
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'id': job.id,
+            'status': job.status,
+            'success': results['success'],
+            'failed': results['failed'],
+            'pending': results['pending'],
+            'total': results['total'],
+            'emails_sent': results['emails_sent']
+        })
     
-    # Format pentru data
-    date_format = workbook.add_format({
-        'num_format': 'dd/mm/yyyy',
-        'align': 'center'
+    return render_template('notification_job.html', now=now, job=job, results=results)
+
+@app.route('/diagnostics/email-providers')
+def email_providers_diagnostics():
+    """Starea circuit breaker-elor furnizorilor de email (per proces)"""
+    # Breaker-ele sunt create la prima utilizare; le afișăm chiar dacă nu s-a trimis nimic încă
+    get_breaker(WEBHOOK_BREAKER)
+    get_breaker(SENDGRID_BREAKER)
+    
+    return jsonify({
+        'pid': os.getpid(),
+        'providers': {
+            WEBHOOK_BREAKER: bool(os.environ.get('EMAIL_WEBHOOK_URL')),
+            SENDGRID_BREAKER: bool(os.environ.get('SENDGRID_API_KEY') or os.environ.get('BREVO_API_KEY'))
+        },
+        'breakers': breakers_snapshot()
     })
     
-    # Obține toți elevii
-    students = Student.query.order_by(Student.class_name, Student.name).all()
-    
-    # Creează sheet-ul general cu toți elevii
-    overview_sheet = workbook.add_worksheet('Situație Generală')
-    
-    # Adaugă header-ul
-    headers = ['Nr.', 'Elev', 'Clasa', 'Părinte', 'Email', 'Media Generală']
-    
-    # Adaugă materii la header
-    subjects = Subject.query.order_by(Subject.name).all()
-    for subject in subjects:
-        headers.append(subject.name)
-    
-    for col, header in enumerate(headers):
-        overview_sheet.write(0, col, header, header_format)
-    
-    # Setează lățimea coloanelor
-    overview_sheet.set_column(0, 0, 5)  # Nr.
-    overview_sheet.set_column(1, 1, 25)  # Elev
-    overview_sheet.set_column(2, 2, 10)  # Clasa
-    overview_sheet.set_column(3, 3, 25)  # Părinte
-    overview_sheet.set_column(4, 4, 30)  # Email
-    overview_sheet.set_column(5, 5, 15)  # Media Generală
-    overview_sheet.set_column(6, len(headers) - 1, 15)  # Materii
-    
-    # Calculează mediile pentru fiecare elev și materie și completează tabelul
-    for i, student in enumerate(students):
-        row = i + 1
-        overall_sum = 0
-        subject_count = 0
-        
-        # Date elev
-        overview_sheet.write(row, 0, i + 1)  # Număr
-        overview_sheet.write(row, 1, student.name)  # Nume
-        overview_sheet.write(row, 2, student.class_name)  # Clasa
-        overview_sheet.write(row, 3, student.parent_name)  # Părinte
-        overview_sheet.write(row, 4, student.parent_email)  # Email
-        
-        # Calculează mediile pentru fiecare materie
-        subject_averages = {}
-        
-        for grade in student.grades:
-            if grade.subject_id not in subject_averages:
-                subject_averages[grade.subject_id] = []
-            subject_averages[grade.subject_id].append(grade.value)
-        
-        # Scrie mediile pe materii
-        for j, subject in enumerate(subjects):
-            col = j + 6  # Offset pentru primele 6 coloane
-            
-            if subject.id in subject_averages:
-                subject_grades = subject_averages[subject.id]
-                avg = sum(subject_grades) / len(subject_grades)
-                
-                # Folosește formatul adecvat în funcție de valoarea mediei
-                if avg >= 8:
-                    overview_sheet.write(row, col, avg, good_grade_format)
-                elif avg >= 5:
-                    overview_sheet.write(row, col, avg, average_grade_format)
-                else:
-                    overview_sheet.write(row, col, avg, poor_grade_format)
-                
-                overall_sum += avg
-                subject_count += 1
-            else:
-                overview_sheet.write(row, col, '-')  # Fără note
-        
-        # Calculează și scrie media generală
-        if subject_count > 0:
-            overall_avg = overall_sum / subject_count
-            
-            # Folosește formatul adecvat în funcție de valoarea mediei generale
-            if overall_avg >= 8:
-                overview_sheet.write(row, 5, overall_avg, good_grade_format)
-            elif overall_avg >= 5:
-                overview_sheet.write(row, 5, overall_avg, average_grade_format)
-            else:
-                overview_sheet.write(row, 5, overall_avg, poor_grade_format)
-        else:
-            overview_sheet.write(row, 5, '-')  # Fără note
-    
-    # Creează sheet-uri individuale pentru fiecare clasă
-    classes = {}
-    for student in students:
-        if student.class_name not in classes:
-            classes[student.class_name] = []
-        classes[student.class_name].append(student)
-    
-    for class_name, class_students in classes.items():
-        # Creează sheet pentru clasa curentă
-        class_sheet = workbook.add_worksheet(f'Clasa {class_name}')
-        
-        # Adaugă header
-        class_headers = ['Nr.', 'Elev', 'Media Generală']
-        for subject in subjects:
-            class_headers.append(subject.name)
-        
-        for col, header in enumerate(class_headers):
-            class_sheet.write(0, col, header, header_format)
-        
-        # Setează lățimea coloanelor
-        class_sheet.set_column(0, 0, 5)      # Nr.
-        class_sheet.set_column(1, 1, 30)     # Elev
-        class_sheet.set_column(2, 2, 15)     # Media Generală
-        class_sheet.set_column(3, len(class_headers) - 1, 15)  # Materii
-        
-        # Scrie datele elevilor
-        student_overall_averages = []  # Lista pentru a stoca mediile generale ale elevilor
-        
-        for i, student in enumerate(class_students):
-            row = i + 1
-            overall_sum = 0
-            subject_count = 0
-            
-            # Date elev
-            class_sheet.write(row, 0, i + 1)      # Număr
-            class_sheet.write(row, 1, student.name)  # Nume
-            
-            # Calculează mediile pentru fiecare materie
-            subject_averages = {}
-            
-            for grade in student.grades:
-                if grade.subject_id not in subject_averages:
-                    subject_averages[grade.subject_id] = []
-                subject_averages[grade.subject_id].append(grade.value)
-            
-            # Scrie mediile pe materii
-            for j, subject in enumerate(subjects):
-                col = j + 3  # Offset pentru primele 3 coloane
-                
-                if subject.id in subject_averages:
-                    subject_grades = subject_averages[subject.id]
-                    avg = sum(subject_grades) / len(subject_grades)
-                    
-                    # Folosește formatul adecvat în funcție de valoarea mediei
-                    if avg >= 8:
-                        class_sheet.write(row, col, avg, good_grade_format)
-                    elif avg >= 5:
-                        class_sheet.write(row, col, avg, average_grade_format)
-                    else:
-                        class_sheet.write(row, col, avg, poor_grade_format)
-                    
-                    overall_sum += avg
-                    subject_count += 1
-                else:
-                    class_sheet.write(row, col, '-')  # Fără note
-            
-            # Calculează și scrie media generală
-            if subject_count > 0:
-                overall_avg = overall_sum / subject_count
-                student_overall_averages.append(overall_avg)  # Adaugă la lista de medii generale
-                
-                # Folosește formatul adecvat în funcție de valoarea mediei generale
-                if overall_avg >= 8:
-                    class_sheet.write(row, 2, overall_avg, good_grade_format)
-                elif overall_avg >= 5:
-                    class_sheet.write(row, 2, overall_avg, average_grade_format)
-                else:
-                    class_sheet.write(row, 2, overall_avg, poor_grade_format)
-            else:
-                class_sheet.write(row, 2, '-')  # Fără note
-        
-        # Calculează statistici pentru clasă (doar dacă există cel puțin un elev cu medie generală)
-        if student_overall_averages:
-            # Rândul pentru statistici (după ultimul elev)
-            stats_row = len(class_students) + 3
-            
-            # Media clasei
-            class_avg = sum(student_overall_averages) / len(student_overall_averages)
-            class_sheet.write(stats_row, 0, "Statistici clasă:", header_format)
-            class_sheet.write(stats_row, 1, "Media clasei:")
-            class_sheet.write(stats_row, 2, class_avg, good_grade_format)
-            
-            # Calculează abaterea medie
-            mean_deviation = sum(abs(avg - class_avg) for avg in student_overall_averages) / len(student_overall_averages)
-            class_sheet.write(stats_row + 1, 1, "Abaterea medie:")
-            class_sheet.write(stats_row + 1, 2, mean_deviation)
-            
-            # Calculează abaterea standard
-            variance = sum((avg - class_avg) ** 2 for avg in student_overall_averages) / len(student_overall_averages)
-            std_deviation = variance ** 0.5  # Rădăcina pătrată a varianței
-            class_sheet.write(stats_row + 2, 1, "Abaterea standard:")
-            class_sheet.write(stats_row + 2, 2, std_deviation)
-    
-    # Crează sheet-uri individuale pentru fiecare elev cu toate notele
-    for student in students:
-        if student.grades:  # Doar pentru elevii care au note
-            # Creează sheet pentru elevul curent
-            student_sheet = workbook.add_worksheet(f'{student.name} ({student.class_name})')
-            
-            # Adaugă header pentru informații elev
-            student_sheet.write(0, 0, f'Elev: {student.name}')
-            student_sheet.write(1, 0, f'Clasa: {student.class_name}')
-            student_sheet.write(2, 0, f'Părinte: {student.parent_name}')
-            student_sheet.write(3, 0, f'Email: {student.parent_email}')
-            
-            # Setează lățimea coloanelor
-            student_sheet.set_column(0, 0, 5)   # Nr.
-            student_sheet.set_column(1, 1, 25)  # Materie
-            student_sheet.set_column(2, 2, 15)  # Notă
-            student_sheet.set_column(3, 3, 15)  # Data
-            
-            # Adaugă header pentru tabelul de note
-            note_headers = ['Nr.', 'Materie', 'Notă', 'Data']
-            row = 5  # Începe după informațiile despre elev
-            
-            for col, header in enumerate(note_headers):
-                student_sheet.write(row, col, header, header_format)
-            
-            # Grupează notele după materie
-            subject_grades = {}
-            for grade in student.grades:
-                if grade.subject_id not in subject_grades:
-                    subject_grades[grade.subject_id] = []
-                subject_grades[grade.subject_id].append(grade)
-            
-            # Numărător pentru rânduri
-            count = 1
-            row += 1
-            
-            # Pentru fiecare materie, afișează notele și calculează media
-            for subject_id, grades in subject_grades.items():
-                subject = Subject.query.get(subject_id)
-                
-                # Scrie fiecare notă
-                for grade in sorted(grades, key=lambda g: g.date, reverse=True):
-                    student_sheet.write(row, 0, count)
-                    student_sheet.write(row, 1, subject.name if subject else "Materie necunoscută")
-                    
-                    # Folosește formatul adecvat în funcție de valoarea notei
-                    if grade.value >= 8:
-                        student_sheet.write(row, 2, grade.value, good_grade_format)
-                    elif grade.value >= 5:
-                        student_sheet.write(row, 2, grade.value, average_grade_format)
-                    else:
-                        student_sheet.write(row, 2, grade.value, poor_grade_format)
-                    
-                    # Formatează data
-                    student_sheet.write(row, 3, grade.date, date_format)
-                    
-                    row += 1
-                    count += 1
-                
-                # Calculează și afișează media pentru materie
-                avg = sum(g.value for g in grades) / len(grades)
-                student_sheet.write(row, 0, '')
-                student_sheet.write(row, 1, f'Media la {subject.name if subject else "Materie necunoscută"}:')
-                
-                # Folosește formatul adecvat în funcție de valoarea mediei
-                if avg >= 8:
-                    student_sheet.write(row, 2, avg, good_grade_format)
-                elif avg >= 5:
-                    student_sheet.write(row, 2, avg, average_grade_format)
-                else:
-                    student_sheet.write(row, 2, avg, poor_grade_format)
-                
-                student_sheet.write(row, 3, '')
-                row += 1  # Lasă un rând liber între materii
-                row += 1
-            
-            # Calculează și afișează media generală
-            if subject_grades:
-                subject_averages = []
-                for subject_id, grades in subject_grades.items():
-                    avg = sum(g.value for g in grades) / len(grades)
-                    subject_averages.append(avg)
-                
-                overall_avg = sum(subject_averages) / len(subject_averages)
-                
-                # Folosim write în loc de merge_range pentru a evita erorile
-                student_sheet.write(row, 0, 'MEDIA GENERALĂ:')
-                student_sheet.write(row, 1, '')
-                
-                # Folosește formatul adecvat în funcție de valoarea mediei generale
-                if overall_avg >= 8:
-                    student_sheet.write(row, 2, overall_avg, good_grade_format)
-                elif overall_avg >= 5:
-                    student_sheet.write(row, 2, overall_avg, average_grade_format)
-                else:
-                    student_sheet.write(row, 2, overall_avg, poor_grade_format)
-                student_sheet.write(row, 3, '')
-    
-    # Închide workbook-ul
-    workbook.close()
-    
-    # Setează pointer-ul la început pentru a citi
-    output.seek(0)
-    
-    # Crează răspunsul
-    response = make_response(output.read())
-    response.headers["Content-Disposition"] = "attachment; filename=Situatie_Scolara.xlsx"
-    response.headers["Content-type"] = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    
-    return response
+@app.route('/export-excel')
+def export_excel():
+    # Workbook-ul este reconstruit doar dacă s-au schimbat datele; altfel se trimite fișierul
+    # din cache (transmis în bucăți, direct de pe disc) sau 304 dacă browserul îl are deja.
+    # La reconstruire, toate datele sunt citite și agregate o singură dată.
+    return send_cached_export(
+        'situatie_scolara',
+        export_data_fingerprint(),
+        lambda path: write_grade_workbook(path, load_export_dataset()),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        download_name="Situatie_Scolara.xlsx"
+    )
 
 @app.route('/student/<int:student_id>')
 def student_profile(student_id):
@@ -1333,49 +916,27 @@ def student_profile(student_id):
     # Obține elevii pentru meniul de navigare
     students, students_by_class = get_students_by_class()
     
-    # Calculează media elevului
+    # Mediile pe materii provin din tabela de agregate
+    stats = load_grade_stats([student.id])
+    
+    # Grupează notele elevului după materie
     student_grades = []
     subject_grades = {}
-    subject_sums = {}
-    subject_counts = {}
-    overall_sum = 0
-    overall_count = 0
     
     for grade in student.grades:
         student_grades.append(grade)
-        overall_sum += grade.value
-        overall_count += 1
         
-        # Grupează notele după materie
         if grade.subject_id not in subject_grades:
             subject_grades[grade.subject_id] = {
                 'name': grade.subject.name,
                 'grades': [],
-                'average': 0
+                'average': stats.subject_average(student.id, grade.subject_id) or 0
             }
-            subject_sums[grade.subject_id] = 0
-            subject_counts[grade.subject_id] = 0
         
         subject_grades[grade.subject_id]['grades'].append(grade)
-        subject_sums[grade.subject_id] += grade.value
-        subject_counts[grade.subject_id] += 1
-    
-    # Calculează media pentru fiecare materie
-    for subject_id in subject_grades:
-        if subject_counts[subject_id] > 0:
-            subject_grades[subject_id]['average'] = subject_sums[subject_id] / subject_counts[subject_id]
-    
-    # Calculează media generală corect (media mediilor pe materii)
-    subject_averages_sum = 0
-    subject_with_grades_count = 0
-    
-    for subject_id in subject_grades:
-        if subject_counts[subject_id] > 0:
-            subject_averages_sum += subject_grades[subject_id]['average']
-            subject_with_grades_count += 1
-            
+    
     # Media generală este media mediilor pe materii (nu media tuturor notelor)
-    student_average = subject_averages_sum / subject_with_grades_count if subject_with_grades_count > 0 else 0
+    student_average = stats.overall_average(student.id)
     
     return render_template('student_profile.html',
                           now=now,
@@ -1521,17 +1082,17 @@ def send_gdpr_forms_email():
     success_count = 0
     failure_count = 0
     
-    for student in students:
-        # Personalizăm formatul pentru fiecare părinte
-        html_content = generate_gdpr_form_html(student, form_template)
-        
-        # Pregătim subiectul emailului
-        subject = f"Informare GDPR - DiriginteSmart pentru {student.name}"
-        
-        # Adăugăm un text simplu pentru emailurile fără suport HTML
-        text_content = f"""INFORMARE PRIVIND PROTECȚIA DATELOR (GDPR)
+    # Configurarea email-ului din mediu sau din setări
+    email_user = os.environ.get('EMAIL_USER', '')
+    
+    # Un singur formular pentru fiecare părinte (adresă de email normalizată), cu toți copiii săi
+    families = group_students_by_parent(students)
+    
+    # Conținutul comun, cu marcaje completate de SendGrid pentru fiecare părinte
+    html_template = generate_gdpr_parent_form_html(GDPR_PARENT_NAME_TAG, GDPR_STUDENTS_LINE_TAG, form_template)
+    text_template = f"""INFORMARE PRIVIND PROTECȚIA DATELOR (GDPR)
         
-Stimate părinte/tutore al elevului {student.name},
+Stimate părinte/tutore al {GDPR_STUDENTS_TAG},
 
 Conform Regulamentului (UE) 2016/679 privind protecția persoanelor fizice în ceea ce privește prelucrarea datelor cu caracter personal (GDPR), vă informăm că datele dumneavoastră și ale copilului dumneavoastră sunt prelucrate în aplicația DiriginteSmart.
 
@@ -1539,45 +1100,64 @@ Vă rugăm să consultați documentul atașat pentru informații complete și pe
 
 
 """
+    
+    # Generăm PDF-urile cu formularele dacă este necesar (unul per părinte, randate în paralel, în memorie)
+    pdf_attachments = [None] * len(families)
+    if include_pdf:
+        pdf_forms = iter_gdpr_family_forms_pdf(families, form_template)
+        for i, (pdf_filename, pdf_bytes) in enumerate(pdf_forms):
+            if pdf_bytes is not None:
+                pdf_attachments[i] = encode_attachment(attachment_bytes=pdf_bytes, attachment_name=pdf_filename)
+    
+    recipients = []
+    for family, attachment in zip(families, pdf_attachments):
+        recipient = {
+            'students': family,
+            'to_email': family[0].parent_email.strip() if family[0].parent_email else '',
+            'subject': f"Informare GDPR - DiriginteSmart pentru {gdpr_student_names(family)}",
+            'substitutions': {
+                GDPR_STUDENTS_TAG: gdpr_students_text(family),
+                GDPR_STUDENTS_LINE_TAG: gdpr_students_line(family),
+                GDPR_PARENT_NAME_TAG: family[0].parent_name or ''
+            }
+        }
+        if attachment:
+            recipient['attachment'] = attachment
+        recipients.append(recipient)
+    
+    # Trimitem toate formularele în loturi SendGrid (un apel pentru până la 1000 de părinți);
+    # cele cu atașament sunt trimise individual, concurent
+    try:
+        sent = send_batch_with_sendgrid(
+            from_email=email_user,
+            recipients=[r for r in recipients if r['to_email']],
+            text_content=text_template,
+            html_content=html_template
+        )
+    except Exception as e:
+        logger.error(f"Eroare la trimiterea formularelor GDPR: {e}")
+        sent = [False] * len([r for r in recipients if r['to_email']])
+    sent_iter = iter(sent)
+    
+    for recipient in recipients:
+        family = recipient['students']
+        parent_email = family[0].parent_email
+        if recipient['to_email'] and next(sent_iter):
+            success_count += 1
+        else:
+            failure_count += 1
+            logger.info(f"Generăm PDF local pentru {parent_email}")
         
-        # Generăm un PDF cu formularul dacă este necesar
-        pdf_attachment = None
-        if include_pdf:
-            pdf_success, pdf_path = generate_gdpr_form_pdf(student, form_template)
-            if pdf_success:
-                pdf_attachment = pdf_path
-        
-        # Trimitem emailul
+        # Salvăm o copie locală a notificării
         try:
-            # Configurarea email-ului din mediu sau din setări
-            email_user = os.environ.get('EMAIL_USER', '')
-            
-            # Folosim direct Brevo API pentru a trimite emailuri (configurat în Replit)
-            from utils.email_sender import send_with_brevo
-            if send_with_brevo(
-                from_email=email_user, 
-                to_email=student.parent_email, 
-                subject=subject, 
-                text_content=text_content, 
-                html_content=html_content
-            ):
-                success_count += 1
-            else:
-                failure_count += 1
-                # Generăm PDF local pentru backup
-                logger.info(f"Generăm PDF local pentru {student.parent_email}")
-                    
-            # Salvăm o copie locală a notificării
             save_notification(
                 from_email=email_user,
-                to_email=student.parent_email,
-                subject=subject,
-                content=html_content
+                to_email=parent_email,
+                subject=recipient['subject'],
+                content=generate_gdpr_family_form_html(family, form_template)
             )
-            
         except Exception as e:
-            logger.error(f"Eroare la trimiterea formularului GDPR către {student.parent_email}: {e}")
-            failure_count += 1
+            logger.error(f"Eroare la salvarea formularului GDPR pentru {parent_email}: {e}")
     
     # Afișăm un mesaj cu rezultatele
     if success_count > 0:
@@ -1592,41 +1172,25 @@ def generate_gdpr_forms_pdf():
     """Generează formulare PDF pentru toți părinții pentru print"""
     include_signature = 'include_signature_field' in request.form
     
-    # Obținem toți elevii
-    students = Student.query.all()
-    
     # Încărcăm șablonul formularului
     form_template = load_gdpr_form_template()
     
-    # Creăm un director temporar pentru PDF-uri
-    temp_dir = tempfile.mkdtemp()
-    
-    # Creăm un arhivă ZIP pentru toate PDF-urile
-    import zipfile
-    zip_filename = os.path.join(temp_dir, 'formulare_gdpr.zip')
+    def generate_zip():
+        # PDF-urile sunt randate în paralel, în memorie; fiecare intră în arhivă imediat ce este gata
+        students = Student.query.all()
+        return stream_zip(iter_gdpr_forms_pdf(students, form_template, include_signature=include_signature))
     
-    with zipfile.ZipFile(zip_filename, 'w') as zipf:
-        for student in students:
-            # Generăm PDF pentru fiecare student
-            pdf_success, pdf_path = generate_gdpr_form_pdf(
-                student, 
-                form_template, 
-                include_signature=include_signature
-            )
-            
-            if pdf_success:
-                # Adăugăm PDF-ul la arhiva ZIP
-                pdf_filename = os.path.basename(pdf_path)
-                zipf.write(pdf_path, pdf_filename)
-    
-    # Pregătim răspunsul pentru download
-    with open(zip_filename, 'rb') as f:
-        response = make_response(f.read())
-        
-    response.headers.set('Content-Type', 'application/zip')
-    response.headers.set('Content-Disposition', 'attachment; filename=formulare_gdpr.zip')
-    
-    return response
+    # Arhiva depinde și de șablon, de opțiunea de semnătură și de data tipărită pe formulare
+    fingerprint = export_data_fingerprint(
+        json.dumps(form_template, sort_keys=True), include_signature, datetime.date.today()
+    )
+    return stream_cached_export(
+        'formulare_gdpr',
+        fingerprint,
+        generate_zip,
+        mimetype='application/zip',
+        download_name='formulare_gdpr.zip'
+    )
 
 @app.route('/gdpr/save', methods=['POST'])
 def save_gdpr_settings():
@@ -1702,7 +1266,8 @@ def gdpr_export_data_post():
         
         export_data['grades'] = grades_data
     
-    # Generăm fișierul în formatul solicitat
+    # Generăm fișierul în formatul solicitat, direct în memorie: exporturile cu date personale
+    # ale unui elev nu sunt păstrate pe disc (nu trebuie să supraviețuiască unei cereri de ștergere)
     if export_format == 'json':
         filename, file_data = export_as_json(export_data)
         mimetype = 'application/json'
@@ -1710,11 +1275,9 @@ def gdpr_export_data_post():
         filename, file_data = export_as_csv(export_data)
         mimetype = 'text/csv'
     
-    # Creăm răspunsul pentru download
-    response = make_response(file_data)
-    response.headers.set('Content-Type', mimetype)
-    response.headers.set('Content-Disposition', f'attachment; filename={filename}')
-    
+    response = Response(file_data, mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    response.headers.set('Cache-Control', 'no-store')
     return response
 
 @app.route('/gdpr/delete')
@@ -1771,6 +1334,9 @@ def gdpr_delete_data_post():
         # Commit schimbările
         db.session.commit()
         
+        # Exporturile GDPR ale elevului rămase în cache de la versiunile anterioare
+        export_cache.remove_matching(f'gdpr_export_{subject_id}_')
+        
         flash('Datele au fost procesate conform solicitării GDPR.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1810,6 +1376,7 @@ def add_reminder():
     db.session.add(reminder)
     db.session.commit()
     
+    reminder_scheduler.wake()
     flash(f'Reminder "{title}" a fost adăugat cu succes!', 'success')
     return redirect(url_for('reminders'))
 
@@ -1833,6 +1400,7 @@ def update_reminder(reminder_id):
     
     db.session.commit()
     
+    reminder_scheduler.wake()
     flash(f'Reminder "{reminder.title}" a fost actualizat cu succes!', 'success')
     return redirect(url_for('reminders'))
     
@@ -1843,6 +1411,8 @@ def toggle_reminder(reminder_id):
     reminder.active = not reminder.active
     db.session.commit()
     
+    reminder_scheduler.wake()
+    
     status = "activat" if reminder.active else "dezactivat"
     flash(f'Reminder "{reminder.title}" a fost {status}!', 'success')
     return redirect(url_for('reminders'))
@@ -1856,5 +1426,26 @@ def delete_reminder(reminder_id):
     db.session.delete(reminder)
     db.session.commit()
     
+    reminder_scheduler.wake()
     flash(f'Reminder "{title}" a fost șters cu succes!', 'success')
-    return redirect(url_for('reminders'))
\ No newline at end of file
+    return redirect(url_for('reminders'))
+
+
+@app.cli.command('import-grades')
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Rânduri per tranzacție')
+def import_grades_command(csv_file, batch_size):
+    """Importă notele dintr-un fișier CSV (NumeElev,Clasa,Materie,Nota,Data,NumeParinte,EmailParinte)"""
+    try:
+        report = import_grades_csv(csv_file, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    click.echo(
+        f"Importate {report['grades_imported']} note din {report['rows_read']} rânduri "
+        f"({report['rows_skipped']} ignorate) în {report['seconds']} s - {report['rows_per_second']} rânduri/s"
+    )
+    click.echo(
+        f"Elevi noi: {report['students_created']}, elevi actualizați: {report['students_updated']}, "
+        f"materii noi: {report['subjects_created']}, loturi: {report['batches']}"
+    )
@@ -0,0 +1,173 @@
+"""
+Benchmark pentru indecșii compuși de pe Grade și Student.
+
+Construiește un set de date sintetic (implicit 1.000.000 de note) într-o bază de date separată,
+apoi rulează interogările frecvente ale aplicației fără indecși și cu indecși, afișând pentru
+fiecare planul de execuție și latența (mediana din mai multe rulări).
+
+Rulare (din directorul proiectului):
+    python benchmarks/index_benchmark.py
+    python benchmarks/index_benchmark.py --grades 200000 --database sqlite:////tmp/bench.db
+
+Atenție: baza de date dată cu --database este folosită ca atare; nu rulați pe baza de producție.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+import statistics
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark pentru indecșii de pe Grade și Student')
+    parser.add_argument('--grades', type=int, default=1_000_000, help='Numărul de note generate')
+    parser.add_argument('--students', type=int, default=10_000, help='Numărul de elevi generați')
+    parser.add_argument('--database', default=None,
+                        help='URL-ul bazei de date (implicit o bază SQLite temporară)')
+    parser.add_argument('--repeat', type=int, default=20, help='Rulări pentru fiecare interogare')
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.database is None:
+    args.database = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='index_benchmark_'), 'bench.db')}"
+
+# Aplicația își citește baza de date din mediu la import
+os.environ['SQLALCHEMY_DATABASE_URI'] = args.database
+os.environ.setdefault('SESSION_SECRET', 'index-benchmark')
+
+from sqlalchemy import select, insert, func, text  # noqa: E402
+
+from app import app, db  # noqa: E402
+from models import Student, Subject, Grade  # noqa: E402
+
+BATCH_SIZE = 20_000
+
+# Indecșii măsurați (declarați în models.py și creați de migrarea corespunzătoare)
+INDEXES = [index for table in (Grade.__table__, Student.__table__) for index in table.indexes]
+
+
+def populate(connection, n_students, n_grades):
+    """Generează elevii și notele (o singură dată, dacă baza de date este goală)"""
+    if connection.execute(select(func.count()).select_from(Grade.__table__)).scalar() >= n_grades:
+        return
+
+    rng = random.Random(42)
+    classes = [f"{year}{letter}" for year in range(5, 13) for letter in 'ABCD']
+    now = datetime.datetime.utcnow()
+
+    students = [
+        {
+            'name': f"Elev {i:06d}",
+            'class_name': rng.choice(classes),
+            'parent_name': f"Parinte {i // 2:06d}",
+            'parent_email': f"parinte{i // 2:06d}@example.com",
+            'created_at': now,
+            'updated_at': now
+        }
+        for i in range(n_students)
+    ]
+    connection.execute(insert(Student.__table__), students)
+
+    student_ids = connection.execute(select(Student.id)).scalars().all()
+    subject_ids = connection.execute(select(Subject.id)).scalars().all()
+    start_date = datetime.date(2024, 9, 1)
+
+    for start in range(0, n_grades, BATCH_SIZE):
+        connection.execute(insert(Grade.__table__), [
+            {
+                'student_id': rng.choice(student_ids),
+                'subject_id': rng.choice(subject_ids),
+                'value': rng.randint(1, 10),
+                'date': start_date + datetime.timedelta(days=rng.randrange(280)),
+                'created_at': now
+            }
+            for _ in range(min(BATCH_SIZE, n_grades - start))
+        ])
+        print(f"  {min(start + BATCH_SIZE, n_grades)} / {n_grades} note", end='\r', flush=True)
+    print()
+
+
+def hot_queries(connection):
+    """Interogările frecvente ale aplicației, cu parametri luați din date"""
+    student_id, subject_id = connection.execute(
+        select(Grade.student_id, Grade.subject_id).order_by(Grade.id).limit(1)
+    ).one()
+    parent_email = connection.execute(select(Student.parent_email).limit(1)).scalar()
+
+    return {
+        'note elev + materie, după dată': select(Grade).where(
+            Grade.student_id == student_id, Grade.subject_id == subject_id
+        ).order_by(Grade.date.desc()),
+        'note materie, după dată': select(Grade).where(Grade.subject_id == subject_id).order_by(Grade.date.desc()),
+        'note elev (toate materiile)': select(Grade).where(Grade.student_id == student_id),
+        'lista elevilor (clasă, nume)': select(Student).order_by(Student.class_name, Student.name),
+        'elevii unui părinte': select(Student).where(Student.parent_email == parent_email),
+    }
+
+
+def explain(connection, statement):
+    sql = str(statement.compile(connection, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}")).all()]
+
+
+def measure(connection, statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_queries(connection, queries, repeat):
+    results = {}
+    for label, statement in queries.items():
+        results[label] = (explain(connection, statement), measure(connection, statement, repeat))
+    return results
+
+
+def main():
+    print(f"Baza de date: {args.database}")
+    with app.app_context():
+        engine = db.engine
+
+        with engine.begin() as connection:
+            print(f"Generăm datele ({args.students} elevi, {args.grades} note)...")
+            populate(connection, args.students, args.grades)
+
+        with engine.begin() as connection:
+            for index in INDEXES:
+                index.drop(connection, checkfirst=True)
+            connection.execute(text('ANALYZE'))
+        with engine.connect() as connection:
+            queries = hot_queries(connection)
+            before = run_queries(connection, queries, args.repeat)
+
+        with engine.begin() as connection:
+            for index in INDEXES:
+                index.create(connection, checkfirst=True)
+            connection.execute(text('ANALYZE'))
+        with engine.connect() as connection:
+            after = run_queries(connection, queries, args.repeat)
+
+    for label in queries:
+        plan_before, ms_before = before[label]
+        plan_after, ms_after = after[label]
+        print(f"\n{label}")
+        print(f"  fără indecși: {ms_before:9.2f} ms   | {' / '.join(plan_before)}")
+        print(f"  cu indecși:   {ms_after:9.2f} ms   | {' / '.join(plan_after)}")
+        if ms_after:
+            print(f"  accelerare:   {ms_before / ms_after:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Importul notelor dintr-un fișier CSV (formatul NumeElev,Clasa,Materie,Nota,Data,NumeParinte,EmailParinte).
+
+Fișierul este citit în flux și procesat pe loturi, fiecare lot într-o singură tranzacție:
+- elevii sunt identificați după (nume, clasă): cei noi sunt inserați, iar la cei existenți
+  sunt actualizate datele părintelui dacă s-au schimbat;
+- materiile sunt găsite după nume (fără a ține cont de majuscule), iar cele noi sunt create;
+- notele sunt inserate în bloc (INSERT cu mai multe rânduri), apoi sunt adăugate la
+  agregatele perechilor (elev, materie) atinse de lot.
+Rulare: flask import-grades fisier.csv
+"""
+import os
+import time
+import logging
+import datetime
+import functools
+
+from sqlalchemy import select, insert, update, bindparam
+
+from app import db
+from models import (
+    Student, Subject, Grade, merge_grade_aggregates, bump_cache_version, ROSTER_CACHE, GRADES_CACHE,
+    SUBJECTS_CACHE
+)
+from utils.csv_processor import read_csv_rows
+
+logger = logging.getLogger(__name__)
+
+# Numărul de rânduri CSV procesate într-o tranzacție
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+
+# Formatele acceptate pentru coloana Data
+IMPORT_DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d-%m-%Y', '%d/%m/%Y')
+
+
+def parse_grade_date(value):
+    """Data unei note din CSV (azi, dacă lipsește); None dacă formatul nu este recunoscut"""
+    if not value:
+        return datetime.date.today()
+    return _parse_date(value)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(value):
+    # Într-un fișier mare aceleași date se repetă: strptime rulează o singură dată pentru fiecare
+    for date_format in IMPORT_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+class GradeImporter:
+    """
+    Importul pe loturi; păstrează în memorie ID-urile elevilor și materiilor deja cunoscute,
+    astfel încât fiecare elev și fiecare materie sunt căutați o singură dată
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = max(batch_size, 1)
+        students = Student.__table__
+        subjects = Subject.__table__
+        with db.engine.connect() as connection:
+            # (nume, clasă) -> [id, nume părinte, email părinte]
+            self.students = {
+                (name, class_name): [student_id, parent_name, parent_email]
+                for student_id, name, class_name, parent_name, parent_email in connection.execute(select(
+                    students.c.id, students.c.name, students.c.class_name, students.c.parent_name, students.c.parent_email
+                ))
+            }
+            # nume materie (casefold) -> id
+            self.subjects = {
+                name.casefold(): subject_id
+                for subject_id, name in connection.execute(select(subjects.c.id, subjects.c.name))
+            }
+        self.report = {
+            'rows_read': 0,
+            'grades_imported': 0,
+            'rows_skipped': 0,
+            'students_created': 0,
+            'students_updated': 0,
+            'subjects_created': 0,
+            'batches': 0,
+            'seconds': 0.0,
+            'rows_per_second': 0.0
+        }
+
+    def _valid_rows(self, rows):
+        """Rândurile cu date complete și valide, ca (elev, materie, notă, dată, părinte, email)"""
+        for row in rows:
+            self.report['rows_read'] += 1
+            student_name, class_name, subject_name = row['NumeElev'], row['Clasa'], row['Materie']
+            try:
+                value = float(row['Nota'].replace(',', '.'))
+            except ValueError:
+                value = None
+            date = parse_grade_date(row['Data'])
+
+            if not student_name or not class_name or not subject_name or value is None or date is None \
+                    or value < 1 or value > 10:
+                self.report['rows_skipped'] += 1
+                logger.warning(f"Rând ignorat la import (rândul {self.report['rows_read']}): {row}")
+                continue
+
+            yield (student_name, class_name), subject_name, value, date, row['NumeParinte'], row['EmailParinte']
+
+    def _resolve_students(self, connection, batch):
+        table = Student.__table__
+        new_students = {}
+        changed = {}
+        for key, _, _, _, parent_name, parent_email in batch:
+            known = self.students.get(key)
+            if known is None:
+                new_students.setdefault(key, (parent_name, parent_email))
+            elif (parent_name or parent_email) and (parent_name, parent_email) != (known[1], known[2]):
+                changed[key] = (parent_name or known[1], parent_email or known[2])
+
+        if new_students:
+            now = datetime.datetime.utcnow()
+            created = connection.execute(
+                insert(table).returning(table.c.id, table.c.name, table.c.class_name),
+                [
+                    {'name': name, 'class_name': class_name, 'parent_name': parent_name, 'parent_email': parent_email,
+                     'created_at': now, 'updated_at': now}
+                    for (name, class_name), (parent_name, parent_email) in new_students.items()
+                ]
+            )
+            for student_id, name, class_name in created:
+                parent_name, parent_email = new_students[(name, class_name)]
+                self.students[(name, class_name)] = [student_id, parent_name, parent_email]
+            self.report['students_created'] += len(new_students)
+
+        if changed:
+            connection.execute(
+                update(table).where(table.c.id == bindparam('student_id')).values(
+                    parent_name=bindparam('new_parent_name'),
+                    parent_email=bindparam('new_parent_email'),
+                    updated_at=datetime.datetime.utcnow()
+                ),
+                [
+                    {'student_id': self.students[key][0], 'new_parent_name': parent_name, 'new_parent_email': parent_email}
+                    for key, (parent_name, parent_email) in changed.items()
+                ]
+            )
+            for key, (parent_name, parent_email) in changed.items():
+                self.students[key][1:] = [parent_name, parent_email]
+            self.report['students_updated'] += len(changed)
+
+        if new_students or changed:
+            bump_cache_version(connection, ROSTER_CACHE)
+
+    def _resolve_subjects(self, connection, batch):
+        table = Subject.__table__
+        new_subjects = {}
+        for _, subject_name, _, _, _, _ in batch:
+            if subject_name.casefold() not in self.subjects:
+                new_subjects.setdefault(subject_name.casefold(), subject_name)
+
+        if new_subjects:
+            created = connection.execute(
+                insert(table).returning(table.c.id, table.c.name),
+                [{'name': name} for name in new_subjects.values()]
+            )
+            for subject_id, name in created:
+                self.subjects[name.casefold()] = subject_id
+            self.report['subjects_created'] += len(new_subjects)
+            bump_cache_version(connection, SUBJECTS_CACHE)
+
+    def _import_batch(self, batch):
+        started = time.perf_counter()
+
+        # O tranzacție pentru fiecare lot: un lot eșuat nu lasă note parțiale
+        with db.engine.begin() as connection:
+            self._resolve_students(connection, batch)
+            self._resolve_subjects(connection, batch)
+
+            now = datetime.datetime.utcnow()
+            grades = [
+                {
+                    'student_id': self.students[key][0],
+                    'subject_id': self.subjects[subject_name.casefold()],
+                    'value': value,
+                    'date': date,
+                    'created_at': now
+                }
+                for key, subject_name, value, date, _, _ in batch
+            ]
+            # executemany: SQLAlchemy trimite rândurile ca INSERT-uri cu mai multe rânduri (VALUES ...)
+            connection.execute(insert(Grade.__table__), grades)
+
+            # Inserările în bloc ocolesc evenimentele ORM: actualizăm agregatele explicit
+            merge_grade_aggregates(connection, grades)
+            bump_cache_version(connection, GRADES_CACHE)
+
+        elapsed = time.perf_counter() - started
+        self.report['batches'] += 1
+        self.report['grades_imported'] += len(grades)
+        logger.info(
+            f"Lot {self.report['batches']}: {len(grades)} note în {elapsed:.2f} s "
+            f"({len(grades) / elapsed if elapsed else 0:.0f} note/s)"
+        )
+
+    def run(self, csv_file_path):
+        """
+        Importă fișierul CSV
+
+        Returns:
+            dict: Raportul importului (rânduri citite, note importate, rânduri ignorate,
+                elevi creați/actualizați, materii create, durată și rânduri pe secundă)
+        """
+        started = time.perf_counter()
+
+        batch = []
+        for row in self._valid_rows(read_csv_rows(csv_file_path)):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+
+        self.report['seconds'] = round(time.perf_counter() - started, 3)
+        if self.report['seconds']:
+            self.report['rows_per_second'] = round(self.report['rows_read'] / self.report['seconds'], 1)
+        return self.report
+
+
+def import_grades_csv(csv_file_path, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Importă notele dintr-un fișier CSV în baza de date (vezi GradeImporter)
+
+    Raises:
+        ValueError: Dacă fișierul nu are coloanele necesare
+    """
+    report = GradeImporter(batch_size).run(csv_file_path)
+    logger.info(
+        f"Import finalizat: {report['grades_imported']} note din {report['rows_read']} rânduri "
+        f"în {report['seconds']} s ({report['rows_per_second']} rânduri/s)"
+    )
+    return report
@@ -1,6 +1,11 @@
 from app import app  # Import Flask app
 
 if __name__ == "__main__":
+    # Aplicăm migrările bazei de date (de ex. coloanele adăugate tabelelor existente)
+    from flask_migrate import upgrade
+    with app.app_context():
+        upgrade()
+
     # Rulează aplicația în modul de dezvoltare
     print("Server starting at: http://0.0.0.0:5000")
     app.run(host="0.0.0.0", port=5000, debug=True)
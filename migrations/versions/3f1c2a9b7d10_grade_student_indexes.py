@@ -0,0 +1,33 @@
+"""Indecși compuși pentru interogările frecvente pe Grade și Student
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-18 16:00:00.000000
+
+Tabelele sunt create de db.create_all() la pornire, așa că indecșii pot exista deja
+(baze noi) sau pot lipsi (baze create înainte de această versiune): migrarea îi creează
+doar dacă lipsesc.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_grade_student_subject_date', 'grade', ['student_id', 'subject_id', 'date'], if_not_exists=True)
+    op.create_index('ix_grade_subject_date', 'grade', ['subject_id', 'date'], if_not_exists=True)
+    op.create_index('ix_student_class_name_name', 'student', ['class_name', 'name'], if_not_exists=True)
+    op.create_index('ix_student_parent_email', 'student', ['parent_email'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_student_parent_email', table_name='student', if_exists=True)
+    op.drop_index('ix_student_class_name_name', table_name='student', if_exists=True)
+    op.drop_index('ix_grade_subject_date', table_name='grade', if_exists=True)
+    op.drop_index('ix_grade_student_subject_date', table_name='grade', if_exists=True)
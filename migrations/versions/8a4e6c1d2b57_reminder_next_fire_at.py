@@ -0,0 +1,33 @@
+"""Momentul următoarei declanșări a reminderelor (next_fire_at), indexat
+
+Revision ID: 8a4e6c1d2b57
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 17:00:00.000000
+
+Valorile sunt completate de planificator la pornire, pentru reminderele active care nu au încă
+next_fire_at.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6c1d2b57'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('reminder')}
+    if 'next_fire_at' not in columns:
+        op.add_column('reminder', sa.Column('next_fire_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_reminder_next_fire_at', 'reminder', ['next_fire_at'], if_not_exists=True)
+    op.create_index('ix_reminder_last_triggered', 'reminder', ['last_triggered'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_reminder_last_triggered', table_name='reminder', if_exists=True)
+    op.drop_index('ix_reminder_next_fire_at', table_name='reminder', if_exists=True)
+    with op.batch_alter_table('reminder') as batch_op:
+        batch_op.drop_column('next_fire_at')
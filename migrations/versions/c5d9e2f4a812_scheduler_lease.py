@@ -0,0 +1,31 @@
+"""Tabela scheduler_lease pentru declanșarea reminderelor de un singur worker
+
+Revision ID: c5d9e2f4a812
+Revises: 8a4e6c1d2b57
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d9e2f4a812'
+down_revision = '8a4e6c1d2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'scheduler_lease',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('holder', sa.String(length=120), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_lease', if_exists=True)
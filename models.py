@@ -1,5 +1,11 @@
 from app import db
 from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, insert, update, delete, tuple_, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from utils.grade_stats import GradeStats
 
 class Student(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,6 +19,12 @@ class Student(db.Model):
     # Relație one-to-many cu Grade
     grades = db.relationship('Grade', backref='student', lazy=True, cascade="all, delete-orphan")
     
+    # Lista de elevi este mereu ordonată după clasă și nume; părinții sunt grupați după email
+    __table_args__ = (
+        db.Index('ix_student_class_name_name', 'class_name', 'name'),
+        db.Index('ix_student_parent_email', 'parent_email'),
+    )
+    
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -45,6 +57,12 @@ class Grade(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Notele sunt căutate după elev și materie (sau doar după materie) și ordonate după dată
+    __table_args__ = (
+        db.Index('ix_grade_student_subject_date', 'student_id', 'subject_id', 'date'),
+        db.Index('ix_grade_subject_date', 'subject_id', 'date'),
+    )
+    
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -53,6 +71,403 @@ class Grade(db.Model):
         return f"<Grade {self.value} for Student ID {self.student_id} in Subject ID {self.subject_id}>"
 
 
+class GradeAggregate(db.Model):
+    """Agregate pe (elev, materie), întreținute la fiecare modificare a notelor
+    
+    Tabela este derivată din Grade și poate fi reconstruită oricând cu
+    rebuild_grade_aggregates(); nu are chei străine pentru a nu bloca ștergerile.
+    """
+    __tablename__ = 'grade_aggregate'
+    
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    subject_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    
+    grade_sum = db.Column(db.Float, nullable=False, default=0.0)
+    grade_count = db.Column(db.Integer, nullable=False, default=0)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    last_date = db.Column(db.Date, nullable=True)
+    
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+    
+    def __repr__(self):
+        return f"<GradeAggregate Student ID {self.student_id} Subject ID {self.subject_id}: {self.grade_count} note>"
+    
+    @property
+    def average(self):
+        """Media notelor la materie (0 dacă nu există note)"""
+        if not self.grade_count:
+            return 0
+        return self.grade_sum / self.grade_count
+
+
+# Numărul maxim de perechi (elev, materie) recalculate într-o singură instrucțiune
+AGGREGATE_CHUNK_SIZE = 500
+
+def _aggregate_select():
+    """SELECT-ul care calculează agregatele direct din tabela Grade"""
+    return select(
+        Grade.student_id,
+        Grade.subject_id,
+        func.sum(Grade.value),
+        func.count(Grade.id),
+        func.min(Grade.value),
+        func.max(Grade.value),
+        func.max(Grade.date)
+    ).group_by(Grade.student_id, Grade.subject_id)
+
+_AGGREGATE_COLUMNS = ['student_id', 'subject_id', 'grade_sum', 'grade_count', 'min_value', 'max_value', 'last_date']
+
+def refresh_grade_aggregates(connection, pairs):
+    """Recalculează agregatele doar pentru perechile (student_id, subject_id) date
+    
+    Args:
+        connection: Conexiunea (sau sesiunea) pe care rulează actualizarea
+        pairs: Colecție de tupluri (student_id, subject_id) afectate
+    """
+    pairs = sorted(set(p for p in pairs if p[0] is not None and p[1] is not None))
+    table = GradeAggregate.__table__
+    key = tuple_(table.c.student_id, table.c.subject_id)
+    grade_key = tuple_(Grade.student_id, Grade.subject_id)
+    
+    for start in range(0, len(pairs), AGGREGATE_CHUNK_SIZE):
+        chunk = pairs[start:start + AGGREGATE_CHUNK_SIZE]
+        connection.execute(delete(table).where(key.in_(chunk)))
+        connection.execute(
+            insert(table).from_select(_AGGREGATE_COLUMNS, _aggregate_select().where(grade_key.in_(chunk)))
+        )
+
+def merge_grade_aggregates(connection, grades):
+    """Adaugă la agregate notele tocmai inserate, fără a recalcula perechile din tabela Grade
+    
+    Folosit la importurile în bloc: citește doar rândurile de agregat ale perechilor atinse
+    (după cheia primară) și le combină cu notele noi.
+    
+    Rândurile existente sunt blocate (SELECT ... FOR UPDATE pe PostgreSQL; SQLite blochează
+    oricum toată baza de date la scriere) și actualizate pe loc, așa că o editare de note din
+    aplicație pe aceeași pereche așteaptă sfârșitul lotului și recalculează apoi agregatul
+    corect. O pereche fără agregat creată simultan de o editare poate încă provoca un conflict
+    de cheie primară: lotul eșuează și este anulat, fără date pierdute. Pentru importuri mari
+    rulați importul când nu se editează note.
+    
+    Args:
+        connection: Conexiunea pe care rulează actualizarea
+        grades: Dicționare cu cheile student_id, subject_id, value și date ale notelor inserate
+    """
+    merged = {}
+    for grade in grades:
+        pair = (grade['student_id'], grade['subject_id'])
+        value, date = grade['value'], grade['date']
+        current = merged.get(pair)
+        if current is None:
+            merged[pair] = [value, 1, value, value, date]
+        else:
+            current[0] += value
+            current[1] += 1
+            current[2] = min(current[2], value)
+            current[3] = max(current[3], value)
+            if date is not None and (current[4] is None or date > current[4]):
+                current[4] = date
+    
+    pairs = sorted(merged)
+    table = GradeAggregate.__table__
+    key = tuple_(table.c.student_id, table.c.subject_id)
+    
+    for start in range(0, len(pairs), AGGREGATE_CHUNK_SIZE):
+        chunk = pairs[start:start + AGGREGATE_CHUNK_SIZE]
+        existing = connection.execute(
+            select(*(table.c[name] for name in _AGGREGATE_COLUMNS)).where(key.in_(chunk)).with_for_update()
+        )
+        found = set()
+        for student_id, subject_id, grade_sum, grade_count, min_value, max_value, last_date in existing:
+            current = merged[(student_id, subject_id)]
+            current[0] += grade_sum
+            current[1] += grade_count
+            if min_value is not None:
+                current[2] = min(current[2], min_value)
+            if max_value is not None:
+                current[3] = max(current[3], max_value)
+            if last_date is not None and (current[4] is None or last_date > current[4]):
+                current[4] = last_date
+            found.add((student_id, subject_id))
+        
+        if found:
+            connection.execute(
+                update(table).where(
+                    table.c.student_id == bindparam('pair_student_id'),
+                    table.c.subject_id == bindparam('pair_subject_id')
+                ).values(
+                    grade_sum=bindparam('new_grade_sum'),
+                    grade_count=bindparam('new_grade_count'),
+                    min_value=bindparam('new_min_value'),
+                    max_value=bindparam('new_max_value'),
+                    last_date=bindparam('new_last_date')
+                ),
+                [
+                    dict(zip(
+                        ('pair_student_id', 'pair_subject_id', 'new_grade_sum', 'new_grade_count',
+                         'new_min_value', 'new_max_value', 'new_last_date'),
+                        (student_id, subject_id, *merged[(student_id, subject_id)])
+                    ))
+                    for student_id, subject_id in chunk if (student_id, subject_id) in found
+                ]
+            )
+        
+        missing = [pair for pair in chunk if pair not in found]
+        if missing:
+            connection.execute(insert(table), [
+                dict(zip(_AGGREGATE_COLUMNS, (student_id, subject_id, *merged[(student_id, subject_id)])))
+                for student_id, subject_id in missing
+            ])
+
+def rebuild_grade_aggregates(connection):
+    """Reconstruiește complet tabela de agregate din notele existente"""
+    table = GradeAggregate.__table__
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select(_AGGREGATE_COLUMNS, _aggregate_select()))
+
+def load_grade_stats(student_ids=None):
+    """Returnează statisticile (GradeStats) calculate din tabela de agregate"""
+    query = db.session.query(
+        GradeAggregate.student_id,
+        GradeAggregate.subject_id,
+        GradeAggregate.grade_sum,
+        GradeAggregate.grade_count
+    )
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        # Pentru liste mari citim toată tabela (mai ieftin decât multe clauze IN)
+        if len(student_ids) <= AGGREGATE_CHUNK_SIZE:
+            query = query.filter(GradeAggregate.student_id.in_(student_ids))
+    
+    return GradeStats.from_aggregates(query.all())
+
+def _grade_pairs(grade):
+    """Perechile (elev, materie) atinse de o notă, inclusiv valorile dinaintea editării"""
+    student_history = get_history(grade, 'student_id')
+    subject_history = get_history(grade, 'subject_id')
+    student_ids = set(student_history.sum()) or {grade.student_id}
+    subject_ids = set(subject_history.sum()) or {grade.subject_id}
+    return {(student_id, subject_id) for student_id in student_ids for subject_id in subject_ids}
+
+@event.listens_for(Session, 'after_flush')
+def _update_grade_aggregates(session, flush_context):
+    """Actualizează agregatele pentru notele adăugate, editate sau șterse în acest flush"""
+    pairs = set()
+    for obj in session.new:
+        if isinstance(obj, Grade):
+            pairs |= _grade_pairs(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Grade):
+            pairs |= _grade_pairs(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Grade) and session.is_modified(obj):
+            pairs |= _grade_pairs(obj)
+    
+    if pairs:
+        refresh_grade_aggregates(session.connection(), pairs)
+        # Notele editate nu schimbă `created_at`: exporturile sunt invalidate prin contor
+        bump_cache_version(session.connection(), GRADES_CACHE)
+
+
+class CacheVersion(db.Model):
+    """Contoare de versiune pentru invalidarea cache-urilor locale ale fiecărui worker"""
+    __tablename__ = 'cache_version'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+    
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
+
+# Numele contorului pentru lista de elevi din bara de navigare
+ROSTER_CACHE = 'roster'
+
+# Contoarele pentru note și materii (amprenta exporturilor)
+GRADES_CACHE = 'grades'
+SUBJECTS_CACHE = 'subjects'
+
+def bump_cache_version(connection, name):
+    """Incrementează contorul de versiune (îl creează dacă nu există)"""
+    table = CacheVersion.__table__
+    result = connection.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(name=name, version=1))
+
+def get_cache_version(connection, name):
+    """Citește versiunea curentă a unui contor (0 dacă nu există)"""
+    table = CacheVersion.__table__
+    version = connection.execute(select(table.c.version).where(table.c.name == name)).scalar()
+    return version or 0
+
+@event.listens_for(Student, 'after_insert')
+@event.listens_for(Student, 'after_update')
+@event.listens_for(Student, 'after_delete')
+def _bump_roster_version(mapper, connection, target):
+    """Invalidează cache-ul listei de elevi la orice modificare a unui elev"""
+    bump_cache_version(connection, ROSTER_CACHE)
+
+@event.listens_for(Subject, 'after_insert')
+@event.listens_for(Subject, 'after_update')
+@event.listens_for(Subject, 'after_delete')
+def _bump_subjects_version(mapper, connection, target):
+    """Invalidează exporturile la orice modificare a unei materii (numele apar în exporturi)"""
+    bump_cache_version(connection, SUBJECTS_CACHE)
+
+
+
+class SchedulerLease(db.Model):
+    """Lease (închiriere cu expirare) pentru sarcinile care trebuie rulate de un singur worker"""
+    __tablename__ = 'scheduler_lease'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+    
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} ({self.holder} până la {self.expires_at})>"
+
+# Numele lease-ului pentru planificatorul reminderelor
+REMINDER_LEASE = 'reminders'
+
+def acquire_lease(connection, name, holder, ttl_seconds):
+    """
+    Obține sau prelungește un lease; reușește doar dacă lease-ul este liber, expirat
+    sau deținut deja de `holder` (UPDATE condiționat, atomic și între procese)
+    
+    Returns:
+        bool: True dacă `holder` deține lease-ul pentru următoarele `ttl_seconds` secunde
+    """
+    table = SchedulerLease.__table__
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    result = connection.execute(
+        update(table)
+        .where(table.c.name == name, (table.c.holder == holder) | (table.c.expires_at < now))
+        .values(holder=holder, expires_at=expires_at)
+    )
+    if result.rowcount:
+        return True
+    
+    if connection.execute(select(table.c.name).where(table.c.name == name)).first() is not None:
+        return False
+    try:
+        # Prima utilizare: dintre inserările concurente reușește una singură (cheie primară)
+        with connection.begin_nested():
+            connection.execute(insert(table).values(name=name, holder=holder, expires_at=expires_at))
+        return True
+    except IntegrityError:
+        return False
+
+def release_lease(connection, name, holder):
+    """Eliberează lease-ul (dacă este deținut de `holder`), ca să fie preluat imediat de alt worker"""
+    table = SchedulerLease.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.name == name, table.c.holder == holder)
+        .values(expires_at=datetime.utcnow())
+    )
+
+class NotificationJob(db.Model):
+    """Job persistent pentru trimiterea notificărilor către părinți în fundal"""
+    __tablename__ = 'notification_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Statusul jobului: pending, running, done
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    
+    # Parametrii formularului de trimitere (fără parola de email)
+    email_user = db.Column(db.String(120), nullable=False)
+    smtp_server = db.Column(db.String(120), nullable=True)
+    smtp_port = db.Column(db.Integer, nullable=True)
+    content = db.Column(db.Text, nullable=True)
+    include_grades = db.Column(db.Boolean, default=False)
+    include_gdpr = db.Column(db.Boolean, default=False)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    # Relație one-to-many cu destinatarii jobului
+    items = db.relationship('NotificationJobItem', backref='job', lazy=True,
+                            cascade="all, delete-orphan", order_by='NotificationJobItem.id')
+    
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+    
+    def __repr__(self):
+        return f"<NotificationJob {self.id} ({self.status})>"
+
+class NotificationJobItem(db.Model):
+    """Un destinatar (părinte) dintr-un job de notificare"""
+    __tablename__ = 'notification_job_item'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('notification_job.id'), nullable=False, index=True)
+    
+    parent_email = db.Column(db.String(120), nullable=False)
+    parent_name = db.Column(db.String(100), nullable=True)
+    
+    # ID-urile elevilor acestui părinte, separate prin virgulă
+    student_ids = db.Column(db.Text, nullable=False)
+    
+    # Statusul destinatarului: pending, running, done, failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    status_message = db.Column(db.Text, nullable=True)
+    email_sent = db.Column(db.Boolean, default=False)
+    students_count = db.Column(db.Integer, default=0)
+    grades_count = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+    
+    def __repr__(self):
+        return f"<NotificationJobItem {self.parent_email} ({self.status})>"
+
+
+def next_fire_time(day_of_week, time_of_day, last_triggered=None, after=None):
+    """
+    Calculează următorul moment de declanșare al unui reminder, cu aceleași reguli ca
+    Reminder.is_due: o singură dată pe zi, în ziua și ora stabilite (până la sfârșitul orei)
+    
+    Args:
+        day_of_week: Ziua săptămânii (0 = luni)
+        time_of_day: Ora, în formatul HH:MM
+        last_triggered (optional): Ultima declanșare
+        after (optional): Momentul de la care se caută (implicit acum)
+    
+    Returns:
+        datetime: Momentul declanșării (poate fi deja trecut, dacă reminder-ul este scadent acum)
+    """
+    after = after or datetime.now()
+    hour, minute = map(int, time_of_day.split(':'))
+    day = after.date() + timedelta(days=(day_of_week - after.weekday()) % 7)
+    fire_at = datetime(day.year, day.month, day.day, hour, minute)
+    
+    # Fereastra de azi a trecut sau reminder-ul a fost deja declanșat în acea zi
+    window_end = fire_at.replace(minute=0) + timedelta(hours=1)
+    if after >= window_end or (last_triggered and last_triggered.date() >= fire_at.date()):
+        fire_at += timedelta(days=7)
+    return fire_at
+
 class Reminder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -75,7 +490,10 @@ class Reminder(db.Model):
     school_end_date = db.Column(db.Date, nullable=True)    # Data terminării anului școlar
     
     # Ultima dată când a fost trimis reminder-ul
-    last_triggered = db.Column(db.DateTime, nullable=True)
+    last_triggered = db.Column(db.DateTime, nullable=True, index=True)
+    
+    # Următorul moment de declanșare (calculat la salvare; None dacă reminder-ul este inactiv)
+    next_fire_at = db.Column(db.DateTime, nullable=True, index=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -92,6 +510,12 @@ class Reminder(db.Model):
         days = ["Luni", "Marți", "Miercuri", "Joi", "Vineri", "Sâmbătă", "Duminică"]
         return days[self.day_of_week]
     
+    def compute_next_fire_at(self, after=None):
+        """Următorul moment de declanșare (vezi next_fire_time) sau None dacă reminder-ul este inactiv"""
+        if not self.active:
+            return None
+        return next_fire_time(self.day_of_week, self.time_of_day, self.last_triggered, after)
+    
     @property
     def is_due(self):
         """Verifică dacă reminder-ul trebuie declanșat acum"""
@@ -116,4 +540,14 @@ class Reminder(db.Model):
             if last_date == now.date():
                 return False
                 
-        return True
\ No newline at end of file
+        return True
+
+# Câmpurile de care depinde momentul declanșării
+_REMINDER_SCHEDULE_FIELDS = ('day_of_week', 'time_of_day', 'active', 'last_triggered')
+
+@event.listens_for(Reminder, 'before_insert')
+@event.listens_for(Reminder, 'before_update')
+def _update_next_fire_at(mapper, connection, target):
+    """Recalculează next_fire_at când se schimbă programarea reminder-ului"""
+    if target.next_fire_at is None or any(get_history(target, field).has_changes() for field in _REMINDER_SCHEDULE_FIELDS):
+        target.next_fire_at = target.compute_next_fire_at()
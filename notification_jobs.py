@@ -0,0 +1,451 @@
+"""
+Coada de joburi pentru trimiterea notificărilor către părinți în fundal.
+
+Ruta /send-notifications doar înregistrează jobul și destinatarii în baza de date;
+destinatarii sunt procesați apoi de un pool de workeri din procesul curent.
+Fiecare destinatar este revendicat atomic (UPDATE ... WHERE status = 'pending'),
+astfel încât un destinatar nu poate fi procesat de doi workeri în același timp.
+"""
+import os
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import update
+
+from app import db
+from models import Student, NotificationJob, NotificationJobItem, load_grade_stats
+from utils.email_sender import send_email_notification
+from utils.email_transport import EMAIL_MAX_IN_FLIGHT
+from utils.simple_notifier import save_notification
+from utils.pdf_generator import generate_notification_pdf_data
+
+logger = logging.getLogger(__name__)
+
+# Numărul de destinatari procesați în paralel de fiecare proces. Ritmul trimiterii către
+# furnizorii de email este limitat separat, în utils/email_transport.py (EMAIL_RATE_PER_SEC)
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', EMAIL_MAX_IN_FLIGHT))
+
+# După cât timp un destinatar rămas "running" (de ex. după oprirea unui worker) este reluat
+STALE_ITEM_SECONDS = int(os.environ.get('NOTIFICATION_STALE_ITEM_SECONDS', 600))
+
+
+def build_parent_data(students, stats):
+    """
+    Grupează elevii după emailul părintelui și pregătește notele și mediile pentru email
+
+    Args:
+        students: Elevii selectați
+        stats: GradeStats cu mediile elevilor (din tabela de agregate)
+
+    Returns:
+        Dict: email părinte -> {'name', 'students', 'all_grades', 'averages'}
+    """
+    parent_data = {}
+
+    for student in students:
+        # Verifică dacă elevul are email părinte
+        if not student.parent_email or not student.parent_email.strip():
+            continue
+
+        parent_email = student.parent_email.strip()
+
+        # Inițializează datele pentru acest părinte dacă nu există deja
+        if parent_email not in parent_data:
+            parent_data[parent_email] = {
+                'name': student.parent_name,
+                'students': [],
+                'all_grades': []
+            }
+
+        # Inițializează informațiile elevului
+        student_info = {
+            'id': student.id,
+            'name': student.name,
+            'class_name': student.class_name,
+            'grades': [],
+            'subject_averages': [],
+            'overall_average': 0.0
+        }
+
+        # Procesează notele și mediile
+        if student.grades:
+            # Organizează materiile în ordinea în care apar notele
+            subject_grades = {}
+
+            for grade in student.grades:
+                subject_name = grade.subject.name
+
+                # Reține materia pentru calculul mediilor
+                if subject_name not in subject_grades:
+                    subject_grades[subject_name] = grade.subject_id
+
+                # Adaugă nota la lista de note a elevului
+                student_info['grades'].append({
+                    'value': grade.value,
+                    'date': grade.date,
+                    'subject': subject_name
+                })
+
+                # Adaugă nota și la lista generală pentru email
+                grade_text = f"{student.name} (Clasa {student.class_name}) - {subject_name}: {grade.value} din {grade.date.strftime('%d-%m-%Y')}"
+                parent_data[parent_email]['all_grades'].append(grade_text)
+
+            # Mediile pe materii
+            for subject_name, grade_subject_id in subject_grades.items():
+                avg = stats.subject_average(student.id, grade_subject_id)
+                if avg is not None:
+                    # Adaugă media la lista de medii pe materii
+                    student_info['subject_averages'].append({
+                        'subject': subject_name,
+                        'average': avg,
+                        'count': stats.subject_count(student.id, grade_subject_id)
+                    })
+
+                    # Adaugă media și la lista generală pentru email
+                    avg_text = f"{student.name} (Clasa {student.class_name}) - Media la {subject_name}: {avg:.2f}"
+                    if 'averages' not in parent_data[parent_email]:
+                        parent_data[parent_email]['averages'] = []
+                    parent_data[parent_email]['averages'].append(avg_text)
+
+            # Media generală (ca medie a mediilor pe materii, nu ca medie a tuturor notelor)
+            if student_info['subject_averages']:
+                student_info['overall_average'] = stats.overall_average(student.id)
+
+                # Adaugă media generală la lista pentru email
+                overall_avg_text = f"{student.name} (Clasa {student.class_name}) - Media generală: {student_info['overall_average']:.2f}"
+                parent_data[parent_email]['averages'].append(overall_avg_text)
+
+        # Adaugă informațiile elevului la lista de elevi pentru acest părinte
+        parent_data[parent_email]['students'].append(student_info)
+
+    return parent_data
+
+
+def compose_notification(info, content, include_grades, include_gdpr):
+    """
+    Construiește subiectul și textul notificării pentru un părinte
+
+    Returns:
+        Tuple (subiect, conținut text)
+    """
+    students_info = info['students']
+
+    # Construiește subiectul emailului
+    if len(students_info) == 1:
+        subject = f"DiriginteSmart - Note Școlare - {students_info[0]['name']}"
+    else:
+        subject = f"DiriginteSmart - Note Școlare - {len(students_info)} elevi"
+
+    # Folosim conținutul furnizat de utilizator (conține deja "Stimate domn/doamnă,")
+    body = content
+
+    # Adăugăm secțiunea cu note, dacă este solicitată
+    if include_grades and 'all_grades' in info and info['all_grades']:
+        body += "\n\n**NOTE NOI ȘI RECENTE:**\n"
+        body += "\n".join(info['all_grades'])
+
+        # Adaugă și mediile dacă există
+        if 'averages' in info and info['averages']:
+            body += "\n\nInformații privind mediile școlare:\n"
+            body += "\n".join(info['averages'])
+
+    # Adăugăm notificarea GDPR dacă este activată
+    if include_gdpr:
+        body += "\n\n---------------------------------------------"
+        body += "\nNOTĂ PRIVIND PROTECȚIA DATELOR (GDPR):"
+        body += "\nDatele personale sunt procesate conform Regulamentului (UE) 2016/679 privind protecția persoanelor fizice."
+        body += "\nAveți dreptul de acces, rectificare, ștergere, restricționare și portabilitate a datelor."
+        body += "\nPentru mai multe informații sau pentru a vă exercita drepturile, contactați școala."
+        body += "\n---------------------------------------------"
+
+    # Adaugă un footer
+    body += "\n\nAceastă notificare a fost generată automat de sistemul DiriginteSmart."
+    body += "\nVă rugăm să nu răspundeți la acest email."
+    body += "\n\nCu stimă,"
+    body += "\nConducerea Școlii"
+
+    return subject, body
+
+
+def deliver_notification(job, parent_email, info):
+    """
+    Salvează, generează PDF-ul și trimite notificarea pentru un părinte
+
+    Returns:
+        Tuple (mesaj de status, bool email trimis)
+    """
+    parent_name = info['name']
+    students_info = info['students']
+
+    subject, body = compose_notification(info, job.content or '', job.include_grades, job.include_gdpr)
+
+    logger.info(f"Salvare notificare pentru {parent_email}...")
+
+    # Formatăm conținutul pentru HTML
+    html_content = body.replace('\n', '<br>')
+
+    # 1. Salvăm notificarea în fișier local (va fi mereu disponibilă)
+    notification_saved = save_notification(
+        from_email=job.email_user,
+        to_email=parent_email,
+        subject=subject,
+        content=html_content
+    )
+
+    # 2. Generăm PDF pentru printare sau distribuție (numele primului elev)
+    student_name = students_info[0]['name'] if students_info else "Elev"
+
+    pdf_success, pdf_path, pdf_bytes = generate_notification_pdf_data(
+        parent_name=parent_name,
+        student_name=student_name,
+        parent_email=parent_email,
+        subject=subject,
+        content=html_content
+    )
+
+    # 3. Încearcă să trimită și prin email (opțional, nu depinde de rezultat)
+    # Atașamentul folosește PDF-ul deja aflat în memorie, fără a-l reciti din arhivă
+    email_success = send_email_notification(
+        email_user=job.email_user,
+        smtp_server=job.smtp_server,
+        smtp_port=job.smtp_port,
+        recipient=parent_email,
+        subject=subject,
+        body=html_content,
+        attachment_path=pdf_path if pdf_success else None,
+        attachment_bytes=pdf_bytes,
+        attachment_name=os.path.basename(pdf_path) if pdf_success else None,
+        parent_name=parent_name,
+        student_name=student_name
+    )
+
+    status_parts = []
+    if notification_saved:
+        status_parts.append('Notificare salvată')
+
+    if pdf_success:
+        pdf_filename = os.path.basename(pdf_path)
+        status_parts.append(f'PDF generat (<a href="/static/notifications_pdf/{pdf_filename}" target="_blank">Deschide</a>)')
+
+    if email_success:
+        status_parts.append('Email trimis')
+    else:
+        status_parts.append('Email indisponibil')
+
+    logger.info(f"Notificare: Local={notification_saved}, PDF={pdf_success}, Email={email_success}")
+
+    return ' | '.join(status_parts), email_success
+
+
+def enqueue_notification_job(email_user, smtp_server, smtp_port, content, include_grades, include_gdpr, student_ids):
+    """
+    Înregistrează un job de notificare și câte un destinatar pentru fiecare părinte cu note
+
+    Returns:
+        NotificationJob sau None dacă niciun elev selectat nu are note
+    """
+    students = Student.query.filter(Student.id.in_(student_ids)).all()
+    stats = load_grade_stats([s.id for s in students])
+
+    # Grupăm elevii după emailul părintelui; părinții fără note nu primesc notificare
+    recipients = {}
+    for student in students:
+        if not student.parent_email or not student.parent_email.strip():
+            continue
+        recipient = recipients.setdefault(student.parent_email.strip(), {
+            'name': student.parent_name,
+            'student_ids': [],
+            'has_grades': False
+        })
+        recipient['student_ids'].append(student.id)
+        recipient['has_grades'] = recipient['has_grades'] or stats.has_grades(student.id)
+
+    recipients = {email: r for email, r in recipients.items() if r['has_grades']}
+    if not recipients:
+        return None
+
+    job = NotificationJob(
+        email_user=email_user,
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        content=content,
+        include_grades=include_grades,
+        include_gdpr=include_gdpr,
+        status='pending'
+    )
+    for parent_email, recipient in recipients.items():
+        job.items.append(NotificationJobItem(
+            parent_email=parent_email,
+            parent_name=recipient['name'],
+            student_ids=','.join(str(i) for i in recipient['student_ids']),
+            students_count=len(recipient['student_ids']),
+            status='pending'
+        ))
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def process_item(app, item_id):
+    """Procesează un destinatar al unui job (rulează într-un thread din pool)"""
+    with app.app_context():
+        # Revendicăm destinatarul atomic; dacă altcineva l-a preluat, ne oprim
+        claimed = db.session.execute(
+            update(NotificationJobItem)
+            .where(NotificationJobItem.id == item_id, NotificationJobItem.status == 'pending')
+            .values(status='running', updated_at=datetime.datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        item = db.session.get(NotificationJobItem, item_id)
+        job = item.job
+
+        try:
+            student_ids = [int(i) for i in item.student_ids.split(',') if i]
+            students = Student.query.filter(Student.id.in_(student_ids)).all()
+            parent_data = build_parent_data(students, load_grade_stats(student_ids))
+            info = parent_data.get(item.parent_email)
+
+            if not info or not any(student['grades'] for student in info['students']):
+                item.status = 'done'
+                item.status_message = 'Fără note'
+            else:
+                item.status_message, item.email_sent = deliver_notification(job, item.parent_email, info)
+                item.students_count = len(info['students'])
+                item.grades_count = len(info.get('all_grades', []))
+                item.status = 'done'
+
+        except Exception as e:
+            logger.error(f"Eroare la trimiterea notificării către {item.parent_email}: {str(e)}")
+            db.session.rollback()
+            item = db.session.get(NotificationJobItem, item_id)
+            item.status = 'failed'
+            item.status_message = f'Eroare notificare: {str(e)[:50]}...'
+            item.error = str(e)
+
+        db.session.commit()
+        _finish_job_if_complete(item.job_id)
+
+
+def _finish_job_if_complete(job_id):
+    """Marchează jobul ca terminat când nu mai are destinatari neprocesați"""
+    remaining = NotificationJobItem.query.filter(
+        NotificationJobItem.job_id == job_id,
+        NotificationJobItem.status.in_(['pending', 'running'])
+    ).count()
+    if remaining:
+        return
+
+    db.session.execute(
+        update(NotificationJob)
+        .where(NotificationJob.id == job_id, NotificationJob.status != 'done')
+        .values(status='done', finished_at=datetime.datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def job_results(job):
+    """
+    Rezultatele unui job, în formatul tabelului de rezultate
+
+    Returns:
+        Dict cu 'success', 'failed', 'pending', 'total', 'emails_sent' și 'details'
+    """
+    results = {
+        'success': 0,
+        'failed': 0,
+        'pending': 0,
+        'total': len(job.items),
+        'emails_sent': 0,
+        'details': []
+    }
+
+    for item in job.items:
+        if item.status == 'done':
+            results['success'] += 1
+            if item.email_sent:
+                results['emails_sent'] += 1
+        elif item.status == 'failed':
+            results['failed'] += 1
+        else:
+            results['pending'] += 1
+
+        results['details'].append({
+            'email': item.parent_email,
+            'name': item.parent_name,
+            'state': item.status,
+            'status': item.status_message or '',
+            'students_count': item.students_count,
+            'grades_count': item.grades_count,
+            'error': item.error
+        })
+
+    return results
+
+
+class NotificationWorkerPool:
+    """Pool de threaduri care procesează destinatarii joburilor de notificare"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Creat la prima utilizare, în procesul workerului (nu în procesul master gunicorn)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='notification-worker'
+                )
+            return self._executor
+
+    def submit_job(self, app, job_id):
+        """Pornește jobul și trimite destinatarii neprocesați către pool"""
+        with app.app_context():
+            db.session.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id, NotificationJob.status == 'pending')
+                .values(status='running', started_at=datetime.datetime.utcnow())
+            )
+            db.session.commit()
+
+            item_ids = [item_id for (item_id,) in db.session.query(NotificationJobItem.id).filter(
+                NotificationJobItem.job_id == job_id,
+                NotificationJobItem.status == 'pending'
+            ).order_by(NotificationJobItem.id).all()]
+
+        executor = self._get_executor()
+        for item_id in item_ids:
+            executor.submit(process_item, app, item_id)
+
+
+notification_pool = NotificationWorkerPool(NOTIFICATION_WORKERS)
+
+
+def resume_pending_jobs(app):
+    """Reia joburile neterminate (de ex. după repornirea aplicației)"""
+    with app.app_context():
+        # Destinatarii blocați în "running" de prea mult timp sunt repuși în coadă
+        stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=STALE_ITEM_SECONDS)
+        db.session.execute(
+            update(NotificationJobItem)
+            .where(NotificationJobItem.status == 'running', NotificationJobItem.updated_at < stale_before)
+            .values(status='pending')
+        )
+        db.session.commit()
+
+        job_ids = [job_id for (job_id,) in db.session.query(NotificationJob.id).filter(
+            NotificationJob.status.in_(['pending', 'running'])
+        ).all()]
+
+    for job_id in job_ids:
+        notification_pool.submit_job(app, job_id)
+
+    return len(job_ids)
@@ -0,0 +1,205 @@
+"""
+Planificatorul reminderelor.
+
+Fiecare reminder își păstrează în baza de date următorul moment de declanșare (next_fire_at,
+indexat). Un thread din proces ține momentele într-un min-heap și doarme până la cel mai
+apropiat; la declanșare actualizează last_triggered și next_fire_at printr-un UPDATE
+condiționat (WHERE next_fire_at = momentul așteptat), așa că un reminder modificat între timp
+nu este declanșat cu programarea veche. Paginile citesc doar reminderele declanșate de la
+ultima vizualizare, fără să mai evalueze fiecare reminder.
+
+Când aplicația rulează în mai multe procese (workeri gunicorn, instanțe multiple), doar
+workerul care deține lease-ul REMINDER_LEASE din baza de date încarcă și declanșează
+reminderele; ceilalți doar încearcă periodic să preia lease-ul, dacă acesta expiră.
+"""
+import os
+import uuid
+import heapq
+import atexit
+import socket
+import logging
+import datetime
+import threading
+
+from sqlalchemy import select, update
+
+from app import db
+from models import Reminder, next_fire_time, acquire_lease, release_lease, REMINDER_LEASE
+
+logger = logging.getLogger(__name__)
+
+# Intervalul maxim dintre două reîncărcări ale heap-ului din baza de date
+# (preia modificările făcute de celelalte procese ale aplicației)
+REMINDER_RESYNC_SECONDS = int(os.environ.get('REMINDER_RESYNC_SECONDS', 60))
+
+# Durata lease-ului; deținătorul îl prelungește la fiecare treime din durată
+REMINDER_LEASE_SECONDS = int(os.environ.get('REMINDER_LEASE_SECONDS', 90))
+
+
+class ReminderScheduler:
+    """Thread care declanșează reminderele la momentul lor, folosind un min-heap"""
+
+    def __init__(self, resync_seconds=REMINDER_RESYNC_SECONDS, lease_seconds=REMINDER_LEASE_SECONDS):
+        self.resync_seconds = resync_seconds
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._is_leader = False
+        self._heap = []
+        self._condition = threading.Condition()
+        self._reload = True
+        self._resync_at = datetime.datetime.min
+        self._thread = None
+
+    def start(self, app):
+        """Pornește threadul planificatorului (o singură dată pe proces)"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name='reminder-scheduler', daemon=True)
+            self._thread.start()
+        atexit.register(self._release, app)
+
+    def wake(self):
+        """Cere reîncărcarea programării (după adăugarea, editarea sau ștergerea unui reminder)"""
+        with self._condition:
+            self._reload = True
+            self._condition.notify()
+
+    def _load(self):
+        """Reconstruiește heap-ul din reminderele active (completează next_fire_at lipsă)"""
+        missing = Reminder.query.filter(Reminder.active.is_(True), Reminder.next_fire_at.is_(None)).all()
+        for reminder in missing:
+            reminder.next_fire_at = reminder.compute_next_fire_at()
+        if missing:
+            db.session.commit()
+
+        heap = [
+            (fire_at, reminder_id)
+            for reminder_id, fire_at in db.session.execute(
+                select(Reminder.id, Reminder.next_fire_at).where(
+                    Reminder.active.is_(True), Reminder.next_fire_at.is_not(None)
+                )
+            )
+        ]
+        heapq.heapify(heap)
+        return heap
+
+    def _fire(self, due):
+        """Declanșează reminderele scadente; întoarce noile intrări pentru heap"""
+        now = datetime.datetime.now()
+        rescheduled = []
+        for fire_at, reminder_id in due:
+            row = db.session.execute(
+                select(
+                    Reminder.title, Reminder.day_of_week, Reminder.time_of_day, Reminder.last_triggered
+                ).where(Reminder.id == reminder_id)
+            ).first()
+            if row is None:
+                continue
+
+            # Reminderul se declanșează doar în ora programată; dacă ora a trecut (de ex. aplicația
+            # a fost oprită), nu îl mai declanșăm cu întârziere, ci trecem la următoarea apariție
+            missed = now >= fire_at.replace(minute=0) + datetime.timedelta(hours=1)
+            if missed:
+                next_fire_at = next_fire_time(row.day_of_week, row.time_of_day, last_triggered=row.last_triggered, after=now)
+                values = {'next_fire_at': next_fire_at}
+            else:
+                next_fire_at = next_fire_time(row.day_of_week, row.time_of_day, last_triggered=now, after=now)
+                values = {'last_triggered': now, 'next_fire_at': next_fire_at}
+
+            # Condiționat: reminderele modificate sau dezactivate între timp sunt lăsate neatinse
+            result = db.session.execute(
+                update(Reminder)
+                .where(Reminder.id == reminder_id, Reminder.next_fire_at == fire_at, Reminder.active.is_(True))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                if missed:
+                    logger.info(f"Reminder ratat: {row.title} (programat la {fire_at}, următorul: {next_fire_at})")
+                else:
+                    logger.info(f"Reminder declanșat: {row.title} (următorul: {next_fire_at})")
+                rescheduled.append((next_fire_at, reminder_id))
+        db.session.commit()
+        return rescheduled
+
+    def _run(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self._tick()
+            except Exception as e:
+                logger.error(f"Eroare în planificatorul de remindere: {e}")
+                with self._condition:
+                    self._reload = True
+                    self._condition.wait(timeout=self.resync_seconds)
+
+    def _hold_lease(self):
+        """Obține sau prelungește lease-ul; la pierderea lui programarea locală este abandonată"""
+        with db.engine.begin() as connection:
+            is_leader = acquire_lease(connection, REMINDER_LEASE, self.holder, self.lease_seconds)
+        if is_leader != self._is_leader:
+            logger.info(f"Planificatorul de remindere {'rulează' if is_leader else 'nu mai rulează'} în {self.holder}")
+            self._is_leader = is_leader
+            with self._condition:
+                self._heap = []
+                self._reload = True
+        return is_leader
+
+    def _release(self, app):
+        if not self._is_leader:
+            return
+        try:
+            with app.app_context(), db.engine.begin() as connection:
+                release_lease(connection, REMINDER_LEASE, self.holder)
+        except Exception as e:
+            logger.warning(f"Lease-ul planificatorului de remindere nu a putut fi eliberat: {e}")
+
+    def _tick(self):
+        # Un singur worker (deținătorul lease-ului) evaluează și declanșează reminderele
+        renew_seconds = self.lease_seconds / 3
+        if not self._hold_lease():
+            with self._condition:
+                self._condition.wait(timeout=renew_seconds)
+            return
+
+        now = datetime.datetime.now()
+        with self._condition:
+            reload = self._reload or now >= self._resync_at
+            self._reload = False
+        if reload:
+            heap = self._load()
+            with self._condition:
+                self._heap = heap
+            self._resync_at = now + datetime.timedelta(seconds=self.resync_seconds)
+
+        with self._condition:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+
+            if not due:
+                if self._reload:
+                    return
+                # Dormim până la cel mai apropiat moment, o modificare sau următoarea resincronizare
+                timeout = min((self._resync_at - now).total_seconds(), renew_seconds)
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._condition.wait(timeout=max(timeout, 0))
+                return
+
+        rescheduled = self._fire(due)
+        with self._condition:
+            for entry in rescheduled:
+                heapq.heappush(self._heap, entry)
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+def reminders_fired_since(since):
+    """Reminderele active declanșate după momentul dat, cele mai recente primele"""
+    return Reminder.query.filter(
+        Reminder.active.is_(True),
+        Reminder.last_triggered > since
+    ).order_by(Reminder.last_triggered.desc()).all()
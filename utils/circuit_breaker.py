@@ -0,0 +1,141 @@
+"""
+Circuit breaker pentru furnizorii de email (webhook, SendGrid).
+
+După un număr de eșecuri consecutive, furnizorul este considerat căzut și este sărit
+pe durata unei perioade de pauză. La expirarea pauzei este permisă o singură încercare
+de probă (half-open): dacă reușește, furnizorul este folosit din nou, altfel pauza reîncepe.
+Starea este păstrată în memoria procesului curent.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Numărul de eșecuri consecutive după care furnizorul este sărit
+EMAIL_BREAKER_FAILURES = int(os.environ.get('EMAIL_BREAKER_FAILURES', 5))
+
+# Durata pauzei (secunde) înainte de o nouă încercare de probă
+EMAIL_BREAKER_COOLDOWN = float(os.environ.get('EMAIL_BREAKER_COOLDOWN', 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Memoria stării unui furnizor: eșecuri consecutive, pauză și probă"""
+
+    def __init__(self, name: str, failure_threshold: int = EMAIL_BREAKER_FAILURES,
+                 cooldown: float = EMAIL_BREAKER_COOLDOWN):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.total_skipped = 0
+        self.opened_at = None
+        self.last_failure_at = None
+        self.last_success_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Verifică dacă furnizorul poate fi încercat acum
+
+        Returns:
+            bool: False dacă furnizorul este în pauză (sau o probă este deja în curs)
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.time() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Furnizorul {self.name} este încercat din nou (probă)")
+
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.total_skipped += 1
+            return False
+
+    def record_success(self):
+        """Înregistrează o trimitere reușită"""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Furnizorul {self.name} funcționează din nou")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.total_successes += 1
+            self.last_success_at = time.time()
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Înregistrează o trimitere eșuată; deschide circuitul la atingerea pragului"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_failure_at = time.time()
+            self._probe_in_flight = False
+
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        f"Furnizorul {self.name} este sărit {self.cooldown:.0f} s "
+                        f"după {self.consecutive_failures} eșecuri consecutive"
+                    )
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Starea curentă, pentru endpoint-ul de diagnosticare"""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.cooldown - (time.time() - self.opened_at), 1))
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown_seconds': self.cooldown,
+                'retry_in_seconds': retry_in,
+                'total_successes': self.total_successes,
+                'total_failures': self.total_failures,
+                'total_skipped': self.total_skipped,
+                'last_success_at': _isoformat(self.last_success_at),
+                'last_failure_at': _isoformat(self.last_failure_at)
+            }
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Circuit breaker-ul unui furnizor (creat la prima utilizare)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breakers_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Starea tuturor furnizorilor cunoscuți în procesul curent"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
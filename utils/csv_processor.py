@@ -1,10 +1,51 @@
+import os
 import csv
+import heapq
 import logging
-from collections import defaultdict
-from typing import Dict, List, Optional, Any, DefaultDict
+import tempfile
+import itertools
+from typing import Dict, Iterable, Iterator, List, Optional, Any, DefaultDict, Tuple
+
+import numpy as np
+
+from utils.grade_stats import GradeStats
 
 logger = logging.getLogger(__name__)
 
+# Columns of the grades CSV format
+REQUIRED_COLUMNS = ["NumeElev", "Clasa", "Materie", "Nota", "Data", "NumeParinte", "EmailParinte"]
+
+# Rows sorted in memory before a run is spilled to disk when streaming an unsorted file
+SORT_SPILL_ROWS = int(os.environ.get('CSV_SORT_SPILL_ROWS', 100000))
+
+def read_csv_rows(csv_file_path: str) -> Iterator[Dict[str, str]]:
+    """
+    Read the grades CSV file row by row, with every value stripped
+    
+    Args:
+        csv_file_path: Path to the CSV file
+    
+    Yields:
+        One dict per row, keyed by the REQUIRED_COLUMNS names
+    
+    Raises:
+        ValueError: If the file has no headers or is missing required columns
+    """
+    with open(csv_file_path, 'r', encoding='utf-8') as file:
+        csv_reader = csv.DictReader(file)
+        
+        # Verify required columns
+        headers = csv_reader.fieldnames
+        if not headers:
+            raise ValueError("CSV file is empty or has no headers")
+        
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in headers]
+        if missing_columns:
+            raise ValueError(f"CSV file is missing required columns: {', '.join(missing_columns)}")
+        
+        for row in csv_reader:
+            yield {col: (row.get(col) or '').strip() for col in REQUIRED_COLUMNS}
+
 def calculate_average(grades: List[float]) -> float:
     """
     Calculate the average grade for a list of grades
@@ -17,18 +58,22 @@ def calculate_average(grades: List[float]) -> float:
     """
     if not grades:
         return 0
-    return sum(grades) / len(grades)
+    return float(np.mean(grades))
 
-def process_csv_data(csv_file_path: str) -> Optional[Dict[str, Any]]:
+def _valid_rows(rows: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    """Skip (and log) rows without a parent email or a student name"""
+    for row in rows:
+        if not row['EmailParinte'] or not row['NumeElev']:
+            logger.warning(f"Skipping row with missing email or student name: {row}")
+            continue
+        yield row
+
+def _group_rows(rows: Iterable[Dict[str, str]]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]], GradeStats]:
     """
-    Process the CSV file and group data by parent's email
-    
-    Args:
-        csv_file_path: Path to the CSV file
+    First pass: organize valid rows by parent/student and collect the grades columns
     
     Returns:
-        Dictionary with parent emails as keys and their children's grades as values
-        or None if processing fails
+        The parent records (without averages yet), the student data per parent and the grade statistics
     """
     # The results dictionary (parent email -> data)
     grouped_data: Dict[str, Any] = {}
@@ -36,136 +81,235 @@ def process_csv_data(csv_file_path: str) -> Optional[Dict[str, Any]]:
     # Temporary structure to process student data (parent email -> student ID -> data)
     student_grades: Dict[str, Dict[str, Dict[str, Any]]] = {}
     
-    try:
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
+    # Columnar grade data for the vectorized average calculation
+    student_codes: List[int] = []
+    subject_names: List[str] = []
+    grade_values: List[float] = []
+    student_count = 0
+    
+    for row in rows:
+        # Extract basic data
+        email = row['EmailParinte']
+        student_name = row['NumeElev']
+        class_name = row['Clasa']
+        subject = row['Materie']
+        grade_str = row['Nota']
+        date = row['Data']
+        parent_name = row['NumeParinte']
+        
+        # Initialize parent entry if needed
+        if email not in grouped_data:
+            grouped_data[email] = {
+                'parent_name': parent_name,
+                'grades': [],  # Individual grade entries
+                'students': {},  # Student data including averages
+                'averages': []  # Formatted average text for email
+            }
+        
+        # Initialize student data structure if needed
+        student_key = f"{student_name}_{class_name}"
+        if email not in student_grades:
+            student_grades[email] = {}
+        
+        if student_key not in student_grades[email]:
+            student_grades[email][student_key] = {
+                'name': student_name,
+                'class': class_name,
+                'code': student_count,  # Integer key for the vectorized calculation
+                'subjects': {}  # Subjects in order of first appearance
+            }
+            student_count += 1
+        
+        # Format and add individual grade info
+        grade_info = (
+            f"- {subject}: "
+            f"Nota {grade_str} "
+            f"(Data: {date}) - "
+            f"Elev: {student_name}, "
+            f"Clasa: {class_name}"
+        )
+        grouped_data[email]['grades'].append(grade_info)
+        
+        # Add grade to student's subject data (for average calculation)
+        if subject:
+            try:
+                # Try to convert grade to float for calculations
+                grade_value = float(grade_str)
+                student_entry = student_grades[email][student_key]
+                student_entry['subjects'][subject] = True
+                student_codes.append(student_entry['code'])
+                subject_names.append(subject)
+                grade_values.append(grade_value)
+            except (ValueError, TypeError):
+                # If grade can't be converted to float, skip it
+                logger.warning(f"Non-numeric grade '{grade_str}' for {student_name} in {subject}")
+    
+    return grouped_data, student_grades, GradeStats(student_codes, subject_names, grade_values)
+
+def _add_averages(grouped_data: Dict[str, Any], student_grades: Dict[str, Dict[str, Dict[str, Any]]],
+                  stats: GradeStats) -> Dict[str, Any]:
+    """Second pass: format the averages of every student into the parent records"""
+    for email, students in student_grades.items():
+        for student_key, student_data in students.items():
+            name = student_data['name']
+            class_name = student_data['class']
+            code = student_data['code']
             
-            # Verify required columns
-            required_columns = ["NumeElev", "Clasa", "Materie", "Nota", "Data", "NumeParinte", "EmailParinte"]
-            headers = csv_reader.fieldnames
+            # Averages for each subject, in order of first appearance
+            subject_averages = []
+            for subject in student_data['subjects']:
+                subject_averages.append({
+                    'subject': subject,
+                    'average': stats.subject_average(code, subject),
+                    'count': stats.subject_count(code, subject)
+                })
             
-            if not headers:
-                logger.error("CSV file is empty or has no headers")
-                return None
-                
-            missing_columns = [col for col in required_columns if col not in headers]
-            if missing_columns:
-                logger.error(f"CSV file is missing required columns: {', '.join(missing_columns)}")
-                return None
+            # Overall average (average of subject averages)
+            overall_avg = stats.overall_average(code)
             
-            # First pass: collect all data from CSV and organize by parent/student
-            for row in csv_reader:
-                # Extract and clean basic data
-                email = row.get('EmailParinte', '').strip()
-                student_name = row.get('NumeElev', '').strip()
-                class_name = row.get('Clasa', '').strip()
-                subject = row.get('Materie', '').strip()
-                grade_str = row.get('Nota', '').strip()
-                date = row.get('Data', '').strip()
-                parent_name = row.get('NumeParinte', '').strip()
-                
-                # Skip rows with missing critical data
-                if not email or not student_name:
-                    logger.warning(f"Skipping row with missing email or student name: {row}")
-                    continue
-                
-                # Initialize parent entry if needed
-                if email not in grouped_data:
-                    grouped_data[email] = {
-                        'parent_name': parent_name,
-                        'grades': [],  # Individual grade entries
-                        'students': {},  # Student data including averages
-                        'averages': []  # Formatted average text for email
-                    }
-                
-                # Initialize student data structure if needed
-                student_key = f"{student_name}_{class_name}"
-                if email not in student_grades:
-                    student_grades[email] = {}
-                
-                if student_key not in student_grades[email]:
-                    student_grades[email][student_key] = {
-                        'name': student_name,
-                        'class': class_name,
-                        'subjects': defaultdict(list)
-                    }
-                
-                # Format and add individual grade info
-                grade_info = (
-                    f"- {subject}: "
-                    f"Nota {grade_str} "
-                    f"(Data: {date}) - "
-                    f"Elev: {student_name}, "
-                    f"Clasa: {class_name}"
-                )
-                grouped_data[email]['grades'].append(grade_info)
-                
-                # Add grade to student's subject data (for average calculation)
-                if subject:
-                    try:
-                        # Try to convert grade to float for calculations
-                        grade_value = float(grade_str)
-                        student_grades[email][student_key]['subjects'][subject].append({
-                            'value': grade_value,
-                            'date': date
-                        })
-                    except (ValueError, TypeError):
-                        # If grade can't be converted to float, skip it
-                        logger.warning(f"Non-numeric grade '{grade_str}' for {student_name} in {subject}")
+            # Store calculated averages in result data
+            student_result = {
+                'name': name,
+                'class': class_name,
+                'subject_averages': subject_averages,
+                'overall_average': overall_avg
+            }
             
-            # Second pass: calculate averages for each student and subject
-            for email, students in student_grades.items():
-                for student_key, student_data in students.items():
-                    name = student_data['name']
-                    class_name = student_data['class']
-                    
-                    # Calculate averages for each subject
-                    subject_averages = []
-                    overall_grades = []
-                    
-                    for subject, grades in student_data['subjects'].items():
-                        # Extract values for calculation
-                        values = [g['value'] for g in grades]
-                        
-                        if values:
-                            avg = calculate_average(values)
-                            subject_averages.append({
-                                'subject': subject,
-                                'average': avg,
-                                'count': len(values)
-                            })
-                            overall_grades.append(avg)
-                    
-                    # Calculate overall average
-                    overall_avg = calculate_average(overall_grades)
-                    
-                    # Store calculated averages in result data
-                    student_result = {
-                        'name': name,
-                        'class': class_name,
-                        'subject_averages': subject_averages,
-                        'overall_average': overall_avg
-                    }
-                    
-                    grouped_data[email]['students'][student_key] = student_result
-                    
-                    # Format average info for email
-                    avg_info = (
-                        f"- {name} (Clasa {class_name}): "
-                        f"Media Generală: {overall_avg:.2f}"
-                    )
-                    
-                    # Add subject averages
-                    for subj in subject_averages:
-                        avg_info += f"\n  * {subj['subject']}: {subj['average']:.2f} ({subj['count']} note)"
-                    
-                    grouped_data[email]['averages'].append(avg_info)
-        
-        return grouped_data
+            grouped_data[email]['students'][student_key] = student_result
+            
+            # Format average info for email
+            avg_info = (
+                f"- {name} (Clasa {class_name}): "
+                f"Media Generală: {overall_avg:.2f}"
+            )
+            
+            # Add subject averages
+            for subj in subject_averages:
+                avg_info += f"\n  * {subj['subject']}: {subj['average']:.2f} ({subj['count']} note)"
+            
+            grouped_data[email]['averages'].append(avg_info)
+    
+    return grouped_data
+
+def process_csv_data(csv_file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Process the CSV file and group data by parent's email
+    
+    The whole file is held in memory; for very large files use iter_parent_records.
+    
+    Args:
+        csv_file_path: Path to the CSV file
+    
+    Returns:
+        Dictionary with parent emails as keys and their children's grades as values
+        or None if processing fails
+    """
+    try:
+        return _add_averages(*_group_rows(_valid_rows(read_csv_rows(csv_file_path))))
     
     except FileNotFoundError:
         logger.error(f"CSV file not found: {csv_file_path}")
         return None
+    except ValueError as e:
+        logger.error(str(e))
+        return None
     except Exception as e:
         logger.error(f"Error processing CSV file: {str(e)}")
         return None
+
+def _is_partitioned_by_email(csv_file_path: str) -> bool:
+    """Check (with a cheap pass over the file) that the rows of each parent are contiguous"""
+    finished = set()
+    current = None
+    for row in _valid_rows(read_csv_rows(csv_file_path)):
+        email = row['EmailParinte']
+        if email != current:
+            if email in finished:
+                return False
+            if current is not None:
+                finished.add(current)
+            current = email
+    return True
+
+def _write_sorted_run(rows: List[Tuple[str, int, Dict[str, str]]], directory: str) -> str:
+    """Sort one chunk of rows by (email, original position) and spill it to a CSV file"""
+    rows.sort(key=lambda item: (item[0], item[1]))
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.csv')
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        for email, position, row in rows:
+            writer.writerow([email, position] + [row[col] for col in REQUIRED_COLUMNS])
+    return path
+
+def _read_sorted_run(path: str) -> Iterator[Tuple[str, int, Dict[str, str]]]:
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        for record in csv.reader(file):
+            yield record[0], int(record[1]), dict(zip(REQUIRED_COLUMNS, record[2:]))
+
+def _externally_sorted_rows(csv_file_path: str, spill_rows: int) -> Iterator[Dict[str, str]]:
+    """
+    Rows sorted by parent email using an external merge sort
+    
+    The file is read in chunks of `spill_rows` rows; each chunk is sorted and written to a
+    temporary file, then the sorted runs are merged lazily. Rows of the same parent keep
+    their original order, so the records are identical to the in-memory grouping.
+    """
+    with tempfile.TemporaryDirectory(prefix='csv_sort_') as directory:
+        runs = []
+        chunk: List[Tuple[str, int, Dict[str, str]]] = []
+        for position, row in enumerate(_valid_rows(read_csv_rows(csv_file_path))):
+            chunk.append((row['EmailParinte'], position, row))
+            if len(chunk) >= spill_rows:
+                runs.append(_write_sorted_run(chunk, directory))
+                chunk = []
+        
+        if not runs:
+            # Everything fits in one chunk: no need to touch the disk
+            chunk.sort(key=lambda item: (item[0], item[1]))
+            for _, _, row in chunk:
+                yield row
+            return
+        
+        if chunk:
+            runs.append(_write_sorted_run(chunk, directory))
+        chunk = []
+        logger.info(f"CSV file {csv_file_path} sorted by parent email in {len(runs)} spilled runs")
+        
+        merged = heapq.merge(*(_read_sorted_run(path) for path in runs), key=lambda item: (item[0], item[1]))
+        for _, _, row in merged:
+            yield row
+
+def iter_parent_records(csv_file_path: str, presorted: bool = False,
+                        spill_rows: int = SORT_SPILL_ROWS) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream the CSV file as one finished parent record at a time
+    
+    Each record has the same shape as a value of process_csv_data's result, but only the rows
+    of one parent are held in memory. Rows must be grouped by EmailParinte for a single pass;
+    otherwise the file is sorted on disk first and the records come out in email order.
+    
+    Args:
+        csv_file_path: Path to the CSV file
+        presorted: Trust that the file is already sorted/partitioned by EmailParinte
+            (skips the check pass; a parent appearing again raises ValueError)
+        spill_rows: Rows sorted in memory before spilling a run to disk (unsorted input only)
+    
+    Yields:
+        Tuples (parent email, parent record)
+    
+    Raises:
+        FileNotFoundError: If the CSV file does not exist
+        ValueError: If the file is missing required columns, or is not partitioned despite `presorted`
+    """
+    if presorted or _is_partitioned_by_email(csv_file_path):
+        rows = _valid_rows(read_csv_rows(csv_file_path))
+    else:
+        logger.info(f"CSV file {csv_file_path} is not grouped by parent email, sorting it on disk")
+        rows = _externally_sorted_rows(csv_file_path, max(spill_rows, 1))
+    
+    finished = set()
+    for email, parent_rows in itertools.groupby(rows, key=lambda row: row['EmailParinte']):
+        if email in finished:
+            raise ValueError(f"CSV file is not grouped by parent email: {email} appears again")
+        finished.add(email)
+        yield email, _add_averages(*_group_rows(parent_rows))[email]
@@ -1,14 +1,50 @@
 import logging
 import os
 import base64
-import json
-import requests
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.email_transport import email_transport, EMAIL_MAX_IN_FLIGHT
+from utils.circuit_breaker import get_breaker
 # Importurile dinamice sunt realizate în funcțiile specifice pentru a evita probleme
 
 logger = logging.getLogger(__name__)
 
-def send_email_notification(email_user, smtp_server, smtp_port, recipient, subject, body, email_password=None, attachment_path=None):
+# Endpoint-ul API-ului SendGrid v3 pentru trimiterea emailurilor
+SENDGRID_SEND_URL = 'https://api.sendgrid.com/v3/mail/send'
+
+# Numărul maxim de destinatari (personalizations) într-un singur apel SendGrid
+SENDGRID_BATCH_SIZE = int(os.environ.get('SENDGRID_BATCH_SIZE', 1000))
+
+# Limita SendGrid pentru dimensiunea totală a substituțiilor unui destinatar (octeți)
+SENDGRID_SUBSTITUTIONS_LIMIT = 10000
+
+# Circuit breaker-ele furnizorilor; Brevo folosește tot API-ul SendGrid, deci același breaker
+WEBHOOK_BREAKER = 'webhook'
+SENDGRID_BREAKER = 'sendgrid'
+
+def encode_attachment(attachment_path=None, attachment_bytes=None, attachment_name=None):
+    """
+    Pregătește un atașament pentru furnizorii de email (nume fișier, conținut base64)
+    
+    Conținutul din memorie (`attachment_bytes`) are prioritate; fișierul de pe disc
+    este citit doar dacă nu a fost dat conținutul.
+    
+    Returns:
+        Tuple (nume fișier, conținut base64) sau None dacă nu există atașament
+    """
+    if attachment_bytes is not None:
+        file_name = attachment_name or (os.path.basename(attachment_path) if attachment_path else 'notificare.pdf')
+        return file_name, base64.b64encode(attachment_bytes).decode('utf-8')
+    
+    if attachment_path and os.path.exists(attachment_path):
+        with open(attachment_path, 'rb') as f:
+            return os.path.basename(attachment_path), base64.b64encode(f.read()).decode('utf-8')
+    
+    return None
+
+def send_email_notification(email_user, smtp_server, smtp_port, recipient, subject, body, email_password=None, attachment_path=None,
+                            attachment_bytes=None, attachment_name=None, parent_name=None, student_name=None):
     """
     Trimite o notificare prin email către un părinte
     
@@ -21,6 +57,13 @@ def send_email_notification(email_user, smtp_server, smtp_port, recipient, subje
         body (str): Conținutul emailului
         email_password (str, optional): Ignorat - păstrat pentru compatibilitate
         attachment_path (str, optional): Calea către un fișier de atașat
+        attachment_bytes (bytes, optional): Conținutul atașamentului, deja în memorie (evită citirea de pe disc)
+        attachment_name (str, optional): Numele fișierului atașat, pentru `attachment_bytes`
+        parent_name (str, optional): Numele părintelui, pentru PDF-ul de backup (dacă trebuie generat)
+        student_name (str, optional): Numele elevului, pentru PDF-ul de backup (dacă trebuie generat)
+    
+    Dacă niciun furnizor nu reușește, atașamentul primit (fișier sau conținut) este folosit
+    ca backup local; PDF-ul este randat din nou doar dacă nu a fost dat niciun atașament.
     
     Returns:
         bool: True dacă emailul a fost trimis cu succes, False altfel
@@ -28,73 +71,132 @@ def send_email_notification(email_user, smtp_server, smtp_port, recipient, subje
     # Salvează în fișierul sent_emails.log pentru referință
     save_email_to_log(email_user, recipient, subject, body)
     
+    # Atașamentul este codificat o singură dată, pentru toți furnizorii încercați
+    attachment = None
+    if any(os.environ.get(key) for key in ('EMAIL_WEBHOOK_URL', 'SENDGRID_API_KEY', 'BREVO_API_KEY')):
+        try:
+            attachment = encode_attachment(attachment_path, attachment_bytes, attachment_name)
+        except Exception as attach_error:
+            logger.error(f"Eroare la pregătirea atașamentului: {attach_error}")
+    
     # ETAPA 1: Verificăm dacă avem un webhook configurat și încercăm să trimitem prin acesta
     webhook_url = os.environ.get('EMAIL_WEBHOOK_URL')
-    if webhook_url:
+    webhook_breaker = get_breaker(WEBHOOK_BREAKER)
+    if webhook_url and not webhook_breaker.allow():
+        logger.warning("Webhook-ul este indisponibil (circuit deschis). Se încearcă alte metode.")
+    elif webhook_url:
         logger.info(f"Se încearcă trimiterea prin webhook către {recipient}")
         webhook_result = send_through_webhook(
             to_email=recipient,
             subject=subject,
             content=body,
             from_email=email_user,
-            attachment_path=attachment_path
+            attachment=attachment
         )
         
         if webhook_result:
+            webhook_breaker.record_success()
             logger.info(f"Email trimis cu succes prin webhook către {recipient}")
             return True
         else:
+            webhook_breaker.record_failure()
             logger.warning("Webhook-ul nu a funcționat. Se încearcă alte metode.")
     
     # ETAPA 2: Încercăm SendGrid (poate fi blocat pe Replit)
     sendgrid_key = os.environ.get('SENDGRID_API_KEY')
-    if sendgrid_key:
+    sendgrid_breaker = get_breaker(SENDGRID_BREAKER)
+    # Brevo folosește același API și același breaker: cel mult un eșec înregistrat per mesaj
+    sendgrid_failure_recorded = False
+    if sendgrid_key and not sendgrid_breaker.allow():
+        logger.warning("SendGrid API este indisponibil (circuit deschis). Se încearcă alte metode.")
+    elif sendgrid_key:
         logger.info(f"Se trimite email prin SendGrid API către {recipient}")
-        sendgrid_result = send_with_sendgrid(
+        sendgrid_status = send_with_sendgrid_status(
             from_email=email_user,
             to_email=recipient,
             subject=subject,
             text_content=body,
-            attachment_path=attachment_path
+            attachment=attachment
         )
         
-        if sendgrid_result:
+        if sendgrid_status in [200, 201, 202]:
+            sendgrid_breaker.record_success()
             logger.info(f"Email trimis cu succes prin SendGrid către {recipient}")
             return True
         else:
+            # Doar erorile furnizorului contează pentru circuit; un mesaj respins (de ex. 400 pentru
+            # o adresă invalidă) arată că furnizorul răspunde normal
+            if is_provider_failure(sendgrid_status):
+                sendgrid_breaker.record_failure()
+                sendgrid_failure_recorded = True
+            elif sendgrid_status is not None:
+                sendgrid_breaker.record_success()
             logger.warning("SendGrid API nu a funcționat. Se încearcă alte metode.")
     
     # ETAPA 3: Încercăm Brevo API (poate fi blocat pe Replit)
     brevo_key = os.environ.get('BREVO_API_KEY')
-    if brevo_key:
+    if brevo_key and not sendgrid_breaker.allow():
+        logger.warning("Brevo API este indisponibil (circuit deschis).")
+    elif brevo_key:
         logger.info(f"Se trimite email prin Brevo API către {recipient}")
-        brevo_result = send_with_brevo(
+        brevo_status = send_with_brevo_status(
             from_email=email_user,
             to_email=recipient,
             subject=subject,
             text_content=body,
-            attachment_path=attachment_path
+            attachment=attachment
         )
         
-        if brevo_result:
+        if brevo_status in [200, 201, 202]:
+            sendgrid_breaker.record_success()
             logger.info(f"Email trimis cu succes prin Brevo către {recipient}")
             return True
         else:
+            if is_provider_failure(brevo_status):
+                if not sendgrid_failure_recorded:
+                    sendgrid_breaker.record_failure()
+            elif brevo_status is not None:
+                sendgrid_breaker.record_success()
             logger.warning("Brevo API nu a funcționat. Verificați BREVO_API_KEY în variabilele de mediu.")
         
-    # ETAPA 4: Generăm PDF local pentru backup
-    logger.info("Se generează PDF pentru backup manual...")
-    from utils.pdf_generator import generate_notification_pdf
+    # ETAPA 4: Backup local (PDF) pentru distribuire manuală
+    save_local_backup(recipient, subject, body, attachment_path, attachment_bytes, attachment_name,
+                      parent_name=parent_name, student_name=student_name)
+    return False  # Returnăm False pentru a indica că emailul electronic nu a fost trimis
+
+def save_local_backup(recipient, subject, body, attachment_path=None, attachment_bytes=None, attachment_name=None,
+                      parent_name=None, student_name=None):
+    """
+    Asigură un backup local al notificării netrimise, refolosind documentul deja produs
+    
+    PDF-ul este randat doar dacă apelantul nu a dat nici fișierul, nici conținutul acestuia.
+    
+    Returns:
+        str: Calea backup-ului sau None dacă nu a putut fi creat
+    """
+    if attachment_path and os.path.exists(attachment_path):
+        logger.info(f"Backup-ul local există deja: {attachment_path}")
+        return attachment_path
     
     try:
-        # Generăm numele destinatarului și expeditorului din email
-        parent_name = recipient.split('@')[0].replace('.', ' ').title()
-        student_name = "Elev"  # În contextul real, acest nume ar trebui extras din date
+        if attachment_bytes is not None:
+            # Documentul există deja în memorie: doar îl scriem, fără o nouă randare
+            pdf_dir = os.path.join('static', 'notifications_pdf')
+            os.makedirs(pdf_dir, exist_ok=True)
+            file_name = attachment_name or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{recipient.replace('@', '_').replace('.', '_')}.pdf"
+            backup_path = os.path.join(pdf_dir, os.path.basename(file_name))
+            with open(backup_path, 'wb') as f:
+                f.write(attachment_bytes)
+            logger.info(f"S-a salvat PDF-ul de backup: {backup_path}")
+            return backup_path
+        
+        logger.info("Se generează PDF pentru backup manual...")
+        from utils.pdf_generator import generate_notification_pdf
         
-        # Generăm PDF-ul
+        # Fără date despre destinatar, numele sunt deduse din email
         success, pdf_path = generate_notification_pdf(
-            parent_name=parent_name,
-            student_name=student_name,
+            parent_name=parent_name or recipient.split('@')[0].replace('.', ' ').title(),
+            student_name=student_name or "Elev",
             parent_email=recipient,
             subject=subject,
             content=body
@@ -102,16 +204,14 @@ def send_email_notification(email_user, smtp_server, smtp_port, recipient, subje
         
         if success:
             logger.info(f"S-a generat un PDF de backup: {pdf_path}")
-        else:
-            logger.error("Eroare la generarea PDF-ului")
-            
-        return False  # Returnăm False pentru a indica că emailul electronic nu a fost trimis
+            return pdf_path
+        logger.error("Eroare la generarea PDF-ului")
             
     except Exception as e:
         logger.error(f"Eroare la generarea PDF-ului: {e}")
-        return False
+    return None
 
-def send_through_webhook(to_email, subject, content, from_email=None, attachment_path=None):
+def send_through_webhook(to_email, subject, content, from_email=None, attachment_path=None, attachment=None):
     """
     Trimite date prin webhook pentru a fi procesate extern și transformate în email
     
@@ -121,6 +221,7 @@ def send_through_webhook(to_email, subject, content, from_email=None, attachment
         content (str): Conținutul emailului (HTML sau text)
         from_email (str, optional): Adresa expeditorului (poate fi ignorată de webhook)
         attachment_path (str, optional): Calea către fișierul atașament
+        attachment (tuple, optional): Atașament deja codificat (nume, base64), vezi `encode_attachment`
         
     Returns:
         bool: True dacă datele au fost trimise cu succes, False altfel
@@ -149,57 +250,53 @@ def send_through_webhook(to_email, subject, content, from_email=None, attachment
         }
         
         # Adaugă atașament dacă există (opțional)
-        if attachment_path and os.path.exists(attachment_path):
-            try:
-                with open(attachment_path, 'rb') as f:
-                    file_content = f.read()
-                    file_name = os.path.basename(attachment_path)
-                    encoded_file = base64.b64encode(file_content).decode('utf-8')
-                    
-                    # Format mai simplu pentru atașament
-                    payload["attachment_name"] = file_name
-                    payload["attachment_content"] = encoded_file
-                    payload["attachment_type"] = "application/pdf"
-                    
-                    print(f"DEBUG: Atașament adăugat în webhook: {file_name}")
-                    logger.info(f"Atașament adăugat în webhook: {file_name}")
-            except Exception as attach_error:
-                print(f"DEBUG: Eroare la adăugarea atașamentului în webhook: {attach_error}")
-                logger.error(f"Eroare la adăugarea atașamentului în webhook: {attach_error}")
+        try:
+            if attachment is None:
+                attachment = encode_attachment(attachment_path)
+            if attachment:
+                file_name, encoded_file = attachment
+                
+                # Format mai simplu pentru atașament
+                payload["attachment_name"] = file_name
+                payload["attachment_content"] = encoded_file
+                payload["attachment_type"] = "application/pdf"
+                
+                print(f"DEBUG: Atașament adăugat în webhook: {file_name}")
+                logger.info(f"Atașament adăugat în webhook: {file_name}")
+        except Exception as attach_error:
+            print(f"DEBUG: Eroare la adăugarea atașamentului în webhook: {attach_error}")
+            logger.error(f"Eroare la adăugarea atașamentului în webhook: {attach_error}")
         
         # Înregistrăm datele trimise (fără conținut sensibil)
         print(f"DEBUG: Trimitem datele: to={to_email}, subject={subject}, webhook={webhook_url[:30]}")
         
-        try:
-            # Trimite cererea POST către webhook
-            response = requests.post(
-                webhook_url,
-                headers={"Content-Type": "application/json"},
-                data=json.dumps(payload),
-                timeout=10  # Timeout de 10 secunde
-            )
-            
-            # Verifică răspunsul
-            print(f"DEBUG: Răspuns webhook: {response.status_code}")
-            logger.info(f"Răspuns webhook: {response.status_code}")
+        # Trimite cererea POST către webhook prin transportul asincron comun
+        status_code, response_text = email_transport.post_json_sync(
+            webhook_url,
+            payload,
+            headers={"Content-Type": "application/json"}
+        )
+        
+        # Verifică răspunsul
+        print(f"DEBUG: Răspuns webhook: {status_code}")
+        logger.info(f"Răspuns webhook: {status_code}")
+        
+        if status_code in [200, 201, 202]:
+            print(f"DEBUG: Date trimise cu succes către webhook. Răspuns: {status_code}")
+            logger.info(f"Date trimise cu succes către webhook. Răspuns: {status_code}")
             
-            if response.status_code in [200, 201, 202]:
-                print(f"DEBUG: Date trimise cu succes către webhook. Răspuns: {response.status_code}")
-                logger.info(f"Date trimise cu succes către webhook. Răspuns: {response.status_code}")
-                
-                # Salvează în log pentru referință
-                with open('sent_emails.log', 'a', encoding='utf-8') as log:
-                    log.write(f"[{datetime.now().isoformat()}] Email către {to_email} (webhook): {subject}\n")
-                    
-                return True
-            else:
-                print(f"DEBUG: Eroare webhook: {response.status_code} - {response.text}")
-                logger.error(f"Eroare webhook: {response.status_code} - {response.text}")
-                return False
+            # Salvează în log pentru referință
+            with open('sent_emails.log', 'a', encoding='utf-8') as log:
+                log.write(f"[{datetime.now().isoformat()}] Email către {to_email} (webhook): {subject}\n")
                 
-        except requests.exceptions.RequestException as req_error:
-            print(f"DEBUG: Eroare la conectarea la webhook: {req_error}")
-            logger.error(f"Eroare la conectarea la webhook: {req_error}")
+            return True
+        elif status_code == 0:
+            print(f"DEBUG: Eroare la conectarea la webhook: {response_text}")
+            logger.error(f"Eroare la conectarea la webhook: {response_text}")
+            return False
+        else:
+            print(f"DEBUG: Eroare webhook: {status_code} - {response_text}")
+            logger.error(f"Eroare webhook: {status_code} - {response_text}")
             return False
             
     except Exception as e:
@@ -207,9 +304,30 @@ def send_through_webhook(to_email, subject, content, from_email=None, attachment
         logger.error(f"Eroare la trimiterea prin webhook: {e}")
         return False
 
-def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_content=None, attachment_path=None):
+def is_provider_failure(status_code):
+    """
+    Verifică dacă un răspuns indică o problemă a furnizorului (contează pentru circuit breaker)
+    
+    0 înseamnă că cererea nu a ajuns la server, 429 limitare de ritm, iar 5xx o eroare a
+    furnizorului. Celelalte erori 4xx țin de mesaj (de ex. o adresă invalidă) și nu trebuie
+    să deschidă circuitul pentru toți destinatarii.
+    """
+    return status_code is not None and (status_code == 0 or status_code == 429 or status_code >= 500)
+
+def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_content=None, attachment_path=None, attachment=None):
     """
-    Trimite email folosind API-ul SendGrid
+    Trimite email folosind API-ul SendGrid (vezi `send_with_sendgrid_status`)
+    
+    Returns:
+        bool: True dacă emailul a fost trimis cu succes, False altfel
+    """
+    status_code = send_with_sendgrid_status(from_email, to_email, subject, text_content, html_content,
+                                            attachment_path, attachment)
+    return status_code in [200, 201, 202]
+
+def send_with_sendgrid_status(from_email, to_email, subject, text_content=None, html_content=None, attachment_path=None, attachment=None):
+    """
+    Trimite email folosind API-ul SendGrid și întoarce codul HTTP al răspunsului
     
     Args:
         from_email (str): Email expeditor
@@ -218,9 +336,11 @@ def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_co
         text_content (str, optional): Conținut text simplu
         html_content (str, optional): Conținut HTML (opțional)
         attachment_path (str, optional): Calea către un fișier atașament
+        attachment (tuple, optional): Atașament deja codificat (nume, base64), vezi `encode_attachment`
         
     Returns:
-        bool: True dacă emailul a fost trimis cu succes, False altfel
+        int: Codul HTTP (0 dacă cererea nu a ajuns la server) sau None dacă emailul nu a putut
+            fi pregătit (de ex. SENDGRID_API_KEY lipsă)
     """
     try:
         # Verificăm dacă avem un API key configurat
@@ -230,10 +350,9 @@ def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_co
         
         if not sendgrid_api_key:
             logger.error("SENDGRID_API_KEY nu este configurată în variabilele de mediu")
-            return False
+            return None
 
         # Importăm aici pentru a evita erorile de import
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition, ContentId
 
         # Pregătim mesajul
@@ -247,36 +366,40 @@ def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_co
         )
         
         # Adăugăm atașament dacă există
-        if attachment_path and os.path.exists(attachment_path):
-            try:
-                with open(attachment_path, 'rb') as f:
-                    file_content = f.read()
-                    file_name = os.path.basename(attachment_path)
-                    encoded_file = base64.b64encode(file_content).decode()
-                    
-                    attachment = Attachment()
-                    attachment.file_content = FileContent(encoded_file)
-                    attachment.file_name = FileName(file_name)
-                    attachment.file_type = FileType('application/pdf')
-                    attachment.disposition = Disposition('attachment')
-                    attachment.content_id = ContentId('PDF Notification')
-                    
-                    message.attachment = attachment
-                    logger.info(f"Atașament adăugat în SendGrid: {file_name}")
-            except Exception as attach_error:
-                logger.error(f"Eroare la adăugarea atașamentului în SendGrid: {attach_error}")
+        try:
+            if attachment is None:
+                attachment = encode_attachment(attachment_path)
+            if attachment:
+                file_name, encoded_file = attachment
+                
+                sendgrid_attachment = Attachment()
+                sendgrid_attachment.file_content = FileContent(encoded_file)
+                sendgrid_attachment.file_name = FileName(file_name)
+                sendgrid_attachment.file_type = FileType('application/pdf')
+                sendgrid_attachment.disposition = Disposition('attachment')
+                sendgrid_attachment.content_id = ContentId('PDF Notification')
+                
+                message.attachment = sendgrid_attachment
+                logger.info(f"Atașament adăugat în SendGrid: {file_name}")
+        except Exception as attach_error:
+            logger.error(f"Eroare la adăugarea atașamentului în SendGrid: {attach_error}")
         
-        # Trimite emailul
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        # Trimite emailul prin transportul asincron comun (corpul JSON generat de biblioteca SendGrid)
+        status_code, response_body = email_transport.post_json_sync(
+            SENDGRID_SEND_URL,
+            message.get(),
+            headers={"Authorization": f"Bearer {sendgrid_api_key}"}
+        )
         
         # Verificăm răspunsul
-        if response.status_code in [200, 201, 202]:
-            logger.info(f"Email trimis cu succes prin SendGrid API: {response.status_code}")
-            return True
+        if status_code in [200, 201, 202]:
+            logger.info(f"Email trimis cu succes prin SendGrid API: {status_code}")
         else:
-            logger.error(f"Eroare SendGrid API: {response.status_code} - {response.body}")
-            return False
+            logger.error(f"Eroare SendGrid API: {status_code} - {response_body}")
+            if status_code == 401:
+                logger.error("EROARE: API Key SendGrid invalid sau expirat!")
+                logger.error("Verificați și actualizați SENDGRID_API_KEY în variabilele de mediu din Replit")
+        return status_code
         
     except Exception as e:
         logger.error(f"Eroare SendGrid API: {e}")
@@ -284,11 +407,141 @@ def send_with_sendgrid(from_email, to_email, subject, text_content=None, html_co
         if "401" in str(e) or "unauthorized" in str(e).lower() or "invalid" in str(e).lower():
             logger.error("EROARE: API Key SendGrid invalid sau expirat!")
             logger.error("Verificați și actualizați SENDGRID_API_KEY în variabilele de mediu din Replit")
-        return False
+        return None
 
 
 # Alias pentru compatibilitate cu codul existent
 send_with_brevo = send_with_sendgrid
+send_with_brevo_status = send_with_sendgrid_status
+
+
+def apply_substitutions(content, substitutions):
+    """Înlocuiește local marcajele de substituție (ex. -student_name-) din conținut"""
+    if not content or not substitutions:
+        return content
+    for key, value in substitutions.items():
+        content = content.replace(key, value)
+    return content
+
+
+def send_batch_with_sendgrid(from_email, recipients, text_content=None, html_content=None):
+    """
+    Trimite același mesaj către mai mulți destinatari, în loturi de personalizations SendGrid
+    
+    Conținutul este comun și poate conține marcaje de substituție (ex. -student_name-),
+    înlocuite de SendGrid cu valorile fiecărui destinatar. Atașamentele sunt la nivel de mesaj
+    în API-ul SendGrid, așa că destinatarii cu atașament propriu, precum și cei ale căror
+    substituții depășesc limita SendGrid, sunt trimiși individual prin `send_with_sendgrid`.
+    
+    Args:
+        from_email (str): Email expeditor
+        recipients (list): Destinatarii, ca dicționare cu 'to_email', 'subject' și opțional
+            'substitutions' (dict marcaj -> valoare), 'attachment_path' sau 'attachment'
+            (deja codificat, vezi `encode_attachment`)
+        text_content (str, optional): Conținut text simplu comun
+        html_content (str, optional): Conținut HTML comun (are prioritate, ca în `send_with_sendgrid`)
+        
+    Returns:
+        list: Câte un bool pentru fiecare destinatar, în ordinea primită
+    """
+    results = [False] * len(recipients)
+    if not recipients:
+        return results
+    
+    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
+    if not sendgrid_api_key:
+        logger.error("SENDGRID_API_KEY nu este configurată în variabilele de mediu")
+        return results
+    
+    from sendgrid.helpers.mail import Mail, From, Personalization, To, Substitution, Content
+    
+    # Împărțim destinatarii: în lot sau individual
+    batchable = []
+    individual = []
+    for index, recipient in enumerate(recipients):
+        substitutions = recipient.get('substitutions') or {}
+        substitutions_size = sum(len(k.encode('utf-8')) + len(v.encode('utf-8')) for k, v in substitutions.items())
+        if recipient.get('attachment_path') or recipient.get('attachment') or substitutions_size > SENDGRID_SUBSTITUTIONS_LIMIT:
+            individual.append(index)
+        else:
+            batchable.append(index)
+    
+    breaker = get_breaker(SENDGRID_BREAKER)
+    
+    # Loturi de maximum SENDGRID_BATCH_SIZE destinatari, trimise concurent
+    batches = [batchable[i:i + SENDGRID_BATCH_SIZE] for i in range(0, len(batchable), SENDGRID_BATCH_SIZE)]
+    requests_to_send = []
+    for batch in batches:
+        message = Mail()
+        message.from_email = From(from_email)
+        message.subject = recipients[batch[0]]['subject']
+        for index in batch:
+            recipient = recipients[index]
+            personalization = Personalization()
+            personalization.add_to(To(recipient['to_email']))
+            personalization.subject = recipient['subject']
+            for key, value in (recipient.get('substitutions') or {}).items():
+                personalization.add_substitution(Substitution(key, value))
+            message.add_personalization(personalization)
+        if html_content:
+            message.add_content(Content('text/html', html_content))
+        else:
+            message.add_content(Content('text/plain', text_content or ''))
+        requests_to_send.append((SENDGRID_SEND_URL, message.get(), {"Authorization": f"Bearer {sendgrid_api_key}"}))
+    
+    if requests_to_send:
+        circuit_open = not breaker.allow()
+        if not circuit_open:
+            responses = email_transport.post_many_sync(requests_to_send)
+        else:
+            logger.warning("SendGrid API este indisponibil (circuit deschis). Lotul nu a fost trimis.")
+            responses = [(0, 'circuit deschis')] * len(requests_to_send)
+        
+        # SendGrid acceptă sau respinge lotul în întregime: statusul lotului este statusul fiecărui destinatar
+        for batch, (status_code, response_body) in zip(batches, responses):
+            accepted = status_code in [200, 201, 202]
+            if accepted:
+                breaker.record_success()
+                logger.info(f"Lot SendGrid acceptat ({len(batch)} destinatari): {status_code}")
+            elif status_code == 400:
+                # Cererea a fost respinsă ca invalidă (de ex. o adresă greșită): reîncercăm individual,
+                # pentru ca un singur destinatar să nu blocheze tot lotul
+                logger.warning(f"Lot SendGrid respins ({len(batch)} destinatari), se trimite individual: {response_body}")
+                individual.extend(batch)
+                continue
+            elif not circuit_open:
+                # Inclusiv statusul 0 (furnizorul nu a putut fi contactat), principalul caz de indisponibilitate;
+                # răspunsurile sintetice "circuit deschis" nu sunt eșecuri noi
+                if is_provider_failure(status_code):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                logger.error(f"Eroare SendGrid API pentru lot ({len(batch)} destinatari): {status_code} - {response_body}")
+            for index in batch:
+                results[index] = accepted
+    
+    # Destinatarii care nu pot fi incluși în lot, trimiși concurent (transportul comun
+    # limitează numărul de cereri simultane și rata de trimitere)
+    def send_individual(index):
+        recipient = recipients[index]
+        substitutions = recipient.get('substitutions')
+        return send_with_sendgrid(
+            from_email=from_email,
+            to_email=recipient['to_email'],
+            subject=recipient['subject'],
+            text_content=apply_substitutions(text_content, substitutions),
+            html_content=apply_substitutions(html_content, substitutions),
+            attachment_path=recipient.get('attachment_path'),
+            attachment=recipient.get('attachment')
+        )
+    
+    individual = sorted(individual)
+    if individual:
+        with ThreadPoolExecutor(max_workers=min(EMAIL_MAX_IN_FLIGHT, len(individual))) as executor:
+            for index, sent in zip(individual, executor.map(send_individual, individual)):
+                results[index] = sent
+    
+    return results
 
 # Această funcție a fost eliminată întrucât utilizăm exclusiv Brevo API
 
@@ -0,0 +1,167 @@
+"""
+Transport asincron (aiohttp) pentru trimiterea emailurilor prin webhook și SendGrid.
+
+Cererile HTTP rulează pe o singură buclă asyncio, într-un thread dedicat al procesului.
+Codul sincron (rutele Flask, workerii de notificări) trimite cererile în această buclă
+și așteaptă rezultatul. Numărul de cereri simultane este limitat de EMAIL_MAX_IN_FLIGHT,
+iar ritmul de trimitere de un token bucket configurat prin EMAIL_RATE_PER_SEC.
+"""
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp_retry import RetryClient, ExponentialRetry
+
+from utils.http_clients import (
+    HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_KEEPALIVE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Numărul maxim de emailuri trimise pe secundă (0 = fără limită)
+EMAIL_RATE_PER_SEC = float(os.environ.get('EMAIL_RATE_PER_SEC', 10))
+
+# Numărul maxim de trimiteri permise în rafală peste ritmul mediu
+EMAIL_RATE_BURST = int(os.environ.get('EMAIL_RATE_BURST', 10))
+
+# Numărul maxim de cereri HTTP aflate simultan în curs
+EMAIL_MAX_IN_FLIGHT = int(os.environ.get('EMAIL_MAX_IN_FLIGHT', 8))
+
+# Timeout total pentru o cerere către un furnizor de email (secunde)
+EMAIL_REQUEST_TIMEOUT = float(os.environ.get('EMAIL_REQUEST_TIMEOUT', 10))
+
+# Coduri HTTP pentru care cererea este reîncercată. Trimiterea unui email nu este idempotentă:
+# un 5xx (de ex. 502/504 de la un gateway) poate veni după ce furnizorul a acceptat deja mesajul,
+# așa că reîncercăm doar la limitarea de ritm (429), când mesajul sigur nu a fost acceptat
+RETRY_STATUSES = {429}
+
+# Erori reîncercate: doar cele în care conexiunea nu s-a stabilit (cererea nu a fost trimisă)
+RETRY_EXCEPTIONS = {aiohttp.ClientConnectorError}
+
+
+class TokenBucket:
+    """Limitator de ritm: fiecare trimitere consumă un token, tokenurile se refac continuu"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Așteaptă până când este disponibil un token"""
+        if self.rate <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncEmailTransport:
+    """
+    Client HTTP asincron comun pentru furnizorii de email
+
+    Bucla, sesiunea aiohttp și limitatoarele sunt create la prima utilizare în fiecare proces.
+    """
+
+    def __init__(self, rate: float = EMAIL_RATE_PER_SEC, burst: int = EMAIL_RATE_BURST,
+                 max_in_flight: int = EMAIL_MAX_IN_FLIGHT, timeout: float = EMAIL_REQUEST_TIMEOUT):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._client = None
+        self._bucket = None
+        self._in_flight = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # După fork (de ex. workeri gunicorn) bucla procesului părinte nu mai este validă
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                self._client = None
+                thread = threading.Thread(target=self._loop.run_forever, name='email-transport', daemon=True)
+                thread.start()
+            return self._loop
+
+    async def _get_client(self) -> RetryClient:
+        # Creat în interiorul buclei, pentru a fi legat de ea
+        if self._client is None:
+            self._bucket = TokenBucket(self.rate, self.burst)
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            # Conexiuni keep-alive reutilizate între trimiteri, limitate per host
+            connector = aiohttp.TCPConnector(
+                limit=max(self.max_in_flight, HTTP_POOL_MAXSIZE),
+                limit_per_host=HTTP_POOL_MAXSIZE,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.timeout, sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT
+            )
+            self._client = RetryClient(
+                client_session=aiohttp.ClientSession(connector=connector, timeout=timeout),
+                retry_options=ExponentialRetry(
+                    attempts=3, start_timeout=0.5, statuses=RETRY_STATUSES, exceptions=RETRY_EXCEPTIONS,
+                    retry_all_server_errors=False
+                ),
+                raise_for_status=False
+            )
+        return self._client
+
+    async def post_json(self, url: str, payload: Dict[str, Any],
+                        headers: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        """
+        Trimite o cerere POST cu corp JSON, respectând limita de ritm și de cereri simultane
+
+        Returns:
+            Tuple (cod HTTP, corpul răspunsului); codul este 0 dacă cererea nu a ajuns la server
+        """
+        client = await self._get_client()
+        async with self._in_flight:
+            await self._bucket.acquire()
+            try:
+                async with client.post(url, json=payload, headers=headers) as response:
+                    return response.status, await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Eroare la conectarea la {url[:30]}...: {e!r}")
+                return 0, str(e)
+
+    def post_json_sync(self, url: str, payload: Dict[str, Any],
+                       headers: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        """Varianta sincronă a `post_json`, pentru apelurile din threaduri obișnuite"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.post_json(url, payload, headers), loop)
+        return future.result()
+
+    def post_many_sync(self, requests: List[Tuple[str, Dict[str, Any], Optional[Dict[str, str]]]]) -> List[Tuple[int, str]]:
+        """Trimite mai multe cereri concurent și întoarce rezultatele în aceeași ordine"""
+        loop = self._ensure_loop()
+
+        async def gather():
+            return await asyncio.gather(*(self.post_json(url, payload, headers) for url, payload, headers in requests))
+
+        return asyncio.run_coroutine_threadsafe(gather(), loop).result()
+
+
+# Transportul comun al procesului
+email_transport = AsyncEmailTransport()
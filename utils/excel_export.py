@@ -0,0 +1,316 @@
+"""
+Modul pentru exportul situației școlare în Excel (xlsxwriter).
+
+Exportul pornește de la un singur set de date (ExportDataset): elevii, materiile și toate
+notele citite printr-o singură interogare, cu mediile calculate o singură dată.
+Toate foile (situația generală, clasele și elevii) sunt scrise din acest set de date.
+"""
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import xlsxwriter
+
+from utils.grade_stats import GradeStats
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_SUBJECT = "Materie necunoscută"
+
+
+class ExportDataset:
+    """
+    Datele exportului, precalculate
+
+    Attributes:
+        students: Elevii, ordonați după clasă și nume
+        subjects: Materiile, ordonate după nume
+        classes: Elevii grupați pe clase (în ordinea elevilor)
+        grades_by_student: Pentru fiecare elev, notele (valoare, dată) grupate pe materii,
+            în ordinea în care au fost adăugate
+        subject_names: Numele materiilor după ID
+        stats: Mediile pe materii și mediile generale (GradeStats)
+    """
+
+    def __init__(self, students, subjects, grade_rows):
+        """
+        Args:
+            students: Elevii exportați
+            subjects: Toate materiile
+            grade_rows: Rânduri (student_id, subject_id, nume materie, valoare, dată),
+                în ordinea adăugării notelor
+        """
+        self.students = list(students)
+        self.subjects = list(subjects)
+        self.subject_names: Dict[Any, Optional[str]] = {subject.id: subject.name for subject in self.subjects}
+
+        self.classes: Dict[str, List[Any]] = OrderedDict()
+        for student in self.students:
+            self.classes.setdefault(student.class_name, []).append(student)
+
+        self.grades_by_student: Dict[Any, Dict[Any, List[tuple]]] = {}
+        student_ids, subject_ids, values, dates = [], [], [], []
+        for student_id, subject_id, subject_name, value, date in grade_rows:
+            self.grades_by_student.setdefault(student_id, OrderedDict()).setdefault(subject_id, []).append((value, date))
+            self.subject_names.setdefault(subject_id, subject_name)
+            student_ids.append(student_id)
+            subject_ids.append(subject_id)
+            values.append(value)
+            dates.append(date)
+
+        self.stats = GradeStats(student_ids, subject_ids, values, dates)
+
+    def subject_name(self, subject_id) -> str:
+        return self.subject_names.get(subject_id) or UNKNOWN_SUBJECT
+
+
+def _add_formats(workbook) -> Dict[str, Any]:
+    """Formatele folosite în toate foile"""
+    return {
+        # Format pentru header
+        'header': workbook.add_format({
+            'bold': True,
+            'bg_color': '#4F81BD',
+            'color': 'white',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1
+        }),
+        # Format pentru note
+        'grade': workbook.add_format({
+            'num_format': '0.00',
+            'align': 'center'
+        }),
+        # Format pentru note bune (peste 8)
+        'good': workbook.add_format({
+            'num_format': '0.00',
+            'align': 'center',
+            'bg_color': '#C6EFCE',
+            'color': '#006100'
+        }),
+        # Format pentru note medii (între 5 și 8)
+        'average_grade': workbook.add_format({
+            'num_format': '0.00',
+            'align': 'center',
+            'bg_color': '#FFEB9C',
+            'color': '#9C6500'
+        }),
+        # Format pentru note slabe (sub 5)
+        'poor': workbook.add_format({
+            'num_format': '0.00',
+            'align': 'center',
+            'bg_color': '#FFC7CE',
+            'color': '#9C0006'
+        }),
+        # Format pentru medii
+        'average': workbook.add_format({
+            'bold': True,
+            'num_format': '0.00',
+            'align': 'center',
+            'bg_color': '#E6E6E6'
+        }),
+        # Format pentru data
+        'date': workbook.add_format({
+            'num_format': 'dd/mm/yyyy',
+            'align': 'center'
+        })
+    }
+
+
+def _write_value(sheet, row, col, value, formats):
+    """Scrie o notă sau o medie cu formatul adecvat valorii"""
+    if value >= 8:
+        sheet.write(row, col, value, formats['good'])
+    elif value >= 5:
+        sheet.write(row, col, value, formats['average_grade'])
+    else:
+        sheet.write(row, col, value, formats['poor'])
+
+
+def _write_averages(sheet, row, student, overall_col, first_subject_col, dataset, formats):
+    """Scrie media generală și mediile pe materii ale unui elev pe un rând"""
+    stats = dataset.stats
+
+    # Scrie mediile pe materii
+    for j, subject in enumerate(dataset.subjects):
+        avg = stats.subject_average(student.id, subject.id)
+        if avg is not None:
+            _write_value(sheet, row, first_subject_col + j, avg, formats)
+        else:
+            sheet.write(row, first_subject_col + j, '-')  # Fără note
+
+    # Scrie media generală
+    if stats.has_grades(student.id):
+        _write_value(sheet, row, overall_col, stats.overall_average(student.id), formats)
+    else:
+        sheet.write(row, overall_col, '-')  # Fără note
+
+
+def write_overview_sheet(workbook, dataset: ExportDataset, formats):
+    """Sheet-ul general cu toți elevii"""
+    overview_sheet = workbook.add_worksheet('Situație Generală')
+
+    # Adaugă header-ul, cu materiile
+    headers = ['Nr.', 'Elev', 'Clasa', 'Părinte', 'Email', 'Media Generală']
+    headers.extend(subject.name for subject in dataset.subjects)
+
+    for col, header in enumerate(headers):
+        overview_sheet.write(0, col, header, formats['header'])
+
+    # Setează lățimea coloanelor
+    overview_sheet.set_column(0, 0, 5)  # Nr.
+    overview_sheet.set_column(1, 1, 25)  # Elev
+    overview_sheet.set_column(2, 2, 10)  # Clasa
+    overview_sheet.set_column(3, 3, 25)  # Părinte
+    overview_sheet.set_column(4, 4, 30)  # Email
+    overview_sheet.set_column(5, 5, 15)  # Media Generală
+    overview_sheet.set_column(6, len(headers) - 1, 15)  # Materii
+
+    for i, student in enumerate(dataset.students):
+        row = i + 1
+
+        # Date elev
+        overview_sheet.write(row, 0, i + 1)  # Număr
+        overview_sheet.write(row, 1, student.name)  # Nume
+        overview_sheet.write(row, 2, student.class_name)  # Clasa
+        overview_sheet.write(row, 3, student.parent_name)  # Părinte
+        overview_sheet.write(row, 4, student.parent_email)  # Email
+
+        _write_averages(overview_sheet, row, student, 5, 6, dataset, formats)
+
+
+def write_class_sheet(workbook, dataset: ExportDataset, class_name, class_students, formats):
+    """Sheet-ul unei clase, cu statisticile clasei"""
+    class_sheet = workbook.add_worksheet(f'Clasa {class_name}')
+
+    # Adaugă header
+    class_headers = ['Nr.', 'Elev', 'Media Generală']
+    class_headers.extend(subject.name for subject in dataset.subjects)
+
+    for col, header in enumerate(class_headers):
+        class_sheet.write(0, col, header, formats['header'])
+
+    # Setează lățimea coloanelor
+    class_sheet.set_column(0, 0, 5)      # Nr.
+    class_sheet.set_column(1, 1, 30)     # Elev
+    class_sheet.set_column(2, 2, 15)     # Media Generală
+    class_sheet.set_column(3, len(class_headers) - 1, 15)  # Materii
+
+    # Scrie datele elevilor
+    for i, student in enumerate(class_students):
+        row = i + 1
+
+        # Date elev
+        class_sheet.write(row, 0, i + 1)      # Număr
+        class_sheet.write(row, 1, student.name)  # Nume
+
+        _write_averages(class_sheet, row, student, 2, 3, dataset, formats)
+
+    # Statistici pentru clasă (doar dacă există cel puțin un elev cu medie generală)
+    class_stats = dataset.stats.class_statistics([student.id for student in class_students])
+    if class_stats:
+        # Rândul pentru statistici (după ultimul elev)
+        stats_row = len(class_students) + 3
+
+        # Media clasei
+        class_sheet.write(stats_row, 0, "Statistici clasă:", formats['header'])
+        class_sheet.write(stats_row, 1, "Media clasei:")
+        class_sheet.write(stats_row, 2, class_stats['mean'], formats['good'])
+
+        # Abaterea medie
+        class_sheet.write(stats_row + 1, 1, "Abaterea medie:")
+        class_sheet.write(stats_row + 1, 2, class_stats['mean_deviation'])
+
+        # Abaterea standard
+        class_sheet.write(stats_row + 2, 1, "Abaterea standard:")
+        class_sheet.write(stats_row + 2, 2, class_stats['std_deviation'])
+
+
+def write_student_sheet(workbook, dataset: ExportDataset, student, formats):
+    """Sheet-ul unui elev, cu toate notele grupate pe materii"""
+    subject_grades = dataset.grades_by_student.get(student.id)
+    if not subject_grades:  # Doar pentru elevii care au note
+        return
+
+    student_sheet = workbook.add_worksheet(f'{student.name} ({student.class_name})')
+
+    # Adaugă header pentru informații elev
+    student_sheet.write(0, 0, f'Elev: {student.name}')
+    student_sheet.write(1, 0, f'Clasa: {student.class_name}')
+    student_sheet.write(2, 0, f'Părinte: {student.parent_name}')
+    student_sheet.write(3, 0, f'Email: {student.parent_email}')
+
+    # Setează lățimea coloanelor
+    student_sheet.set_column(0, 0, 5)   # Nr.
+    student_sheet.set_column(1, 1, 25)  # Materie
+    student_sheet.set_column(2, 2, 15)  # Notă
+    student_sheet.set_column(3, 3, 15)  # Data
+
+    # Adaugă header pentru tabelul de note
+    note_headers = ['Nr.', 'Materie', 'Notă', 'Data']
+    row = 5  # Începe după informațiile despre elev
+
+    for col, header in enumerate(note_headers):
+        student_sheet.write(row, col, header, formats['header'])
+
+    # Numărător pentru rânduri
+    count = 1
+    row += 1
+
+    # Pentru fiecare materie, afișează notele și media
+    for subject_id, grades in subject_grades.items():
+        subject_name = dataset.subject_name(subject_id)
+
+        # Scrie fiecare notă, de la cea mai recentă
+        for value, date in sorted(grades, key=lambda grade: grade[1], reverse=True):
+            student_sheet.write(row, 0, count)
+            student_sheet.write(row, 1, subject_name)
+            _write_value(student_sheet, row, 2, value, formats)
+            student_sheet.write(row, 3, date, formats['date'])
+
+            row += 1
+            count += 1
+
+        # Afișează media pentru materie
+        student_sheet.write(row, 0, '')
+        student_sheet.write(row, 1, f'Media la {subject_name}:')
+        _write_value(student_sheet, row, 2, dataset.stats.subject_average(student.id, subject_id), formats)
+        student_sheet.write(row, 3, '')
+        row += 1  # Lasă un rând liber între materii
+        row += 1
+
+    # Afișează media generală
+    # Folosim write în loc de merge_range pentru a evita erorile
+    student_sheet.write(row, 0, 'MEDIA GENERALĂ:')
+    student_sheet.write(row, 1, '')
+    _write_value(student_sheet, row, 2, dataset.stats.overall_average(student.id), formats)
+    student_sheet.write(row, 3, '')
+
+
+def write_grade_workbook(output, dataset: ExportDataset):
+    """
+    Scrie workbook-ul complet al situației școlare
+
+    Fără constant_memory: în acel mod xlsxwriter ține deschis câte un fișier temporar pentru
+    fiecare foaie până la close(), iar exportul are câte o foaie pentru fiecare elev (la câteva
+    mii de elevi se depășește limita de fișiere deschise a procesului).
+
+    Args:
+        output: Fișierul (sau calea) în care se scrie workbook-ul
+        dataset: Datele exportului
+    """
+    workbook = xlsxwriter.Workbook(output)
+    try:
+        formats = _add_formats(workbook)
+
+        write_overview_sheet(workbook, dataset, formats)
+
+        # Creează sheet-uri individuale pentru fiecare clasă
+        for class_name, class_students in dataset.classes.items():
+            write_class_sheet(workbook, dataset, class_name, class_students, formats)
+
+        # Crează sheet-uri individuale pentru fiecare elev cu toate notele
+        for student in dataset.students:
+            write_student_sheet(workbook, dataset, student, formats)
+    finally:
+        workbook.close()
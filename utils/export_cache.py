@@ -0,0 +1,140 @@
+"""
+Cache pe disc pentru fișierele exportate (Excel, arhiva ZIP cu formulare GDPR, exporturi CSV/JSON).
+
+Fiecare export are un nume și o amprentă a datelor din care este construit. Cât timp amprenta
+nu se schimbă, fișierul deja construit este refolosit; la o amprentă nouă fișierul este construit
+din nou, iar variantele vechi ale aceluiași export sunt șterse.
+"""
+import os
+import re
+import logging
+import tempfile
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directorul în care sunt păstrate exporturile
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dirigintesmart_export_cache'))
+
+
+class ExportCache:
+    """Fișierele exportate, câte unul pentru fiecare export (varianta corespunzătoare amprentei curente)"""
+
+    def __init__(self, directory: str = EXPORT_CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def _safe_name(name: str) -> str:
+        # Fără '-': separă numele de amprentă
+        return re.sub(r'[^A-Za-z0-9_.]', '_', name)
+
+    def _path(self, name: str, fingerprint: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self._safe_name(name)}-{fingerprint}{suffix}")
+
+    def get(self, name: str, fingerprint: str, suffix: str = '') -> Optional[str]:
+        """Calea fișierului exportat pentru amprenta dată sau None dacă nu a fost construit"""
+        path = self._path(name, fingerprint, suffix)
+        return path if os.path.exists(path) else None
+
+    def get_or_build(self, name: str, fingerprint: str, build: Callable[[str], None], suffix: str = '') -> str:
+        """
+        Calea fișierului exportat pentru amprenta dată, construit doar dacă nu există deja
+
+        Args:
+            name: Numele exportului (de ex. 'situatie_scolara')
+            fingerprint: Amprenta datelor exportate
+            build: Funcție care scrie exportul în calea primită
+            suffix: Extensia fișierului
+
+        Returns:
+            str: Calea fișierului din cache
+        """
+        cached = self.get(name, fingerprint, suffix)
+        if cached:
+            logger.info(f"Export {name} servit din cache")
+            return cached
+
+        path = self._path(name, fingerprint, suffix)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            build(temp_path)
+            # Scriere atomică: cererile concurente văd fie fișierul complet, fie niciunul
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._remove_stale(name, path)
+        return path
+
+    def stream_and_store(self, name: str, fingerprint: str, chunks: Iterable[bytes], suffix: str = '') -> Iterator[bytes]:
+        """
+        Transmite un export generat în flux și îl păstrează în cache în același timp
+
+        Fișierul intră în cache doar dacă fluxul a fost transmis complet; dacă descărcarea
+        este întreruptă, fișierul parțial este șters.
+
+        Args:
+            name: Numele exportului
+            fingerprint: Amprenta datelor exportate
+            chunks: Bucățile exportului
+            suffix: Extensia fișierului
+
+        Yields:
+            Bucățile exportului, neschimbate
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            path = self._path(name, fingerprint, suffix)
+            os.replace(temp_path, path)
+            completed = True
+            self._remove_stale(name, path)
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def remove_matching(self, name_prefix: str) -> int:
+        """
+        Șterge toate exporturile al căror nume începe cu prefixul dat
+
+        Returns:
+            int: Numărul de fișiere șterse
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+
+        prefix = self._safe_name(name_prefix)
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.startswith(prefix) or entry.name.endswith('.tmp'):
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Nu s-a putut șterge exportul {entry.name}: {e}")
+        return removed
+
+    def _remove_stale(self, name: str, current_path: str):
+        # Variantele construite pentru amprente vechi nu mai pot fi servite
+        prefix = f"{self._safe_name(name)}-"
+        for entry in os.scandir(self.directory):
+            if entry.path == current_path or not entry.name.startswith(prefix) or entry.name.endswith('.tmp'):
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Nu s-a putut șterge exportul vechi {entry.name}: {e}")
+
+
+# Cache-ul comun al aplicației
+export_cache = ExportCache()
@@ -6,13 +6,32 @@ import json
 import csv
 import io
 import logging
-import tempfile
 from datetime import datetime
 import hashlib
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, Iterator, List, Any, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
+# Marcaje de substituție pentru formularele GDPR trimise în lot (completate de SendGrid per părinte)
+GDPR_STUDENTS_TAG = '-students-'
+GDPR_STUDENTS_LINE_TAG = '-students_line-'
+GDPR_PARENT_NAME_TAG = '-parent_name-'
+
+# Stilul comun al formularelor GDPR (parsat o singură dată de fiecare proces de randare PDF)
+GDPR_FORM_CSS = """
+body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px; }
+h1, h2, h3, h4, h5, h6 { color: #205493; }
+.header { text-align: center; margin-bottom: 30px; }
+.content { margin-bottom: 20px; }
+.footer { margin-top: 50px; border-top: 1px solid #ddd; padding-top: 20px; }
+.consent-options { margin: 30px 0; }
+.consent-option { margin-bottom: 15px; padding-left: 25px; position: relative; }
+.consent-option::before { content: "☐"; position: absolute; left: 0; top: 0; }
+.signature-area { margin-top: 40px; display: flex; justify-content: space-between; }
+.signature-field { margin-top: 10px; border-bottom: 1px solid #333; padding-bottom: 5px; }
+.school-info { text-align: center; font-size: 0.9em; color: #666; margin-top: 30px; }
+"""
+
 def anonymize_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Anonimizează datele personale, păstrând doar informații statistice
@@ -54,6 +73,10 @@ def anonymize_data(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return result
 
+def export_filename(extension: str) -> str:
+    """Numele fișierului de export GDPR (cu data și ora exportului)"""
+    return f"gdpr_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
 def export_as_json(data: Dict[str, Any]) -> Tuple[str, bytes]:
     """
     Exportă datele în format JSON
@@ -64,7 +87,7 @@ def export_as_json(data: Dict[str, Any]) -> Tuple[str, bytes]:
     Returns:
         Tuple cu numele fișierului și conținutul binar
     """
-    filename = f"gdpr_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    filename = export_filename('json')
     
     # Adăugăm metadate despre export
     export_data = {
@@ -87,7 +110,7 @@ def export_as_csv(data: Dict[str, Any]) -> Tuple[str, bytes]:
     Returns:
         Tuple cu numele fișierului și conținutul binar
     """
-    filename = f"gdpr_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    filename = export_filename('csv')
     
     # Aplatizăm structura pentru CSV
     flattened_data = flatten_dict(data)
@@ -200,19 +223,88 @@ def load_gdpr_settings() -> Dict[str, Any]:
         logger.error(f"Eroare la încărcarea setărilor GDPR: {e}")
         return {}
 
-def generate_gdpr_form_html(student, form_template: Dict[str, Any]) -> str:
+def normalize_email(email: Optional[str]) -> str:
+    """Adresa de email normalizată (fără spații, cu litere mici), pentru comparații"""
+    return (email or '').strip().lower()
+
+def group_students_by_parent(students) -> List[List[Any]]:
+    """
+    Grupează elevii după adresa de email (normalizată) a părintelui
+    
+    Elevii fără adresă de email rămân fiecare în grupul propriu.
+    
+    Returns:
+        Lista grupurilor, în ordinea primei apariții a fiecărui părinte
+    """
+    families = {}
+    groups = []
+    for student in students:
+        email = normalize_email(student.parent_email)
+        if not email:
+            groups.append([student])
+        elif email in families:
+            families[email].append(student)
+        else:
+            families[email] = [student]
+            groups.append(families[email])
+    return groups
+
+def gdpr_student_names(students) -> str:
+    """Numele elevilor unui părinte, ca text (ex. „Ana, Ion și Maria”)"""
+    names = [student.name for student in students]
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} și {names[-1]}"
+
+def gdpr_students_text(students) -> str:
+    """Referirea la elevii unui părinte, pentru textul emailului (ex. „elevului Ana”)"""
+    return f"{'elevului' if len(students) == 1 else 'elevilor'} {gdpr_student_names(students)}"
+
+def gdpr_students_line(students) -> str:
+    """Rândul formularului GDPR cu elevul (sau elevii) părintelui și clasele lor"""
+    label = 'Părinte/tutore al elevului' if len(students) == 1 else 'Părinte/tutore al elevilor'
+    children = '; '.join(f"{student.name}, Clasa {student.class_name}" for student in students)
+    return f"<strong>{label}:</strong> {children}"
+
+def generate_gdpr_form_html(student, form_template: Dict[str, Any], include_styles: bool = True) -> str:
     """
     Generează conținutul HTML al formularului de consimțământ GDPR personalizat pentru un părinte
     
     Args:
         student: Obiectul student cu informațiile elevului și părintelui
         form_template: Dicționar cu șablonul formularului
+        include_styles: Include stilul în document (pentru email); la randarea PDF
+            stilul comun este dat separat renderer-ului, deja parsat
         
     Returns:
         String cu HTML-ul formularului personalizat
     """
+    return generate_gdpr_family_form_html([student], form_template, include_styles)
+
+def generate_gdpr_family_form_html(students, form_template: Dict[str, Any], include_styles: bool = True) -> str:
+    """
+    Generează un singur formular GDPR pentru toți elevii aceluiași părinte
+    
+    Args:
+        students: Elevii părintelui (datele părintelui sunt luate de la primul)
+        form_template: Dicționar cu șablonul formularului
+        include_styles: Include stilul în document (vezi `generate_gdpr_form_html`)
+        
+    Returns:
+        String cu HTML-ul formularului
+    """
+    return generate_gdpr_parent_form_html(students[0].parent_name, gdpr_students_line(students), form_template, include_styles)
+
+def generate_gdpr_parent_form_html(parent_name: str, students_line: str, form_template: Dict[str, Any],
+                                   include_styles: bool = True) -> str:
+    """
+    Generează HTML-ul formularului GDPR din numele părintelui și rândul cu elevii
+    (date reale sau marcaje de substituție, pentru trimiterea în lot)
+    
+    Returns:
+        String cu HTML-ul formularului
+    """
     # Data curentă formatată
     current_date = datetime.now().strftime('%d.%m.%Y')
+    styles = f"<style>\n{GDPR_FORM_CSS}\n        </style>" if include_styles else ""
     
     # Construim HTML-ul
     html = f"""
@@ -222,19 +314,7 @@ def generate_gdpr_form_html(student, form_template: Dict[str, Any]) -> str:
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>{form_template.get('title', 'Formular GDPR')}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px; }}
-            h1, h2, h3, h4, h5, h6 {{ color: #205493; }}
-            .header {{ text-align: center; margin-bottom: 30px; }}
-            .content {{ margin-bottom: 20px; }}
-            .footer {{ margin-top: 50px; border-top: 1px solid #ddd; padding-top: 20px; }}
-            .consent-options {{ margin: 30px 0; }}
-            .consent-option {{ margin-bottom: 15px; padding-left: 25px; position: relative; }}
-            .consent-option::before {{ content: "☐"; position: absolute; left: 0; top: 0; }}
-            .signature-area {{ margin-top: 40px; display: flex; justify-content: space-between; }}
-            .signature-field {{ margin-top: 10px; border-bottom: 1px solid #333; padding-bottom: 5px; }}
-            .school-info {{ text-align: center; font-size: 0.9em; color: #666; margin-top: 30px; }}
-        </style>
+        {styles}
     </head>
     <body>
         <div class="header">
@@ -243,8 +323,8 @@ def generate_gdpr_form_html(student, form_template: Dict[str, Any]) -> str:
         </div>
         
         <div class="content">
-            <p><strong>Către:</strong> {student.parent_name}</p>
-            <p><strong>Părinte/tutore al elevului:</strong> {student.name}, Clasa {student.class_name}</p>
+            <p><strong>Către:</strong> {parent_name}</p>
+            <p>{students_line}</p>
             
             <h3>Notificare privind prelucrarea datelor cu caracter personal</h3>
             
@@ -277,7 +357,7 @@ def generate_gdpr_form_html(student, form_template: Dict[str, Any]) -> str:
             <div class="signature-area">
                 <div>
                     <p><strong>Nume părinte/tutore:</strong></p>
-                    <p class="signature-field">{student.parent_name}</p>
+                    <p class="signature-field">{parent_name}</p>
                     <p><strong>Data:</strong></p>
                     <p class="signature-field">{current_date}</p>
                 </div>
@@ -300,44 +380,68 @@ def generate_gdpr_form_html(student, form_template: Dict[str, Any]) -> str:
     
     return html
 
-def generate_gdpr_form_pdf(student, form_template: Dict[str, Any], include_signature: bool = True) -> Tuple[bool, str]:
+def gdpr_form_pdf_filename(students) -> str:
+    """Numele fișierului PDF cu formularul GDPR al unui elev (sau al elevilor unui părinte)"""
+    names = '_'.join(student.name.replace(' ', '_') for student in students)
+    return f"gdpr_form_{names}_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+def iter_gdpr_forms_pdf(students, form_template: Dict[str, Any], include_signature: bool = True) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Randează formularele GDPR PDF (câte unul pentru fiecare elev), vezi `iter_gdpr_family_forms_pdf`
+    """
+    return iter_gdpr_family_forms_pdf([[student] for student in students], form_template, include_signature)
+
+def iter_gdpr_family_forms_pdf(families, form_template: Dict[str, Any], include_signature: bool = True) -> Iterator[Tuple[str, Optional[bytes]]]:
     """
-    Generează un PDF cu formularul de consimțământ GDPR personalizat pentru un părinte
+    Randează formularele GDPR PDF în memorie, în paralel în pool-ul de procese, întorcând
+    fiecare formular imediat ce este gata (în ordinea grupurilor)
+    
+    Formularele deja randate (același HTML, deci aceiași elevi în aceeași zi) sunt luate
+    din cache-ul PDF, fără o nouă randare.
     
     Args:
-        student: Obiectul student cu informațiile elevului și părintelui
+        families: Grupurile de elevi, câte un formular pentru fiecare grup (vezi `group_students_by_parent`)
         form_template: Dicționar cu șablonul formularului
         include_signature: Dacă includem sau nu câmp pentru semnătură (pentru versiunea printabilă)
         
-    Returns:
-        Tuple (boolean de succes, calea către fișierul PDF generat)
+    Yields:
+        Tupluri (numele fișierului PDF, conținutul PDF sau None dacă generarea a eșuat)
     """
-    try:
-        # Generăm HTML-ul formularului
-        html_content = generate_gdpr_form_html(student, form_template)
+    from utils.pdf_pool import pdf_render_pool, PdfJob
+    from utils.pdf_cache import pdf_cache
+    
+    documents = []
+    for students in families:
+        try:
+            # Generăm HTML-ul formularului
+            documents.append((gdpr_form_pdf_filename(students), generate_gdpr_family_form_html(students, form_template, include_styles=False)))
+        except Exception as e:
+            logger.error(f"Eroare la generarea formularului GDPR PDF: {e}")
+            documents.append(None)
+    
+    rendered = pdf_render_pool.iter_render(
+        (PdfJob(html_content, None, GDPR_FORM_CSS) for _, html_content in filter(None, documents)),
+        cache=pdf_cache
+    )
+    
+    for document in documents:
+        if document is None:
+            yield "", None
+            continue
         
-        # Cream un director temporar pentru PDF
-        temp_dir = tempfile.mkdtemp()
-        pdf_filename = f"gdpr_form_{student.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
-        pdf_path = os.path.join(temp_dir, pdf_filename)
+        pdf_filename, html_content = document
+        result = next(rendered)
+        if result.success:
+            yield pdf_filename, result.pdf_bytes
+            continue
         
+        # Fallback la pdfkit (cu stilul inclus în document)
         try:
-            # Încercăm să folosim WeasyPrint (mai bun pentru documente complexe)
-            import weasyprint
-            weasyprint.HTML(string=html_content).write_pdf(pdf_path)
+            import pdfkit
+            yield pdf_filename, pdfkit.from_string(html_content.replace('<head>', f'<head><style>{GDPR_FORM_CSS}</style>', 1), False)
         except (ImportError, Exception) as e:
-            # Fallback la pdfkit
-            try:
-                import pdfkit
-                pdfkit.from_string(html_content, pdf_path)
-            except (ImportError, Exception) as e:
-                logger.error(f"Eroare la generarea PDF cu pdfkit: {e}")
-                return False, ""
-            
-        return True, pdf_path
-    except Exception as e:
-        logger.error(f"Eroare la generarea formularului GDPR PDF: {e}")
-        return False, ""
+            logger.error(f"Eroare la generarea PDF cu pdfkit: {e}")
+            yield pdf_filename, None
 
 def load_gdpr_form_template() -> Dict[str, Any]:
     """
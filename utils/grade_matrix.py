@@ -0,0 +1,99 @@
+"""
+Modul pentru construirea matricei de note elev × materie dintr-un singur set de note.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.grade_stats import GradeStats
+
+logger = logging.getLogger(__name__)
+
+# Numărul maxim de ID-uri trimise într-o singură clauză IN
+DEFAULT_CHUNK_SIZE = 500
+
+
+def chunked(values: List[Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterable[List[Any]]:
+    """
+    Împarte o listă în bucăți de dimensiune fixă (pentru interogări IN mari)
+
+    Args:
+        values: Lista de valori
+        chunk_size: Dimensiunea maximă a unei bucăți
+
+    Returns:
+        Generator cu bucățile listei
+    """
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+
+def build_grade_matrix(students, subjects, grades, subject_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Construiește structura `students_with_grades` folosită de pagina de vizualizare a notelor
+
+    Notele sunt grupate în memorie după (elev, materie), fără interogări suplimentare.
+
+    Args:
+        students: Elevii vizibili (conform filtrelor)
+        subjects: Toate materiile, ordonate după nume
+        grades: Notele elevilor vizibili, ordonate descrescător după dată
+        subject_id (str, optional): ID-ul materiei filtrate
+
+    Returns:
+        Lista de elevi cu materiile, notele și mediile lor, sortată după clasă și nume
+    """
+    # Materiile afișate (toate sau doar cea filtrată)
+    if subject_id:
+        visible_subjects = [s for s in subjects if str(s.id) == str(subject_id)]
+    else:
+        visible_subjects = subjects
+
+    # Pivotăm notele după (elev, materie), păstrând ordinea primită
+    grades_by_pair: Dict[tuple, list] = {}
+    for grade in grades:
+        grades_by_pair.setdefault((grade.student_id, grade.subject_id), []).append(grade)
+
+    # Mediile sunt calculate vectorizat pentru toate perechile deodată
+    stats = GradeStats(
+        [g.student_id for g in grades],
+        [g.subject_id for g in grades],
+        [float(g.value) for g in grades]
+    )
+
+    students_with_grades = []
+
+    for student in students:
+        student_data = {
+            'id': student.id,
+            'name': student.name,
+            'class_name': student.class_name,
+            'subjects': [],
+            'overall_average': 0.0
+        }
+
+        for subject in visible_subjects:
+            subject_grades = grades_by_pair.get((student.id, subject.id), [])
+
+            # Dacă există note sau dacă este un filtru pe materie, adaugă materia
+            if subject_grades or subject_id:
+                average = stats.subject_average(student.id, subject.id)
+
+                student_data['subjects'].append({
+                    'id': subject.id,
+                    'name': subject.name,
+                    'grades': subject_grades,
+                    'average': round(average, 2) if average is not None else None,
+                    'count': len(subject_grades)
+                })
+
+        # Media generală este media mediilor pe materii
+        if stats.has_grades(student.id):
+            student_data['overall_average'] = round(stats.overall_average(student.id), 2)
+
+        if student_data['subjects'] or not subject_id:
+            students_with_grades.append(student_data)
+
+    # Sortează elevii după clasă și nume
+    students_with_grades.sort(key=lambda x: (x['class_name'], x['name']))
+
+    return students_with_grades
@@ -0,0 +1,189 @@
+"""
+Modul pentru calculul vectorizat al mediilor școlare (NumPy).
+
+Regula de calcul este aceeași peste tot în aplicație:
+- media la o materie este media aritmetică a notelor elevului la acea materie;
+- media generală este media mediilor pe materii (nu media tuturor notelor).
+"""
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def describe(values: Iterable[float]) -> Optional[Dict[str, float]]:
+    """
+    Calculează statisticile unei serii de medii (de ex. mediile generale ale unei clase)
+
+    Args:
+        values: Seria de valori
+
+    Returns:
+        Dicționar cu media, abaterea medie și abaterea standard sau None dacă seria e goală
+    """
+    array = np.asarray(list(values), dtype=float)
+    if array.size == 0:
+        return None
+
+    mean = array.mean()
+    deviations = array - mean
+    return {
+        'mean': float(mean),
+        'mean_deviation': float(np.abs(deviations).mean()),
+        'std_deviation': float(np.sqrt((deviations ** 2).mean()))
+    }
+
+
+class GradeStats:
+    """
+    Statistici pe note calculate prin reduceri group-by pe coloane NumPy
+
+    Intrarea este columnară: câte o valoare pe notă pentru elev, materie, notă și dată.
+    Cheile de elev și materie pot fi de orice tip ordonabil (ID-uri sau șiruri de caractere).
+    """
+
+    def __init__(self, student_ids, subject_ids, values, dates=None, counts=None):
+        """
+        Args:
+            student_ids: Cheia elevului pentru fiecare notă
+            subject_ids: Cheia materiei pentru fiecare notă
+            values: Valoarea fiecărei note
+            dates (optional): Data fiecărei note
+            counts (optional): Dacă este dat, `values` conține sume pre-agregate,
+                iar `counts` numărul de note din fiecare sumă
+        """
+        values = np.asarray(values, dtype=float)
+        weights = np.ones_like(values) if counts is None else np.asarray(counts, dtype=float)
+
+        # Factorizare: cheile devin coduri întregi
+        self.student_keys, student_codes = self._factorize(student_ids)
+        self.subject_keys, subject_codes = self._factorize(subject_ids)
+        self._student_index = {key: i for i, key in enumerate(self.student_keys.tolist())}
+        self._subject_index = {key: i for i, key in enumerate(self.subject_keys.tolist())}
+
+        n_students = len(self.student_keys)
+        n_subjects = max(len(self.subject_keys), 1)
+
+        # Grupare pe perechi (elev, materie)
+        pair_codes = student_codes.astype(np.int64) * n_subjects + subject_codes
+        pair_keys, pair_inverse = np.unique(pair_codes, return_inverse=True)
+        pair_sums = np.bincount(pair_inverse, weights=values, minlength=len(pair_keys))
+        pair_counts = np.bincount(pair_inverse, weights=weights, minlength=len(pair_keys))
+
+        self.pair_student = pair_keys // n_subjects
+        self.pair_subject = pair_keys % n_subjects
+        self.pair_count = pair_counts.astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.pair_average = np.where(pair_counts > 0, pair_sums / np.maximum(pair_counts, 1), np.nan)
+        self._pair_index = {(int(s), int(j)): i for i, (s, j) in enumerate(zip(self.pair_student, self.pair_subject))}
+
+        # Data ultimei note pentru fiecare pereche
+        self.pair_last_date = None
+        if dates is not None and len(values):
+            date_array = np.asarray(dates, dtype='datetime64[D]')
+            order = np.lexsort((date_array, pair_inverse))
+            last_positions = np.r_[np.nonzero(np.diff(pair_inverse[order]))[0], len(order) - 1]
+            self.pair_last_date = date_array[order][last_positions]
+
+        # Media generală: media mediilor pe materii pentru fiecare elev
+        valid = ~np.isnan(self.pair_average)
+        subject_totals = np.bincount(self.pair_student[valid], weights=self.pair_average[valid], minlength=n_students)
+        subject_numbers = np.bincount(self.pair_student[valid], minlength=n_students)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.overall = np.where(subject_numbers > 0, subject_totals / np.maximum(subject_numbers, 1), 0.0)
+        self.subject_numbers = subject_numbers
+
+    @staticmethod
+    def _factorize(keys) -> Tuple[np.ndarray, np.ndarray]:
+        """Transformă cheile în coduri întregi consecutive"""
+        array = np.asarray(list(keys) if not isinstance(keys, np.ndarray) else keys)
+        if array.size == 0:
+            return array, np.zeros(0, dtype=np.int64)
+        unique_keys, codes = np.unique(array, return_inverse=True)
+        return unique_keys, codes.reshape(-1)
+
+    @classmethod
+    def from_aggregates(cls, rows) -> 'GradeStats':
+        """
+        Construiește statisticile din rânduri pre-agregate (student_id, subject_id, sumă, număr)
+
+        Args:
+            rows: Iterabil de tupluri (student_id, subject_id, grade_sum, grade_count)
+        """
+        rows = list(rows)
+        return cls(
+            [r[0] for r in rows],
+            [r[1] for r in rows],
+            [r[2] for r in rows],
+            counts=[r[3] for r in rows]
+        )
+
+    def _pair(self, student_id, subject_id) -> Optional[int]:
+        student_code = self._student_index.get(student_id)
+        subject_code = self._subject_index.get(subject_id)
+        if student_code is None or subject_code is None:
+            return None
+        return self._pair_index.get((student_code, subject_code))
+
+    def has_grades(self, student_id) -> bool:
+        """Verifică dacă elevul are cel puțin o notă"""
+        code = self._student_index.get(student_id)
+        return code is not None and self.subject_numbers[code] > 0
+
+    def subject_average(self, student_id, subject_id) -> Optional[float]:
+        """Media elevului la o materie sau None dacă nu are note"""
+        pair = self._pair(student_id, subject_id)
+        if pair is None or self.pair_count[pair] == 0:
+            return None
+        return float(self.pair_average[pair])
+
+    def subject_count(self, student_id, subject_id) -> int:
+        """Numărul de note ale elevului la o materie"""
+        pair = self._pair(student_id, subject_id)
+        return int(self.pair_count[pair]) if pair is not None else 0
+
+    def last_date(self, student_id, subject_id):
+        """Data ultimei note a elevului la o materie (dacă au fost date datele)"""
+        pair = self._pair(student_id, subject_id)
+        if pair is None or self.pair_last_date is None:
+            return None
+        return self.pair_last_date[pair].astype(object)
+
+    def subject_averages(self, student_id) -> Dict[Any, Tuple[float, int]]:
+        """Mediile elevului pe materii: {subject_id: (medie, număr note)}"""
+        code = self._student_index.get(student_id)
+        if code is None:
+            return {}
+        mask = self.pair_student == code
+        return {
+            self.subject_keys[j].item(): (float(avg), int(count))
+            for j, avg, count in zip(self.pair_subject[mask], self.pair_average[mask], self.pair_count[mask])
+            if count > 0
+        }
+
+    def overall_average(self, student_id) -> float:
+        """Media generală a elevului (media mediilor pe materii), 0 dacă nu are note"""
+        code = self._student_index.get(student_id)
+        if code is None:
+            return 0.0
+        return float(self.overall[code])
+
+    def overall_averages(self) -> Dict[Any, float]:
+        """Mediile generale ale tuturor elevilor care au note"""
+        return {
+            key: float(avg)
+            for key, avg, number in zip(self.student_keys.tolist(), self.overall, self.subject_numbers)
+            if number > 0
+        }
+
+    def class_statistics(self, student_ids) -> Optional[Dict[str, float]]:
+        """
+        Media clasei, abaterea medie și abaterea standard a mediilor generale
+
+        Sunt luați în calcul doar elevii care au cel puțin o notă.
+        """
+        codes = [self._student_index[s] for s in student_ids if s in self._student_index]
+        codes = [c for c in codes if self.subject_numbers[c] > 0]
+        return describe(self.overall[codes]) if codes else None
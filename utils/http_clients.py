@@ -0,0 +1,75 @@
+"""
+Clienți HTTP comuni, cu conexiuni persistente (keep-alive), pentru furnizorii de email.
+
+Fiecare proces păstrează o singură sesiune `requests` cu un pool de conexiuni, astfel încât
+cererile repetate către același webhook să nu refacă de fiecare dată DNS, TCP și TLS.
+Aceleași limite de pool și timeout-uri sunt folosite și de transportul asincron
+din utils/email_transport.py.
+"""
+import os
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Numărul maxim de conexiuni păstrate deschise către același host
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))
+
+# Numărul maxim de hosturi diferite pentru care se păstrează un pool de conexiuni
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 4))
+
+# Timeout pentru stabilirea conexiunii și pentru citirea răspunsului (secunde)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+
+# Cât timp rămâne deschisă o conexiune nefolosită (secunde)
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 30))
+
+# Timeout-ul implicit pentru cererile sincrone (conectare, citire)
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Sesiunea `requests` comună a procesului curent
+
+    Sesiunea este creată la prima utilizare și recreată după fork (de ex. în workerii gunicorn),
+    pentru ca procesele să nu împartă aceleași conexiuni.
+
+    Returns:
+        requests.Session cu pool de conexiuni keep-alive
+    """
+    pid = os.getpid()
+    with _sessions_lock:
+        session = _sessions.get(pid)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions.clear()
+            _sessions[pid] = session
+            logger.info(f"Sesiune HTTP creată (pool {HTTP_POOL_MAXSIZE} conexiuni/host)")
+        return session
+
+
+def post_json(url, payload, headers=None, timeout=DEFAULT_TIMEOUT) -> requests.Response:
+    """
+    Trimite o cerere POST cu corp JSON prin sesiunea comună
+
+    Args:
+        url (str): Adresa de destinație
+        payload (dict): Corpul cererii
+        headers (dict, optional): Antete suplimentare
+        timeout (tuple, optional): Timeout (conectare, citire)
+
+    Returns:
+        requests.Response
+    """
+    return get_http_session().post(url, json=payload, headers=headers, timeout=timeout)
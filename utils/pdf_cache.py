@@ -0,0 +1,125 @@
+"""
+Cache pe disc pentru PDF-uri, adresat după conținut.
+
+Cheia este hash-ul SHA-256 al HTML-ului randat, al foii de stil și al versiunii șablonului,
+deci un document identic (de ex. același formular GDPR retrimis în aceeași zi) nu mai este
+randat din nou. Dimensiunea totală este limitată; la depășire sunt șterse fișierele
+folosite cel mai demult (LRU, după data ultimei accesări a fișierului).
+"""
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Versiunea șabloanelor PDF; se incrementează când se schimbă randarea (nu doar HTML-ul)
+PDF_TEMPLATE_VERSION = '1'
+
+# Directorul cache-ului și dimensiunea maximă (octeți)
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dirigintesmart_pdf_cache'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+
+def pdf_cache_key(html: str, stylesheet: Optional[str] = None, template_version: str = PDF_TEMPLATE_VERSION) -> str:
+    """Cheia de cache a unui document: hash-ul conținutului și al versiunii șablonului"""
+    digest = hashlib.sha256()
+    for part in (template_version, stylesheet or '', html):
+        encoded = part.encode('utf-8')
+        # Lungimea fiecărei părți evită coliziunile prin concatenare
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """Cache LRU pe disc, limitat ca dimensiune, partajabil între procese"""
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key: str) -> str:
+        # Subdirectoare după primele caractere, pentru a nu avea mii de fișiere într-un singur director
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PDF-ul din cache sau None; o citire marchează fișierul ca folosit recent"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Eroare la citirea din cache-ul PDF: {e}")
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Salvează un PDF în cache (scriere atomică) și elimină intrările vechi la nevoie"""
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Eroare la scrierea în cache-ul PDF: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Alte procese pot scrie în același director: recalculăm dimensiunea de pe disc
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+
+        # Coborâm sub 90% din limită, ca să nu evacuăm la fiecare scriere
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+            except OSError as e:
+                logger.warning(f"Eroare la ștergerea din cache-ul PDF: {e}")
+
+        self._size = total
+
+
+# Cache-ul comun al procesului
+pdf_cache = PdfCache()
@@ -4,86 +4,85 @@ Modul pentru generarea de PDF-uri cu notificări pentru părinți.
 import os
 import logging
 from datetime import datetime
-import weasyprint
-import tempfile
+
+from utils.pdf_pool import pdf_render_pool
 
 logger = logging.getLogger(__name__)
 
-def generate_notification_pdf(parent_name, student_name, parent_email, subject, content):
+# Stilul comun al notificărilor (parsat o singură dată de fiecare proces de randare)
+NOTIFICATION_CSS = """
+body {
+    font-family: Arial, sans-serif;
+    margin: 2cm;
+    font-size: 12pt;
+}
+.header {
+    margin-bottom: 30px;
+    border-bottom: 1px solid #ccc;
+    padding-bottom: 10px;
+}
+.footer {
+    margin-top: 40px;
+    font-size: 10pt;
+    color: #666;
+    text-align: center;
+}
+h1 {
+    font-size: 18pt;
+    color: #333;
+}
+.content {
+    margin: 20px 0;
+    line-height: 1.5;
+}
+.metadata {
+    margin: 20px 0;
+    font-size: 10pt;
+    color: #666;
+}
+.school-info {
+    text-align: center;
+    font-weight: bold;
+    margin-bottom: 20px;
+}
+"""
+
+# Fragmentele statice ale documentului, identice pentru toți destinatarii
+NOTIFICATION_LETTERHEAD = '<div class="school-info">DIRIGINTESMART - SISTEM DE NOTIFICĂRI ȘCOLARE</div>'
+
+NOTIFICATION_FOOTER = """
+            <div class="footer">
+                Această notificare a fost generată automat de sistemul DiriginteSmart.
+                <br>Pentru orice întrebări, vă rugăm contactați secretariatul școlii.
+            </div>"""
+
+def build_notification_html(parent_name, student_name, subject, content, include_styles=False):
     """
-    Generează un PDF cu notificarea pentru părinte
+    Construiește documentul HTML al notificării
     
     Args:
         parent_name (str): Numele părintelui
         student_name (str): Numele elevului
-        parent_email (str): Emailul părintelui (folosit pentru numele fișierului)
         subject (str): Subiectul notificării
         content (str): Conținutul HTML sau text al notificării
+        include_styles (bool): Include stilul în document (pentru varianta HTML de rezervă);
+            la randarea PDF stilul este dat separat, deja parsat
         
     Returns:
-        tuple: (bool, str) - Succes și calea către fișierul generat
+        str: Documentul HTML
     """
-    try:
-        # Asigură-te că directorul există
-        pdf_dir = os.path.join('static', 'notifications_pdf')
-        if not os.path.exists(pdf_dir):
-            os.makedirs(pdf_dir)
-            
-        # Creează un nume de fișier bazat pe timestamp și email
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_email = parent_email.replace('@', '_').replace('.', '_')
-        safe_student = student_name.replace(' ', '_').replace('-', '_')
-        
-        filename = f"{timestamp}_{safe_student}_{safe_email}.pdf"
-        pdf_path = os.path.join(pdf_dir, filename)
-        
-        # Generează HTML-ul pentru PDF
-        html_content = f"""
+    styles = f"<style>{NOTIFICATION_CSS}</style>" if include_styles else ""
+    return f"""
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="UTF-8">
             <title>{subject}</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    margin: 2cm;
-                    font-size: 12pt;
-                }}
-                .header {{
-                    margin-bottom: 30px;
-                    border-bottom: 1px solid #ccc;
-                    padding-bottom: 10px;
-                }}
-                .footer {{
-                    margin-top: 40px;
-                    font-size: 10pt;
-                    color: #666;
-                    text-align: center;
-                }}
-                h1 {{
-                    font-size: 18pt;
-                    color: #333;
-                }}
-                .content {{
-                    margin: 20px 0;
-                    line-height: 1.5;
-                }}
-                .metadata {{
-                    margin: 20px 0;
-                    font-size: 10pt;
-                    color: #666;
-                }}
-                .school-info {{
-                    text-align: center;
-                    font-weight: bold;
-                    margin-bottom: 20px;
-                }}
-            </style>
+            {styles}
         </head>
         <body>
             <div class="header">
-                <div class="school-info">DIRIGINTESMART - SISTEM DE NOTIFICĂRI ȘCOLARE</div>
+                {NOTIFICATION_LETTERHEAD}
                 <h1>{subject}</h1>
             </div>
             
@@ -97,47 +96,91 @@ def generate_notification_pdf(parent_name, student_name, parent_email, subject,
             <div class="metadata">
                 Notificare generată la: {datetime.now().strftime('%d.%m.%Y, %H:%M')}
             </div>
-            
-            <div class="footer">
-                Această notificare a fost generată automat de sistemul DiriginteSmart.
-                <br>Pentru orice întrebări, vă rugăm contactați secretariatul școlii.
-            </div>
+            {NOTIFICATION_FOOTER}
         </body>
         </html>
         """
+
+def generate_notification_pdf(parent_name, student_name, parent_email, subject, content):
+    """
+    Generează un PDF cu notificarea pentru părinte
+    
+    Args:
+        parent_name (str): Numele părintelui
+        student_name (str): Numele elevului
+        parent_email (str): Emailul părintelui (folosit pentru numele fișierului)
+        subject (str): Subiectul notificării
+        content (str): Conținutul HTML sau text al notificării
         
-        # Creează un fișier temporar pentru HTML
-        with tempfile.NamedTemporaryFile(suffix='.html', delete=False, mode='w', encoding='utf-8') as temp_html:
-            temp_html_path = temp_html.name
-            temp_html.write(html_content)
+    Returns:
+        tuple: (bool, str) - Succes și calea către fișierul generat
+    """
+    success, path, _ = generate_notification_pdf_data(parent_name, student_name, parent_email, subject, content)
+    return success, path
+
+def generate_notification_pdf_data(parent_name, student_name, parent_email, subject, content):
+    """
+    Generează PDF-ul notificării în memorie și îl arhivează în static/notifications_pdf
+    
+    PDF-ul este randat direct din șirul HTML într-un buffer; același conținut este scris
+    în arhivă și întors apelantului (de ex. pentru atașamentul emailului), fără recitire de pe disc.
+    
+    Args:
+        parent_name (str): Numele părintelui
+        student_name (str): Numele elevului
+        parent_email (str): Emailul părintelui (folosit pentru numele fișierului)
+        subject (str): Subiectul notificării
+        content (str): Conținutul HTML sau text al notificării
         
-        try:
-            # Generează PDF-ul folosind WeasyPrint
-            weasyprint.HTML(filename=temp_html_path).write_pdf(pdf_path)
+    Returns:
+        tuple: (bool, str, bytes) - Succes, calea fișierului arhivat și conținutul PDF
+            (None dacă s-a salvat doar varianta HTML)
+    """
+    try:
+        # Asigură-te că directorul există
+        pdf_dir = os.path.join('static', 'notifications_pdf')
+        if not os.path.exists(pdf_dir):
+            os.makedirs(pdf_dir)
             
-            # Șterge fișierul temporar HTML
-            os.unlink(temp_html_path)
+        # Creează un nume de fișier bazat pe timestamp și email
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        safe_email = parent_email.replace('@', '_').replace('.', '_')
+        safe_student = student_name.replace(' ', '_').replace('-', '_')
+        
+        filename = f"{timestamp}_{safe_student}_{safe_email}.pdf"
+        pdf_path = os.path.join(pdf_dir, filename)
+        
+        # Generează HTML-ul pentru PDF (stilul comun este dat separat renderer-ului)
+        html_content = build_notification_html(parent_name, student_name, subject, content)
+        
+        # Generează PDF-ul folosind WeasyPrint, în pool-ul de procese de randare (direct în memorie)
+        result = pdf_render_pool.render(html_content, stylesheet=NOTIFICATION_CSS)
+        
+        if result.success:
+            # Arhivăm exact conținutul care va fi atașat
+            with open(pdf_path, 'wb') as pdf_file:
+                pdf_file.write(result.pdf_bytes)
             
             logger.info(f"PDF generat cu succes: {pdf_path}")
-            return True, pdf_path
+            return True, pdf_path, result.pdf_bytes
             
-        except Exception as pdf_error:
-            logger.error(f"Eroare la generarea PDF-ului: {pdf_error}")
+        else:
+            logger.error(f"Eroare la generarea PDF-ului: {result.error}")
             
             # Verifică dacă WeasyPrint a eșuat și încearcă o alternativă mai simplă
             try:
                 # Salvează ca HTML dacă PDF eșuează
                 html_fallback_path = os.path.join(pdf_dir, filename.replace('.pdf', '.html'))
                 with open(html_fallback_path, 'w', encoding='utf-8') as html_file:
-                    html_file.write(html_content)
+                    html_file.write(build_notification_html(parent_name, student_name, subject, content, include_styles=True))
                     
                 logger.info(f"HTML salvat ca alternativă: {html_fallback_path}")
-                return True, html_fallback_path
+                return True, html_fallback_path, None
                 
             except Exception as html_error:
                 logger.error(f"Eroare și la salvarea HTML: {html_error}")
-                return False, str(html_error)
+                return False, str(html_error), None
         
     except Exception as e:
         logger.error(f"Eroare generală la generarea PDF-ului: {e}")
-        return False, str(e)
\ No newline at end of file
+        return False, str(e), None
\ No newline at end of file
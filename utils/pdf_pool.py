@@ -0,0 +1,253 @@
+"""
+Randare PDF (WeasyPrint) într-un pool de procese, pentru a folosi toate nucleele serverului.
+
+Randarea este limitată de CPU, așa că documentele sunt distribuite unor procese separate.
+Numărul de documente trimise simultan către pool este limitat (back-pressure), iar
+o eroare la un document este raportată doar pentru acel document, fără a opri lotul.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Numărul de procese care randează PDF-uri (implicit, câte unul pe nucleu)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', os.cpu_count() or 1))
+
+# Numărul maxim de documente aflate în pool pentru fiecare proces (back-pressure)
+PDF_RENDER_QUEUE_PER_WORKER = int(os.environ.get('PDF_RENDER_QUEUE_PER_WORKER', 2))
+
+# Metoda de pornire a proceselor; 'spawn' evită copierea threadurilor și conexiunilor procesului web
+PDF_RENDER_START_METHOD = os.environ.get('PDF_RENDER_START_METHOD', 'spawn')
+
+
+class PdfJob(NamedTuple):
+    """
+    Un document de randat: HTML-ul, opțional calea unde se scrie PDF-ul
+    și foaia de stil comună documentelor de același tip
+    """
+    html: str
+    output_path: Optional[str] = None
+    stylesheet: Optional[str] = None
+
+
+class PdfResult(NamedTuple):
+    """Rezultatul randării unui document"""
+    success: bool
+    output_path: Optional[str] = None
+    pdf_bytes: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+class PdfRenderer:
+    """
+    Randare reutilizabilă într-un proces din pool
+
+    Configurația de fonturi (fontconfig/pango) este creată o singură dată, iar foile de stil
+    comune sunt parsate la prima utilizare și refolosite; între documente se schimbă doar HTML-ul.
+    """
+
+    def __init__(self):
+        import weasyprint
+        from weasyprint.text.fonts import FontConfiguration
+
+        self._weasyprint = weasyprint
+        self.font_config = FontConfiguration()
+        self._stylesheets = {}
+
+    def _stylesheet(self, css: str):
+        stylesheet = self._stylesheets.get(css)
+        if stylesheet is None:
+            stylesheet = self._stylesheets[css] = self._weasyprint.CSS(string=css, font_config=self.font_config)
+        return stylesheet
+
+    def render(self, html: str, stylesheet: Optional[str] = None, target=None):
+        """
+        Randează un document; întoarce octeții PDF dacă nu este dată o destinație
+
+        Args:
+            html: Documentul HTML
+            stylesheet (optional): CSS-ul comun (parsat o singură dată per proces)
+            target (optional): Calea sau fișierul în care se scrie PDF-ul
+        """
+        stylesheets = [self._stylesheet(stylesheet)] if stylesheet else None
+        return self._weasyprint.HTML(string=html).write_pdf(
+            target,
+            stylesheets=stylesheets,
+            font_config=self.font_config
+        )
+
+
+# Renderer-ul procesului curent din pool (creat la primul document)
+_renderer: Optional[PdfRenderer] = None
+
+
+def _init_renderer():
+    """Pregătește renderer-ul la pornirea procesului din pool (descoperirea fonturilor o singură dată)"""
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfRenderer()
+
+
+def _warm_up():
+    # Erorile (de ex. biblioteci lipsă) sunt raportate per document, nu opresc pornirea procesului
+    try:
+        _init_renderer()
+    except Exception as e:
+        logger.error(f"Renderer-ul PDF nu a putut fi inițializat: {e!r}")
+
+
+def _render_document(html: str, output_path: Optional[str], stylesheet: Optional[str] = None) -> PdfResult:
+    """Randează un document (rulează în procesul din pool)"""
+    _init_renderer()
+
+    if output_path:
+        _renderer.render(html, stylesheet, output_path)
+        return PdfResult(True, output_path=output_path)
+    return PdfResult(True, pdf_bytes=_renderer.render(html, stylesheet))
+
+
+class PdfRenderPool:
+    """Pool de procese pentru randarea PDF, creat la prima utilizare în fiecare proces web"""
+
+    def __init__(self, max_workers: int = PDF_RENDER_WORKERS,
+                 queue_per_worker: int = PDF_RENDER_QUEUE_PER_WORKER):
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = self.max_workers * max(queue_per_worker, 1)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Limitează documentele trimise simultan, inclusiv între threaduri diferite
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(PDF_RENDER_START_METHOD),
+                    initializer=_warm_up
+                )
+            return self._executor
+
+    def _reset_executor(self, broken_executor: ProcessPoolExecutor):
+        # Un proces din pool a murit (de ex. lipsă de memorie): pool-ul este recreat la următoarea cerere
+        with self._lock:
+            if self._executor is broken_executor:
+                self._executor = None
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, job: PdfJob):
+        self._slots.acquire()
+        try:
+            # Și crearea pool-ului poate eșua (de ex. spawn, limite de resurse): locul este eliberat
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_render_document, job.html, job.output_path, job.stylesheet)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(_render_document, job.html, job.output_path, job.stylesheet)
+        except Exception:
+            self._slots.release()
+            raise
+        future.executor = executor
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future) -> PdfResult:
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"Pool-ul de randare PDF nu mai funcționează: {e!r}")
+            self._reset_executor(future.executor)
+            return PdfResult(False, error=str(e) or repr(e))
+        except Exception as e:
+            logger.error(f"Eroare la randarea PDF: {e!r}")
+            return PdfResult(False, error=str(e) or repr(e))
+
+    def _cached_result(self, job: PdfJob, pdf_bytes: bytes) -> PdfResult:
+        # PDF-ul vine din cache sau a fost randat în memorie: îl scriem la destinația cerută
+        if not job.output_path:
+            return PdfResult(True, pdf_bytes=pdf_bytes)
+        try:
+            with open(job.output_path, 'wb') as f:
+                f.write(pdf_bytes)
+        except OSError as e:
+            logger.error(f"Eroare la scrierea PDF-ului {job.output_path}: {e}")
+            return PdfResult(False, error=str(e))
+        return PdfResult(True, output_path=job.output_path)
+
+    def iter_render(self, jobs: Iterable[PdfJob], cache=None) -> Iterator[PdfResult]:
+        """
+        Randează un lot de documente în paralel, întorcând fiecare rezultat imediat ce este gata
+
+        Documentele sunt trimise către pool pe măsură ce se eliberează locuri,
+        deci un lot mare nu ocupă memoria cu toate documentele deodată.
+
+        Args:
+            jobs: Documentele de randat
+            cache (optional): Cache-ul PDF (utils.pdf_cache.PdfCache); documentele găsite
+                în cache nu mai sunt randate, iar cele randate sunt adăugate în cache
+
+        Yields:
+            Rezultatele, în ordinea documentelor
+        """
+        pending = deque()
+
+        def collect(entry):
+            job, key, future = entry
+            if key is None:
+                return self._result(future)
+            if isinstance(future, PdfResult):
+                return future
+            result = self._result(future)
+            if not result.success:
+                return result
+            cache.put(key, result.pdf_bytes)
+            return self._cached_result(job, result.pdf_bytes)
+
+        for job in jobs:
+            key = None
+            if cache is not None:
+                from utils.pdf_cache import pdf_cache_key
+
+                key = pdf_cache_key(job.html, job.stylesheet)
+                pdf_bytes = cache.get(key)
+                if pdf_bytes is not None:
+                    pending.append((job, key, self._cached_result(job, pdf_bytes)))
+                    continue
+
+            # Back-pressure: nu ținem în așteptare mai mult decât poate procesa pool-ul
+            while len(pending) >= self.max_pending:
+                yield collect(pending.popleft())
+            # Pentru cache avem nevoie de octeți, deci randăm în memorie și scriem fișierul aici
+            submitted = job._replace(output_path=None) if key is not None else job
+            pending.append((job, key, self._submit(submitted)))
+
+        while pending:
+            yield collect(pending.popleft())
+
+    def render_many(self, jobs: Iterable[PdfJob], cache=None) -> List[PdfResult]:
+        """
+        Randează un lot de documente în paralel (vezi `iter_render`)
+
+        Returns:
+            Lista rezultatelor, în ordinea documentelor
+        """
+        return list(self.iter_render(jobs, cache=cache))
+
+    def render(self, html: str, output_path: Optional[str] = None, stylesheet: Optional[str] = None,
+               cache=None) -> PdfResult:
+        """Randează un singur document (apelabil concurent din mai multe threaduri)"""
+        return self.render_many([PdfJob(html, output_path, stylesheet)], cache=cache)[0]
+
+
+# Pool-ul comun al procesului
+pdf_render_pool = PdfRenderPool()
@@ -0,0 +1,71 @@
+"""
+Cache local (per proces) pentru lista de elevi afișată în bara de navigare.
+
+Cache-ul este marcat cu versiunea citită din baza de date; orice modificare a unui elev
+incrementează versiunea, astfel încât toți workerii reîncarcă lista la următoarea cerere.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RosterStudent:
+    """Copie independentă de sesiune a câmpurilor unui elev, sigură pentru partajare între cereri"""
+
+    __slots__ = ('id', 'name', 'class_name', 'parent_name', 'parent_email')
+
+    def __init__(self, student):
+        self.id = student.id
+        self.name = student.name
+        self.class_name = student.class_name
+        self.parent_name = student.parent_name
+        self.parent_email = student.parent_email
+
+    def __repr__(self):
+        return f"<RosterStudent {self.name} (Class {self.class_name})>"
+
+
+def group_by_class(students: Iterable[Any]) -> Dict[str, List[Any]]:
+    """Grupează elevii după clasă, păstrând ordinea primită"""
+    students_by_class: Dict[str, List[Any]] = {}
+    for student in students:
+        students_by_class.setdefault(student.class_name, []).append(student)
+    return students_by_class
+
+
+class RosterCache:
+    """Lista de elevi și gruparea pe clase, reîncărcate doar când se schimbă versiunea"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._data: Optional[Tuple[List[RosterStudent], Dict[str, List[RosterStudent]]]] = None
+
+    def get(self, version: int, loader: Callable[[], Iterable[Any]]):
+        """
+        Returnează lista de elevi pentru versiunea dată
+
+        Args:
+            version: Versiunea curentă a listei (din baza de date)
+            loader: Funcție care încarcă elevii ordonați după clasă și nume
+
+        Returns:
+            Tuple (elevi, elevi grupați după clasă)
+        """
+        with self._lock:
+            if self._data is not None and self._version == version:
+                return self._data
+
+            students = [RosterStudent(student) for student in loader()]
+            self._data = (students, group_by_class(students))
+            self._version = version
+            logger.info(f"Lista de elevi reîncărcată (versiunea {version}, {len(students)} elevi)")
+            return self._data
+
+    def invalidate(self):
+        """Golește cache-ul local"""
+        with self._lock:
+            self._version = None
+            self._data = None
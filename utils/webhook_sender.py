@@ -4,12 +4,12 @@ Integrare cu servicii precum Pipedream, Make.com, etc.
 """
 
 import os
-import json
 import logging
-import requests
 import base64
 from datetime import datetime
 
+from utils.http_clients import post_json
+
 # Configurare logging
 logger = logging.getLogger(__name__)
 
@@ -65,11 +65,11 @@ def send_through_webhook(to_email, subject, content, from_email=None, attachment
             except Exception as attach_error:
                 logger.error(f"Eroare la adăugarea atașamentului în webhook: {attach_error}")
         
-        # Trimite cererea POST către webhook
-        response = requests.post(
+        # Trimite cererea POST către webhook (sesiune comună, cu timeout)
+        response = post_json(
             webhook_url,
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload)
+            payload,
+            headers={"Content-Type": "application/json"}
         )
         
         # Verifică răspunsul
@@ -0,0 +1,57 @@
+"""
+Scriere de arhive ZIP în flux (streaming), fără fișiere temporare.
+
+Arhiva este scrisă într-un obiect care nu permite `seek`, așa că zipfile folosește
+descriptori de date după fiecare fișier; octeții scriși sunt întorși imediat ca bucăți
+ale răspunsului HTTP, deci în memorie se află cel mult un fișier din arhivă.
+"""
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+class _ChunkSink:
+    """Destinație de scriere care doar acumulează bucățile până sunt preluate"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries: Iterable[Tuple[str, Optional[bytes]]],
+               compression: int = zipfile.ZIP_STORED) -> Iterator[bytes]:
+    """
+    Construiește o arhivă ZIP în flux
+
+    Args:
+        entries: Tupluri (nume fișier, conținut); intrările fără conținut sunt sărite
+        compression: Metoda de compresie (implicit fără, PDF-urile sunt deja comprimate)
+
+    Yields:
+        Bucățile arhivei, pe măsură ce fiecare fișier este adăugat
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=compression) as archive:
+        for name, data in entries:
+            if data is None:
+                continue
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    # Directorul central al arhivei
+    chunk = sink.drain()
+    if chunk:
+        yield chunk